@@ -29,18 +29,31 @@ from flask_mailman import Mail, EmailMessage
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from datetime import datetime, timedelta
 import secrets
+import atexit
+import threading
+from collections import defaultdict
 from dotenv import load_dotenv
 import os
 from flask_bcrypt import check_password_hash, generate_password_hash
 from flask import Flask, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ml_matcher import RLTutorMatchingSystem
-from sqlalchemy import event
+from ml_matcher import (RLTutorMatchingSystem, TutorFeatureStore, MatchResultCache,
+                        StudentFeatureCache, StudentFeatureMatrix,
+                        OutcomeJournal, FileOutcomeLog, SharedOutcomeLog, SharedPoolChangeLog,
+                        OutcomeIngestQueue, OutcomeReplay, MatchPrecomputeQueue,
+                        read_outcome_jsonl, read_outcome_parquet,
+                        encode_weekly_availability, decode_weekly_availability, WEEK_BYTES)
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, update, insert, delete, case, func, select, bindparam
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 load_dotenv()
 import cloudinary
 import cloudinary.uploader
 import hashlib
+import itertools
+import re
 import time
 import uuid
 import urllib.parse
@@ -136,14 +149,51 @@ os.environ['MKL_NUM_THREADS'] = '1'
 
 rl_system = RLTutorMatchingSystem()
 
+# Outcomes are journaled; MODEL_PATH is the latest compacted snapshot.
+# RL_STATE_BACKEND=db keeps the journal in the database so several
+# gunicorn workers share one learned model (see init_outcome_journal)
 MODEL_PATH = 'rl_model.pkl'
-if os.path.exists(MODEL_PATH):
-    rl_system.load_model(MODEL_PATH)
-    print("✓ Loaded existing RL model")
-else:
-    print("✓ Starting with fresh RL model")
-
-update_counter = 0
+RL_STATE_BACKEND = os.getenv('RL_STATE_BACKEND', 'file')
+
+# RL journal, background learner/precompute threads and the pool change
+# log; set up by start_services at serve time, never on import
+outcome_journal = None
+outcome_queue = None
+pool_changes = None
+match_precompute = None
+
+# Below this many subject-index candidates, matching scores the whole pool
+rl_system.min_candidates = int(os.getenv('MATCH_MIN_CANDIDATES', rl_system.min_candidates))
+
+# Parsed tutor pool for matching; warmed on first use (ensure_matcher_pools).
+# MATCH_RETRIEVAL=embedding also keeps a tutor embedding index, and match
+# requests take candidates from it (re-ranked exactly) instead of the
+# subject index; worth it for pools of tens of thousands of tutors
+MATCH_RETRIEVAL = os.getenv('MATCH_RETRIEVAL', 'subject')
+tutor_store = TutorFeatureStore(rl_system, embeddings=MATCH_RETRIEVAL == 'embedding')
+rl_system.embedding_candidates = int(
+    os.getenv('MATCH_EMBEDDING_CANDIDATES', rl_system.embedding_candidates))
+
+# Ranked match lists per student, keyed on profile fingerprint + pool/model versions.
+# Rankings precomputed after the survey are pinned (one per student, no TTL)
+match_cache = MatchResultCache(
+    max_entries=int(os.getenv('MATCH_CACHE_SIZE', 512)),
+    ttl_seconds=int(os.getenv('MATCH_CACHE_TTL', 300)),
+    max_pinned=int(os.getenv('MATCH_PRECOMPUTE_SIZE', 256))
+)
+# Parsed matcher input per student (from the saved survey), dropped on profile updates
+student_feature_cache = StudentFeatureCache(
+    rl_system,
+    max_entries=int(os.getenv('STUDENT_FEATURE_CACHE_SIZE', 10000)),
+    ttl_seconds=int(os.getenv('STUDENT_FEATURE_CACHE_TTL', 600))
+)
+# Every student with a completed survey, for reverse matching (tutor -> students);
+# warmed on first use and updated in place on survey/profile saves
+student_pool = StudentFeatureMatrix(rl_system)
+# Depth of the precomputed ranking, and how long a match request waits
+# for a precompute of the same student that is still running
+MATCH_PRECOMPUTE_K = int(os.getenv('MATCH_PRECOMPUTE_K', 10))
+MATCH_PRECOMPUTE_WAIT = float(os.getenv('MATCH_PRECOMPUTE_WAIT', 3))
 
 db = SQLAlchemy()
 app = Flask(__name__)
@@ -294,6 +344,10 @@ class FCMToken(db.Model):
     last_used = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (
+        db.Index('ix_fcm_token_user_id_is_active', 'user_id', 'is_active'),
+    )
+
 class StudentProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -316,6 +370,7 @@ class StudentProfile(db.Model):
     weekly_study_hours = db.Column(db.String(20))
     preferred_session_length = db.Column(db.String(10))
     learning_pace = db.Column(db.String(20))
+    availability_bitmap = db.Column(db.LargeBinary(WEEK_BYTES))  # weekly hours, see ml_matcher
 
 class TutorProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -327,6 +382,7 @@ class TutorProfile(db.Model):
     total_sessions = db.Column(db.Integer, default=0)
     languages = db.Column(db.Text)
     availability = db.Column(db.Text)
+    availability_bitmap = db.Column(db.LargeBinary(WEEK_BYTES))  # weekly hours, see ml_matcher
     verified = db.Column(db.Boolean, default=False)
     
     courses = db.relationship('Course', backref='tutor', cascade='all, delete-orphan')
@@ -341,6 +397,10 @@ class TutorProfile(db.Model):
     max_students = db.Column(db.String(10))
     preferred_age_groups = db.Column(db.Text)  # JSON array
 
+    __table_args__ = (
+        db.Index('ix_tutor_profile_user_id_verified', 'user_id', 'verified'),
+    )
+
 class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tutor_id = db.Column(db.Integer, db.ForeignKey('tutor_profile.id'), nullable=False)
@@ -368,6 +428,10 @@ class CourseSection(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     materials = db.relationship('CourseMaterial', backref='section', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_course_section_course_id_order', 'course_id', 'order'),
+    )
     
 class CourseMaterial(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -381,6 +445,11 @@ class CourseMaterial(db.Model):
     duration = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_course_material_course_id_order', 'course_id', 'order'),
+        db.Index('ix_course_material_section_id_order', 'section_id', 'order'),
+    )
+
 class Enrollment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -390,6 +459,11 @@ class Enrollment(db.Model):
     completed = db.Column(db.Boolean, default=False)
     certificate_issued = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        # One enrollment per student and course (enroll checks for an existing row)
+        db.Index('uq_enrollment_student_id_course_id', 'student_id', 'course_id', unique=True),
+    )
+
 class OfflineDownload(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -397,6 +471,11 @@ class OfflineDownload(db.Model):
     downloaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime)
 
+    __table_args__ = (
+        # Downloading a course again extends the existing row
+        db.Index('uq_offline_download_user_id_course_id', 'user_id', 'course_id', unique=True),
+    )
+
 
 
 class Conversation(db.Model):
@@ -405,6 +484,18 @@ class Conversation(db.Model):
     participant2_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     last_message = db.Column(db.String(500))
     last_message_time = db.Column(db.DateTime)
+    # Newest message id each participant has read (unread = later messages from the partner)
+    participant1_last_read_id = db.Column(db.Integer, default=0)
+    participant2_last_read_id = db.Column(db.Integer, default=0)
+    # Sync seq of the latest write (new message or read position moved)
+    change_seq = db.Column(db.BigInteger)
+
+    __table_args__ = (
+        # One conversation per participant pair; participant2_id serves the
+        # second leg of "participant1_id = :u OR participant2_id = :u"
+        db.Index('uq_conversation_participants', 'participant1_id', 'participant2_id', unique=True),
+        db.Index('ix_conversation_participant2_id', 'participant2_id'),
+    )
 
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -415,6 +506,18 @@ class Message(db.Model):
     file_url = db.Column(db.String(500))      # 🔥 ADD THIS
     file_type = db.Column(db.String(50))      # 🔥 ADD THIS (image/voice/file)
     file_name = db.Column(db.String(255))  
+    change_seq = db.Column(db.BigInteger)     # Sync seq, see stamp_sync_seqs
+
+    __table_args__ = (
+        db.Index('ix_message_conversation_id_timestamp_id', 'conversation_id', 'timestamp', 'id'),
+        db.Index('ix_message_conversation_id_id', 'conversation_id', 'id'),
+        db.Index('ix_message_conversation_id_change_seq', 'conversation_id', 'change_seq'),
+    )
+
+class MessageSyncState(db.Model):
+    """Single row (id=1): latest message sync seq handed out"""
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.BigInteger, nullable=False, default=0)
 
 # Optional: Booking model
 class Booking(db.Model):
@@ -442,6 +545,52 @@ class Assignment(db.Model):
     # Relationships
     submissions = db.relationship('AssignmentSubmission', backref='assignment', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_assignment_course_id_due_date', 'course_id', 'due_date'),
+    )
+
+class RLOutcomeEvent(db.Model):
+    """One recorded match outcome in the shared RL journal (RL_STATE_BACKEND=db)"""
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.BigInteger, unique=True, nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON outcome record
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RLOutcomeArchive(db.Model):
+    """Outcome events a snapshot compacted out of rl_outcome_event, kept for offline replay"""
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.BigInteger, unique=True, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime)
+
+class RLStatsApplied(db.Model):
+    """Outcome seq whose tutor rating/total_sessions update is committed"""
+    seq = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+
+class RLStatsState(db.Model):
+    """Single row (id=1): every outcome seq below `floor` has its tutor stats applied"""
+    id = db.Column(db.Integer, primary_key=True)
+    floor = db.Column(db.BigInteger, nullable=False, default=0)
+
+class RLModelState(db.Model):
+    """Single row (id=1): latest published outcome seq and snapshot seq"""
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.BigInteger, nullable=False, default=0)
+    snapshot_seq = db.Column(db.BigInteger, nullable=False, default=0)
+
+class MatcherPoolChange(db.Model):
+    """One tutor/student pool change for the other workers (RL_STATE_BACKEND=db)"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, unique=True, nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # tutor, student
+    entity_id = db.Column(db.Integer, nullable=False)  # user id
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MatcherPoolState(db.Model):
+    """Single row (id=1): latest published pool change version"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
 class AssignmentSubmission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     assignment_id = db.Column(db.Integer, db.ForeignKey('assignment.id'), nullable=False)
@@ -459,6 +608,13 @@ class AssignmentSubmission(db.Model):
     # Relationships
     student = db.relationship('User', backref='assignment_submissions')
 
+    __table_args__ = (
+        # One submission per student and assignment (submit rejects a second one)
+        db.Index('uq_assignment_submission_assignment_id_student_id',
+                 'assignment_id', 'student_id', unique=True),
+        db.Index('ix_assignment_submission_assignment_id_status', 'assignment_id', 'status'),
+    )
+
 
 
 def send_fcm_notification(user_id, title, body, data=None, notification_type='general'):
@@ -704,6 +860,11 @@ class TutoringSession(db.Model):
 
     SESSION_MINUTES = 60  # change to any value for testing
 
+    __table_args__ = (
+        db.Index('ix_tutoring_session_pair_started_at',
+                 'student_id', 'tutor_user_id', 'started_at'),
+    )
+
 
 @app.route('/api/sessions/start', methods=['POST'])
 @jwt_required()
@@ -1080,6 +1241,7 @@ def get_public_tutor_profile(tutor_id):
                 'expertise': json.loads(tutor.expertise or '[]'),
                 'languages': json.loads(tutor.languages or '[]'),
                 'availability': json.loads(tutor.availability or '{}'),
+                'weekly_availability': decode_weekly_availability(tutor.availability_bitmap),
                 'hourly_rate': tutor.hourly_rate,
                 'rating': tutor.rating,
                 'total_sessions': tutor.total_sessions or 0,
@@ -1358,6 +1520,8 @@ def send_test_notification():
 @socketio.on('connect')
 def handle_connect(auth):
     """Handle client connection"""
+    # Socket.IO traffic bypasses before_request
+    start_services()
     user_id = auth.get('userId') if auth else None
     
     if user_id:
@@ -1456,6 +1620,8 @@ def handle_send_message_with_notification(data):
             file_name=file_name
         )
         db.session.add(message)
+        db.session.flush()
+        mark_conversation_read(conversation, sender_id, message.id)
         db.session.commit()
         
         # Broadcast via Socket.IO (for online users)
@@ -1613,6 +1779,24 @@ def handle_mark_as_read(data):
     message_ids = data.get('messageIds', [])
     
     print(f"✓ [SOCKET] User {user_id} read messages in {conversation_id}")
+
+    # Persist the read position for inbox unread counts (numeric ids only;
+    # rooms like "conversation:1:2" have no DB row)
+    try:
+        conversation = Conversation.query.get(int(conversation_id))
+        if conversation and user_id is not None:
+            read_up_to = max((int(i) for i in message_ids if str(i).isdigit()), default=None)
+            if read_up_to is None:
+                read_up_to = db.session.query(func.max(Message.id)).filter(
+                    Message.conversation_id == conversation.id
+                ).scalar() or 0
+            mark_conversation_read(conversation, user_id, read_up_to)
+            db.session.commit()
+    except (TypeError, ValueError):
+        pass
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ [SOCKET] Failed to save read position: {e}")
     
     # Notify sender that messages were read
     emit('messages_read', {
@@ -1840,6 +2024,11 @@ def update_student_profile_enhanced():
         profile.learning_goals = data['learning_goals']
     if 'available_time' in data:
         profile.available_time = data['available_time']
+    if 'weekly_availability' in data:
+        try:
+            set_weekly_availability(profile, data['weekly_availability'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     if 'preferred_languages' in data:
         profile.preferred_languages = json.dumps(data['preferred_languages'])
     
@@ -1869,6 +2058,10 @@ def update_student_profile_enhanced():
     if 'selected_goals' in data:
         profile.selected_goals = json.dumps(data['selected_goals'])
     db.session.commit()
+    student_feature_cache.invalidate(user_id)
+    sync_student_pool(user)
+    if profile.survey_completed:
+        match_precompute.submit(str(user_id))
     
     print("✅ [PROFILE UPDATE] Profile updated successfully")
     
@@ -1908,6 +2101,11 @@ def register_with_verification():
             print("[REGISTER] Password too short")
             return jsonify({'error': 'Password must be at least 8 characters'}), 400
         
+        # Admins are granted from the CLI, never self-registered
+        if data.get('role', 'student') not in ('student', 'tutor'):
+            print(f"[REGISTER] Invalid role: {data.get('role')}")
+            return jsonify({'error': 'Invalid role'}), 400
+        
         # Create new user
         hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
         
@@ -2423,8 +2621,13 @@ def delete_account():
         print(f"{'='*70}")
         
         # Delete user (cascade will handle related data)
+        pool_kind = 'tutor' if user.user_type == 'tutor' else 'student'
         db.session.delete(user)
         db.session.commit()
+        tutor_store.remove(user_id)
+        student_pool.remove(user_id)
+        student_feature_cache.invalidate(user_id)
+        publish_pool_change(pool_kind, user_id)
         
         print(f"✅ [DELETE ACCOUNT] User {user_id} deleted successfully")
         print(f"{'='*70}\n")
@@ -2572,45 +2775,101 @@ def get_tutor_stats():
 # ============================================================================
 # TUTOR MESSAGING ROUTES
 # ============================================================================
+MESSAGE_PAGE_SIZE = 50
+
+
+def conversation_message_page(conversation_id, limit, before_id=None, after_id=None):
+    """
+    One page of a conversation's messages by (timestamp, id), keyset-paged
+    on the (conversation_id, timestamp, id) index: (messages, next_cursor).
+    By default the newest page, before_id the page older than that message,
+    after_id the page newer than it. Messages come back oldest first;
+    next_cursor is the id to pass as the same parameter for the next page
+    (None on the last). Raises LookupError when the anchor message is not
+    in this conversation.
+    """
+    query = Message.query.filter(Message.conversation_id == conversation_id)
+    anchor_id = after_id if after_id is not None else before_id
+    if anchor_id is not None:
+        anchor = db.session.get(Message, anchor_id)
+        if not anchor or anchor.conversation_id != conversation_id:
+            raise LookupError(anchor_id)
+        if after_id is not None:
+            query = query.filter(
+                (Message.timestamp > anchor.timestamp) |
+                ((Message.timestamp == anchor.timestamp) & (Message.id > anchor.id))
+            )
+        else:
+            query = query.filter(
+                (Message.timestamp < anchor.timestamp) |
+                ((Message.timestamp == anchor.timestamp) & (Message.id < anchor.id))
+            )
+
+    if after_id is not None:
+        query = query.order_by(Message.timestamp.asc(), Message.id.asc())
+    else:
+        query = query.order_by(Message.timestamp.desc(), Message.id.desc())
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after_id is None:
+        rows.reverse()
+    if not has_more:
+        return rows, None
+    return rows, (rows[-1].id if after_id is not None else rows[0].id)
+
+
+def _message_dict(msg):
+    return {
+        'id': msg.id,
+        'sender_id': msg.sender_id,
+        'text': msg.text or '',
+        'timestamp': msg.timestamp.isoformat() if msg.timestamp else None,
+        'conversation_id': msg.conversation_id,
+        'file_url': msg.file_url,      # ✅ ALWAYS include
+        'file_type': msg.file_type,    # ✅ ALWAYS include
+        'file_name': msg.file_name     # ✅ ALWAYS include
+    }
+
+
 @app.route('/api/conversations/<int:conversation_id>/messages', methods=['GET'])
 def get_conversation_messages_from_db(conversation_id):
-    """Get message history from database - FIXED VERSION"""
+    """
+    Message history of a conversation, one page at a time: the newest
+    "limit" messages (default 50, max 100), or with "before_id"/"after_id"
+    the page older/newer than that message. Returns
+    {messages (oldest first), next_cursor, has_more}.
+    """
     try:
-        print(f"\n[MESSAGES] Fetching messages for conversation {conversation_id}")
-        
         conversation = Conversation.query.get(conversation_id)
         
         if not conversation:
             print(f"[MESSAGES] Conversation {conversation_id} not found")
             return jsonify({'error': 'Conversation not found'}), 404
-        
-        messages = Message.query.filter_by(
-            conversation_id=conversation_id
-        ).order_by(Message.timestamp.asc()).all()
-        
-        print(f"[MESSAGES] Found {len(messages)} messages in database")
-        
-        messages_list = []
-        for msg in messages:
-            message_data = {
-                'id': msg.id,
-                'sender_id': msg.sender_id,
-                'text': msg.text or '',
-                'timestamp': msg.timestamp.isoformat() if msg.timestamp else None,
-                'conversation_id': msg.conversation_id,
-                'file_url': msg.file_url,      # ✅ ALWAYS include
-                'file_type': msg.file_type,    # ✅ ALWAYS include
-                'file_name': msg.file_name     # ✅ ALWAYS include
-            }
-            
-            if msg.file_url:
-                print(f"[MESSAGES] Message {msg.id} has file: {msg.file_type} - {msg.file_name}")
-            
-            messages_list.append(message_data)
+
+        limit = request.args.get('limit', MESSAGE_PAGE_SIZE, type=int)
+        limit = max(1, min(100, limit))
+        before_id = request.args.get('before_id')
+        after_id = request.args.get('after_id')
+        if before_id is not None and after_id is not None:
+            return jsonify({'error': 'Use either before_id or after_id'}), 400
+        try:
+            before_id = int(before_id) if before_id is not None else None
+            after_id = int(after_id) if after_id is not None else None
+        except ValueError:
+            return jsonify({'error': 'Invalid message id'}), 400
+
+        try:
+            messages, next_cursor = conversation_message_page(
+                conversation_id, limit, before_id=before_id, after_id=after_id
+            )
+        except LookupError:
+            return jsonify({'error': 'Message not found in this conversation'}), 404
         
         return jsonify({
-            'messages': messages_list,
-            'total': len(messages_list)
+            'messages': [_message_dict(msg) for msg in messages],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         }), 200
         
     except Exception as e:
@@ -2623,9 +2882,126 @@ def get_conversation_messages_from_db(conversation_id):
         }), 500
 
 
+def mark_conversation_read(conversation, user_id, message_id):
+    """Move a participant's read position forward to message_id (never back)"""
+    # Socket payloads may carry ids as strings
+    user_id = str(user_id)
+    if str(conversation.participant1_id) == user_id:
+        conversation.participant1_last_read_id = max(conversation.participant1_last_read_id or 0, message_id)
+    elif str(conversation.participant2_id) == user_id:
+        conversation.participant2_last_read_id = max(conversation.participant2_last_read_id or 0, message_id)
+
+
+# Inbox order; conversations without a message yet sort last
+INBOX_EPOCH = datetime(1970, 1, 1)
+
+
+def conversation_inbox_query(user_id):
+    """
+    (Conversation, partner User, unread count) for one user's inbox, newest
+    first, as a single query: the partner is joined and unread messages
+    (the partner's, after the user's read position) are counted in a
+    correlated subquery on the (conversation_id, id) index.
+    """
+    is_first = Conversation.participant1_id == user_id
+    partner_id = case((is_first, Conversation.participant2_id), else_=Conversation.participant1_id)
+    last_read = case(
+        (is_first, Conversation.participant1_last_read_id),
+        else_=Conversation.participant2_last_read_id
+    )
+    unread = (
+        select(func.count(Message.id))
+        .where(
+            Message.conversation_id == Conversation.id,
+            Message.id > func.coalesce(last_read, 0),
+            Message.sender_id != user_id
+        )
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    return (
+        db.session.query(Conversation, User, unread.label('unread_count'))
+        .join(User, User.id == partner_id)
+        .filter((Conversation.participant1_id == user_id) | (Conversation.participant2_id == user_id))
+    )
+
+
+def inbox_sort_key():
+    return func.coalesce(Conversation.last_message_time, INBOX_EPOCH)
+
+
+def conversation_inbox(user_id, limit=None, cursor=None):
+    """
+    One page of a user's inbox by last_message_time (newest first):
+    ([(conversation, partner, unread_count)], next_cursor). `cursor` is
+    the next_cursor of the previous page; next_cursor is None on the last.
+    """
+    query = conversation_inbox_query(user_id)
+    sort_key = inbox_sort_key()
+    if cursor:
+        time_part, _, id_part = cursor.rpartition('_')
+        before_time = datetime.fromisoformat(time_part)
+        before_id = int(id_part)
+        query = query.filter(
+            (sort_key < before_time) |
+            ((sort_key == before_time) & (Conversation.id < before_id))
+        )
+    query = query.order_by(sort_key.desc(), Conversation.id.desc())
+    if limit is None:
+        return query.all(), None
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1][0]
+    return rows, f"{(last.last_message_time or INBOX_EPOCH).isoformat()}_{last.id}"
+
+
+def inbox_entry(conv, partner, unread_count):
+    return {
+        'id': conv.id,
+        'partnerId': partner.id,
+        'partnerName': partner.full_name,
+        'partnerAvatar': f'https://ui-avatars.com/api/?name={partner.full_name}',
+        'lastMessage': conv.last_message or '',
+        'lastMessageTime': conv.last_message_time.isoformat() if conv.last_message_time else None,
+        'unreadCount': unread_count
+    }
+
+
+def inbox_response(user_id, extra_fields=None):
+    """
+    Inbox JSON for the conversation list endpoints. Without "limit" the
+    whole inbox as a list (what the messaging views expect); with
+    "limit" (and "cursor") one page: {conversations, next_cursor}.
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is not None:
+        limit = max(1, min(100, limit))
+    try:
+        rows, next_cursor = conversation_inbox(user_id, limit, cursor)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    result = []
+    for conv, partner, unread_count in rows:
+        entry = inbox_entry(conv, partner, unread_count)
+        if extra_fields:
+            entry.update(extra_fields(partner))
+        result.append(entry)
+
+    if limit is None:
+        return jsonify(result), 200
+    return jsonify({'conversations': result, 'next_cursor': next_cursor}), 200
+
+
 @app.route('/api/tutors/<int:tutor_id>/conversations', methods=['GET', 'OPTIONS'])
 def get_tutor_conversations(tutor_id):
-    """Get all conversations for a tutor from database"""
+    """
+    Conversations of a tutor (by tutor profile id), newest first, with
+    unread counts. Optional "limit" and "cursor" paginate (see inbox_response).
+    """
     
     if request.method == 'OPTIONS':
         return '', 200
@@ -2638,41 +3014,11 @@ def get_tutor_conversations(tutor_id):
         if not tutor_profile:
             return jsonify({'error': 'Tutor not found'}), 404
         
-        user_id = tutor_profile.user_id
-        
-        # Get all conversations from database
-        conversations = Conversation.query.filter(
-            (Conversation.participant1_id == user_id) | 
-            (Conversation.participant2_id == user_id)
-        ).order_by(Conversation.last_message_time.desc()).all()
-        
-        print(f"[TUTOR CONV] Found {len(conversations)} conversations in database")
-        
-        result = []
-        for conv in conversations:
-            # Determine partner (student)
-            partner_id = conv.participant2_id if conv.participant1_id == user_id else conv.participant1_id
-            partner = User.query.get(partner_id)
-            
-            if partner:
-                # Count unread messages (optional)
-                unread_count = 0
-                
-                result.append({
-                    'id': conv.id,
-                    'partnerId': partner.id,
-                    'studentId': partner.id,  # ✅ Add this field for compatibility
-                    'partnerName': partner.full_name,
-                    'studentName': partner.full_name,  # ✅ Add this field for compatibility
-                    'partnerAvatar': f'https://ui-avatars.com/api/?name={partner.full_name}',
-                    'lastMessage': conv.last_message or '',
-                    'lastMessageTime': conv.last_message_time.isoformat() if conv.last_message_time else None,
-                    'unreadCount': unread_count
-                })
-                
-                print(f"[TUTOR CONV] Added conversation with {partner.full_name} (ID: {partner.id})")
-        
-        return jsonify(result), 200
+        # studentId/studentName: the tutor messaging view's field names
+        return inbox_response(tutor_profile.user_id, lambda partner: {
+            'studentId': partner.id,
+            'studentName': partner.full_name
+        })
         
     except Exception as e:
         print(f"❌ [TUTOR CONV ERROR] {str(e)}")
@@ -2683,40 +3029,152 @@ def get_tutor_conversations(tutor_id):
 
 @app.route('/api/students/<int:student_id>/conversations', methods=['GET'])
 def get_student_conversations(student_id):
-    """Get all conversations for a student from database"""
+    """
+    Conversations of a student, newest first, with unread counts.
+    Optional "limit" and "cursor" paginate (see inbox_response).
+    """
     try:
         user = User.query.get(student_id)
         
         if not user:
             return jsonify({'error': 'Student not found'}), 404
         
-        conversations = Conversation.query.filter(
-            (Conversation.participant1_id == student_id) | 
-            (Conversation.participant2_id == student_id)
-        ).order_by(Conversation.last_message_time.desc()).all()
-        
-        result = []
-        for conv in conversations:
-            partner_id = conv.participant2_id if conv.participant1_id == student_id else conv.participant1_id
-            partner = User.query.get(partner_id)
-            
-            if partner:
-                result.append({
-                    'id': conv.id,
-                    'partnerId': partner.id,
-                    'partnerName': partner.full_name,
-                    'partnerAvatar': f'https://ui-avatars.com/api/?name={partner.full_name}',
-                    'lastMessage': conv.last_message or '',
-                    'lastMessageTime': conv.last_message_time.isoformat() if conv.last_message_time else None
-                })
-        
-        return jsonify(result), 200
+        return inbox_response(student_id)
         
     except Exception as e:
         print(f"[ERROR] {str(e)}")
         return jsonify({'error': 'Failed to retrieve conversations'}), 500
 
 
+SYNC_PAGE_SIZE = 500
+
+
+def user_conversation_ids(user_id):
+    """Ids of a user's conversations (participant columns, both indexed)"""
+    return select(Conversation.id).where(
+        (Conversation.participant1_id == user_id) | (Conversation.participant2_id == user_id)
+    )
+
+
+@event.listens_for(db.session, 'before_flush')
+def stamp_sync_seqs(session, flush_context, instances):
+    """
+    Give each new message and each new or changed conversation (new message,
+    read position moved) the next sync seq. Seqs come from the
+    MessageSyncState row, which the UPDATE keeps locked until commit, so
+    they become visible in seq order - unlike message ids, which are handed
+    out at insert and can commit out of order.
+    """
+    changed = [obj for obj in session.new if isinstance(obj, (Message, Conversation))]
+    changed += [
+        obj for obj in session.dirty
+        if isinstance(obj, Conversation) and session.is_modified(obj)
+    ]
+    if not changed:
+        return
+    state = MessageSyncState.__table__
+    session.execute(
+        update(state).where(state.c.id == 1).values(seq=state.c.seq + len(changed))
+    )
+    last = session.execute(select(state.c.seq).where(state.c.id == 1)).scalar_one()
+    for seq, obj in enumerate(changed, start=last - len(changed) + 1):
+        obj.change_seq = seq
+
+
+def ensure_state_row(model, **values):
+    """Create a single-row state table's row (id=1) if it is missing"""
+    if db.session.get(model, 1) is None:
+        db.session.add(model(id=1, **values))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created it first
+            db.session.rollback()
+
+
+def message_sync(user_id, since, limit):
+    """
+    Everything a user missed since a cursor: (messages, conversations,
+    cursor, has_more). The cursor is a sync seq (see stamp_sync_seqs):
+    every seq up to the current head has committed, so "change_seq > since"
+    within the user's conversations (the (conversation_id, change_seq)
+    index) is exactly what is new. Conversations are the inbox rows (with
+    unread counts) of those that got a message or whose read position
+    moved. Without `since` only the current cursor is returned.
+    """
+    head = db.session.scalar(select(MessageSyncState.seq).where(MessageSyncState.id == 1)) or 0
+    if since is None:
+        return [], [], head, False
+
+    conversation_ids = user_conversation_ids(user_id)
+    messages = (
+        Message.query
+        .filter(
+            Message.conversation_id.in_(conversation_ids),
+            Message.change_seq > since,
+            Message.change_seq <= head
+        )
+        .order_by(Message.change_seq.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    # A partial page only covers changes up to its last message
+    cursor = messages[-1].change_seq if has_more else head
+
+    conversations = (
+        conversation_inbox_query(user_id)
+        .filter(
+            (Conversation.change_seq > since) & (Conversation.change_seq <= cursor)
+            | Conversation.id.in_({m.conversation_id for m in messages})
+        )
+        .order_by(inbox_sort_key().desc(), Conversation.id.desc())
+        .all()
+    )
+    return messages, conversations, cursor, has_more
+
+
+@app.route('/api/messages/sync', methods=['GET'])
+@jwt_required()
+def sync_messages():
+    """
+    Catch up after a reconnect in one request: every message the current
+    user has not seen since "since" (a cursor from an earlier call) across
+    all conversations, oldest first, plus the updated inbox rows of the
+    conversations that got a message or were read since. Returns {messages, conversations, cursor, has_more};
+    while has_more, call again with the returned cursor. Without "since"
+    only the current cursor is returned.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        since = request.args.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            if since < 0:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        limit = request.args.get('limit', SYNC_PAGE_SIZE, type=int)
+        limit = max(1, min(1000, limit))
+
+        messages, conversations, cursor, has_more = message_sync(user_id, since, limit)
+
+        return jsonify({
+            'messages': [_message_dict(msg) for msg in messages],
+            'conversations': [inbox_entry(*row) for row in conversations],
+            'cursor': cursor,
+            'has_more': has_more
+        }), 200
+
+    except Exception as e:
+        print(f"[SYNC ERROR] {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': 'Failed to sync messages'}), 500
+
+
 
 # ============================================================================
 # AUTHENTICATION ROUTES
@@ -2771,6 +3229,12 @@ def complete_tutor_onboarding():
         if 'availability' in data:
             profile.availability = json.dumps(data['availability'])
             print(f"[ONBOARDING] Updated availability")
+        if 'weekly_availability' in data:
+            try:
+                set_weekly_availability(profile, data['weekly_availability'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            print(f"[ONBOARDING] Updated weekly availability")
         if 'gender' in data:
             user.gender = data['gender']
         # ✅ CRITICAL: Set verified to True
@@ -2801,6 +3265,8 @@ def complete_tutor_onboarding():
             db.session.refresh(check)
             print(f"[ONBOARDING] After retry - verified: {check.verified}")
         
+        sync_tutor_store(check)
+        
         print(f"✅ [ONBOARDING] Profile completed! ID: {profile.id}")
         
         return jsonify({
@@ -2839,6 +3305,7 @@ def fix_profile(profile_id):
         db.session.commit()
         db.session.refresh(profile)
         print(f"[DEBUG] AFTER - verified: {profile.verified}")
+        sync_tutor_store(profile)
         
         return jsonify({
             'message': 'Profile updated',
@@ -2846,30 +3313,518 @@ def fix_profile(profile_id):
             'verified': profile.verified
         }), 200
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
-    
-@app.route('/api/login', methods=['POST', 'OPTIONS'])
-def login_alt():
-    """Alternative login endpoint without /auth/ prefix"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    return login()
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+@app.route('/api/login', methods=['POST', 'OPTIONS'])
+def login_alt():
+    """Alternative login endpoint without /auth/ prefix"""
+    if request.method == 'OPTIONS':
+        return '', 200
+    return login()
+
+
+
+
+# ============================================================================
+# ML-POWERED TUTOR MATCHING ENDPOINT
+# ============================================================================
+
+def init_outcome_journal():
+    """
+    Build the RL journal and recover model state (needs app context).
+    Compacted outcomes are archived for `flask rl replay` unless
+    RL_JOURNAL_ARCHIVE=0.
+    """
+    archive = os.getenv('RL_JOURNAL_ARCHIVE', '1') != '0'
+    if RL_STATE_BACKEND == 'db':
+        log = SharedOutcomeLog(
+            db.engine, RLOutcomeEvent.__table__, RLModelState.__table__,
+            archive=RLOutcomeArchive.__table__ if archive else None
+        )
+    else:
+        log = FileOutcomeLog(
+            os.getenv('RL_JOURNAL_DIR', 'rl_journal'),
+            fsync_interval=float(os.getenv('RL_JOURNAL_FSYNC_MS', 50)) / 1000,
+            archive=archive
+        )
+    journal = OutcomeJournal(
+        rl_system,
+        MODEL_PATH,
+        log,
+        snapshot_every=int(os.getenv('RL_SNAPSHOT_EVERY', 500)),
+        refresh_interval=float(os.getenv('RL_REFRESH_SECONDS', 1.0)),
+        before_release=reconcile_tutor_stats
+    )
+    had_snapshot = os.path.exists(MODEL_PATH)
+    journal.recover()
+    try:
+        # Outcomes journaled before a crash but never applied to tutor stats
+        reconcile_tutor_stats(log.read_after(0))
+    except Exception as e:
+        print(f"⚠️ [RL INGEST] Could not reconcile tutor stats: {e}")
+    atexit.register(journal.close)
+    if had_snapshot:
+        print(f"✓ Loaded existing RL model ({RL_STATE_BACKEND} journal)")
+    else:
+        print(f"✓ Starting with fresh RL model ({RL_STATE_BACKEND} journal)")
+    return journal
+
+
+def init_outcome_queue(journal):
+    """Start the background learner that applies queued outcomes"""
+    ingest = OutcomeIngestQueue(
+        journal,
+        on_batch=apply_outcome_batch,
+        max_batch=int(os.getenv('RL_INGEST_BATCH', 256)),
+        maxsize=int(os.getenv('RL_INGEST_QUEUE_SIZE', 10000))
+    ).start()
+    atexit.register(ingest.drain)  # runs before journal.close (LIFO)
+    return ingest
+
+
+def page_param(value, default, low, high=None):
+    """
+    A paging parameter from a JSON body (integer or numeric string),
+    clamped to [low, high]; `default` when absent. Raises ValueError.
+    """
+    if value is None:
+        return default
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'not an integer: {value!r}')
+    value = max(low, int(value))
+    return value if high is None else min(high, value)
+
+
+def validate_outcome(outcome):
+    """Error message for an outcome the learner could not apply, else None"""
+    if not isinstance(outcome, dict):
+        return 'Outcome must be an object'
+    rating = outcome.get('satisfaction_rating', 3)
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not 1 <= rating <= 5:
+        return 'satisfaction_rating must be a number from 1 to 5'
+    for key in ('response_time', 'punctuality_score'):
+        value = outcome.get(key, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f'{key} must be a number'
+    return None
+
+
+def apply_outcome_batch(records, rewards):
+    """Learner-thread side effects for one batch of applied outcomes"""
+    try:
+        apply_tutor_stats(records, rewards)
+    except Exception as e:
+        print(f"⚠️ [RL INGEST] Tutor stats update failed: {e}")
+
+
+# Outcome seqs per tutor-stats transaction when reconciling the journal
+TUTOR_STATS_CHUNK = 500
+
+
+def apply_tutor_stats(records, rewards=None):
+    """
+    Fold journaled outcomes into their tutors' rating/total_sessions with
+    one UPDATE computed in SQL (so batches from other workers never
+    overwrite each other), then tutor store sync. Each seq is marked in
+    rl_stats_applied in the same transaction, so an outcome counts once
+    however often it is passed in. `rewards` None marks an outcome the
+    model could not apply (not counted); without `rewards` all count.
+    """
+    if rewards is None:
+        rewards = [True] * len(records)
+    with app.app_context():
+        try:
+            floor = lock_stats_state()
+            done = set(db.session.scalars(
+                select(RLStatsApplied.seq).where(RLStatsApplied.seq.in_([r['seq'] for r in records]))
+            ))
+            fresh = [
+                (r, reward) for r, reward in zip(records, rewards)
+                if r['seq'] >= floor and r['seq'] not in done
+            ]
+            if not fresh:
+                db.session.commit()
+                return
+            db.session.execute(
+                insert(RLStatsApplied.__table__), [{'seq': r['seq']} for r, _ in fresh]
+            )
+            totals = defaultdict(lambda: [0, 0.0])  # tutor user id -> [count, rating sum]
+            for r, reward in fresh:
+                if reward is not None:
+                    totals[r['tutor_id']][0] += 1
+                    totals[r['tutor_id']][1] += r['outcome'].get('satisfaction_rating', 3)
+            if totals:
+                update_tutor_stats(totals)
+            db.session.commit()
+            if totals:
+                for profile in TutorProfile.query.filter(TutorProfile.user_id.in_(list(totals))).all():
+                    sync_tutor_store(profile)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+
+def lock_stats_state():
+    """
+    Lock the RLStatsState row for this transaction and return its floor.
+    Every tutor-stats transaction takes it first, so checking and setting
+    markers never interleaves with another worker or a prune.
+    """
+    state = RLStatsState.__table__
+    db.session.execute(update(state).where(state.c.id == 1).values(floor=state.c.floor))
+    return db.session.scalar(select(state.c.floor).where(state.c.id == 1)) or 0
+
+
+def update_tutor_stats(totals):
+    """One executemany UPDATE for {tutor user id: [count, rating sum]} (caller commits)"""
+    table = TutorProfile.__table__
+    sessions = func.coalesce(table.c.total_sessions, 0)
+    n = bindparam('b_count', type_=db.Integer)
+    total = bindparam('b_total', type_=db.Float)
+    db.session.connection().execute(
+        update(table)
+        .where(table.c.user_id == bindparam('b_user_id'))
+        .values(
+            # No usable rating yet: the batch average starts it
+            rating=case(
+                ((table.c.rating.is_(None)) | (table.c.rating == 0) | (sessions == 0), total / n),
+                else_=(table.c.rating * sessions + total) / (sessions + n)
+            ),
+            total_sessions=sessions + n
+        ),
+        [
+            {'b_user_id': uid, 'b_count': count, 'b_total': rating_sum}
+            for uid, (count, rating_sum) in totals.items()
+        ]
+    )
+
+
+def reconcile_tutor_stats(records):
+    """
+    Apply the tutor stats of journaled outcomes whose batch never ran (the
+    process died between journaling and applying them). Gets the journal's
+    live records at startup and, before each snapshot drops records from
+    the log, those records; anything already applied is skipped. Every
+    seq below the oldest record passed in is then applied, so the floor
+    moves up to it and older markers are pruned.
+    """
+    records = iter(records)
+    first = None
+    while True:
+        chunk = list(itertools.islice(records, TUTOR_STATS_CHUNK))
+        if not chunk:
+            break
+        if first is None:
+            first = chunk[0]['seq']
+        apply_tutor_stats(chunk)
+    if first is None:
+        return
+    with app.app_context():
+        try:
+            if lock_stats_state() < first:
+                db.session.execute(
+                    update(RLStatsState).where(RLStatsState.id == 1).values(floor=first)
+                )
+                db.session.execute(delete(RLStatsApplied).where(RLStatsApplied.seq < first))
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def weekly_availability_hex(profile):
+    """A profile's weekly availability bitmap as the matcher's hex string (None if unset)"""
+    return profile.availability_bitmap.hex() if profile.availability_bitmap else None
+
+
+def set_weekly_availability(profile, value):
+    """
+    Store a weekly availability payload ({day: [hours]} or 7 hour lists,
+    Monday first) in the profile's bitmap column. Raises ValueError.
+    """
+    weekly = encode_weekly_availability(value)
+    profile.availability_bitmap = bytes.fromhex(weekly) if weekly else None
+
+
+def tutor_matcher_profile(profile):
+    """Matcher input dict for one TutorProfile row"""
+    return {
+        'id': profile.user_id,
+        'expertise': json.loads(profile.expertise) if profile.expertise else [],
+        'languages': json.loads(profile.languages) if profile.languages else [],
+        'availability': json.loads(profile.availability) if profile.availability else {},
+        'weekly_availability': weekly_availability_hex(profile),
+        'rating': profile.rating if profile.rating is not None else None,
+        'total_sessions': profile.total_sessions or 0,
+        'gender': getattr(profile.user, 'gender', '') or '',
+        'teaching_style': getattr(profile, 'teaching_style', 'adaptive') or 'adaptive'
+    }
+
+
+def tutor_store_entry(profile):
+    """Matcher inputs plus match-card display fields for one tutor profile"""
+    return {
+        **tutor_matcher_profile(profile),
+        'name': profile.user.full_name,
+        'bio': profile.bio,
+        'hourly_rate': profile.hourly_rate,
+        'years_experience': getattr(profile, 'years_experience', ''),
+        'education': getattr(profile, 'education', ''),
+        'max_students': getattr(profile, 'max_students', None)
+    }
+
+
+def student_matcher_profile(profile):
+    """Matcher input dict for one StudentProfile row"""
+    return {
+        'learning_style': profile.learning_style,
+        'preferred_subjects': json.loads(profile.preferred_subjects or '[]'),
+        'skill_level': profile.skill_level,
+        'available_time': profile.available_time,
+        'preferred_languages': json.loads(profile.preferred_languages or '[]'),
+        'math_score': profile.math_score,
+        'science_score': profile.science_score,
+        'language_score': profile.language_score,
+        'tech_score': profile.tech_score,
+        'motivation_level': profile.motivation_level,
+        'tutor_gender_preference': profile.tutor_gender_preference or 'no_preference',
+        'selected_goals': json.loads(profile.selected_goals or '[]'),
+        'weekly_availability': weekly_availability_hex(profile)
+    }
+
+
+def load_student_matcher_profiles(student_ids):
+    """{student_id: matcher profile} for students with a completed survey"""
+    profiles = StudentProfile.query.filter(
+        StudentProfile.user_id.in_([int(sid) for sid in student_ids]),
+        StudentProfile.survey_completed == True
+    ).all()
+    loaded = {}
+    for profile in profiles:
+        try:
+            loaded[str(profile.user_id)] = student_matcher_profile(profile)
+        except Exception as e:
+            print(f"⚠️ [STUDENT FEATURES] Skipping student {profile.user_id}: {e}")
+    return loaded
+
+
+def student_features(student_id, fallback=None):
+    """
+    Cached StudentFeatureVector from the student's saved survey. `fallback`
+    (a client-sent profile dict) is only used when there is no survey yet.
+    """
+    vector = student_feature_cache.get(student_id, load_student_matcher_profiles)
+    if vector is None and fallback:
+        vector = rl_system.student_feature_vector(fallback)
+    return vector
+
+
+def sync_student_pool(user, publish=True):
+    """
+    Reflect a committed StudentProfile change in the reverse-matching pool
+    (and, with `publish`, in the other workers' pools)
+    """
+    try:
+        features = student_features(user.id)
+        if features is not None:
+            student_pool.upsert(user.id, features, user.full_name)
+        else:
+            student_pool.remove(user.id)
+    except Exception as e:
+        print(f"⚠️ [STUDENT POOL] Could not sync student {user.id}: {e}")
+    if publish:
+        publish_pool_change('student', user.id)
+
+
+def warm_student_pool():
+    """Load every student with a completed survey into the student pool"""
+    profiles = db.session.query(StudentProfile, User.full_name).join(
+        User, StudentProfile.user_id == User.id
+    ).filter(StudentProfile.survey_completed == True).all()
+
+    students = []
+    for profile, name in profiles:
+        try:
+            features = rl_system.student_feature_vector(student_matcher_profile(profile))
+            students.append((profile.user_id, features, name))
+        except Exception as e:
+            print(f"⚠️ [STUDENT POOL] Skipping student {profile.user_id}: {e}")
+
+    student_pool.load(students)
+    print(f"✓ Student pool warmed with {len(student_pool)} students")
+
+
+def sync_tutor_store(profile, publish=True):
+    """
+    Reflect a committed TutorProfile change in the in-memory tutor store
+    (and, with `publish`, in the other workers' stores)
+    """
+    try:
+        user = profile.user
+        if profile.verified and user and user.user_type == 'tutor':
+            tutor_store.upsert(tutor_store_entry(profile))
+        else:
+            tutor_store.remove(profile.user_id)
+    except Exception as e:
+        print(f"⚠️ [TUTOR STORE] Could not sync tutor {profile.user_id}: {e}")
+        tutor_store.remove(profile.user_id)
+    if publish:
+        publish_pool_change('tutor', profile.user_id)
+
+
+def warm_tutor_store():
+    """Load every verified tutor into the tutor store"""
+    tutors = db.session.query(TutorProfile).join(User).filter(
+        User.user_type == 'tutor',
+        TutorProfile.verified == True
+    ).all()
+
+    entries = []
+    for tutor in tutors:
+        try:
+            entries.append(tutor_store_entry(tutor))
+        except Exception as e:
+            print(f"⚠️ [TUTOR STORE] Skipping tutor {tutor.user_id}: {e}")
+
+    tutor_store.load(entries)
+    print(f"✓ Tutor store warmed with {len(tutor_store)} tutors")
+
+
+def init_pool_changes():
+    """
+    Pool change log shared by the workers (RL_STATE_BACKEND=db), else None.
+    Opened before the pools are warmed so no change in between is missed.
+    """
+    if RL_STATE_BACKEND != 'db':
+        return None
+    return SharedPoolChangeLog(
+        db.engine,
+        MatcherPoolChange.__table__,
+        MatcherPoolState.__table__,
+        poll_interval=float(os.getenv('RL_REFRESH_SECONDS', 1.0))
+    ).open()
+
+
+def publish_pool_change(kind, user_id):
+    """Tell the other workers a tutor/student changed (no-op with one worker)"""
+    if pool_changes is None:
+        return
+    try:
+        pool_changes.publish(kind, user_id)
+    except Exception as e:
+        print(f"⚠️ [POOL SYNC] Could not publish {kind} {user_id}: {e}")
 
 
+def refresh_matcher_pools(force=False):
+    """Apply tutor/student changes other workers published"""
+    if pool_changes is None:
+        return
+    try:
+        changes = pool_changes.poll(force=force)
+        if changes == SharedPoolChangeLog.RELOAD_ALL:
+            student_feature_cache.clear()
+            warm_tutor_store()
+            warm_student_pool()
+            return
+        if not changes:
+            return
+
+        tutor_ids = [uid for kind, uid in changes if kind == 'tutor']
+        profiles = {
+            p.user_id: p for p in TutorProfile.query.options(
+                db.joinedload(TutorProfile.user)
+            ).filter(TutorProfile.user_id.in_(tutor_ids)).all()
+        } if tutor_ids else {}
+        for uid in tutor_ids:
+            if uid in profiles:
+                sync_tutor_store(profiles[uid], publish=False)
+            else:
+                tutor_store.remove(uid)
+
+        student_ids = [uid for kind, uid in changes if kind == 'student']
+        users = {u.id: u for u in User.query.filter(User.id.in_(student_ids)).all()} if student_ids else {}
+        for uid in student_ids:
+            student_feature_cache.invalidate(uid)
+            if uid in users:
+                sync_student_pool(users[uid], publish=False)
+            else:
+                student_pool.remove(uid)
+    except Exception as e:
+        print(f"⚠️ [POOL SYNC] Could not apply pool changes: {e}")
 
 
-# ============================================================================
-# ML-POWERED TUTOR MATCHING ENDPOINT
-# ============================================================================
+_pools_lock = threading.Lock()
+_pools_warmed = False
+
+
+def ensure_matcher_pools():
+    """
+    Warm the tutor store and student pool on first use. A failure (e.g. a
+    DB whose migrations have not run yet) is logged and retried on the
+    next use rather than keeping the server from starting.
+    """
+    global _pools_warmed
+    if _pools_warmed:
+        return
+    with _pools_lock:
+        if _pools_warmed:
+            return
+        with app.app_context():
+            try:
+                warm_tutor_store()
+                warm_student_pool()
+                _pools_warmed = True
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ [MATCHER] Could not warm tutor/student pools: {e}")
+
+
+def refresh_shared_state(force=False):
+    """Catch up with other workers: RL outcomes, then tutor/student pools"""
+    ensure_matcher_pools()
+    outcome_journal.refresh(force=force)
+    refresh_matcher_pools(force=force)
+
+
+def precompute_student_matches(student_id):
+    """
+    Rank a student's matches from their saved StudentProfile and pin the
+    result in match_cache (runs on the precompute thread)
+    """
+    with app.app_context():
+        try:
+            student_profile = student_features(student_id)
+            if student_profile is None:
+                return
+            refresh_shared_state()
+        finally:
+            db.session.remove()
+    pool_version, tutor_matrix = tutor_store.snapshot()
+    rl_system.top_k_matches(
+        student_id,
+        student_profile,
+        tutor_matrix,
+        k=MATCH_PRECOMPUTE_K,
+        use_rl=True,
+        cache=match_cache,
+        pool_version=pool_version,
+        index=tutor_store.embedding_index,
+        pin=True
+    )
 
-def save_model_if_needed():
-    """Save model every 10 updates"""
-    global update_counter
-    update_counter += 1
-    if update_counter % 10 == 0:
-        rl_system.save_model(MODEL_PATH)
-        print(f"✓ Auto-saved RL model (update #{update_counter})")
+
+def init_match_precompute():
+    """Start the background thread that precomputes matches after surveys"""
+    precompute = MatchPrecomputeQueue(
+        precompute_student_matches,
+        maxsize=int(os.getenv('MATCH_PRECOMPUTE_QUEUE_SIZE', 1000))
+    ).start()
+    atexit.register(precompute.drain)
+    return precompute
 
 # ============================================================================
 # AGORA TOKEN ENDPOINT
@@ -2947,73 +3902,74 @@ def generate_agora_token():
 def get_tutor_matches():
     """
     Get RL-enhanced tutor recommendations
+
+    Matches are for the student's saved survey; "student_profile" in the
+    body is only needed (and used) before the survey is completed.
+    Paginated: "k" (page size, default 10, max 50) and "offset" (default 0).
+    The response carries "total" and "next_offset" (null on the last page).
+    "available_only": true keeps only tutors whose weekly availability
+    shares an hour with the student's (when the student has set one).
     """
     try:
         student_id = get_jwt_identity()
-        data = request.get_json()
+        data = request.get_json() or {}
         
-        student_profile = data.get('student_profile')
         use_rl = data.get('use_rl', True)
+        try:
+            k = page_param(data.get('k'), 10, 1, 50)
+            offset = page_param(data.get('offset'), 0, 0)
+        except ValueError:
+            return jsonify({'error': 'k and offset must be integers'}), 400
+        available_only = bool(data.get('available_only', False))
 
+        student_profile = student_features(student_id, fallback=data.get('student_profile'))
         if not student_profile:
             return jsonify({'error': 'Student profile required'}), 400
 
-        # Always enrich from DB to ensure gender pref and goals are present
-        from_db = StudentProfile.query.filter_by(user_id=int(student_id)).first()
-        if from_db:
-            if 'tutor_gender_preference' not in student_profile or not student_profile.get('tutor_gender_preference'):
-                student_profile['tutor_gender_preference'] = from_db.tutor_gender_preference or 'no_preference'
-            if 'selected_goals' not in student_profile:
-                student_profile['selected_goals'] = json.loads(from_db.selected_goals or '[]')
-
         print(f"[MATCH] tutor_gender_preference: {student_profile.get('tutor_gender_preference')}")
 
-        # Get all tutors from database
-        tutors = db.session.query(TutorProfile).join(User).filter(
-            User.user_type == 'tutor',
-            TutorProfile.verified == True
-        ).all()
-
-        # Convert to dict format for matching system
-        tutors_list = []
-        for tutor in tutors:
-            tutors_list.append({
-                'id': tutor.user_id,
-                'name': tutor.user.full_name,
-                'expertise': json.loads(tutor.expertise) if tutor.expertise else [],
-                'languages': json.loads(tutor.languages) if tutor.languages else [],
-                'availability': json.loads(tutor.availability) if tutor.availability else {},
-                'rating': tutor.rating if tutor.rating is not None else None,
-                'total_sessions': tutor.total_sessions or 0,
-                'gender': getattr(tutor.user, 'gender', '') or '',
-                'teaching_style': getattr(tutor, 'teaching_style', 'adaptive') or 'adaptive'
-            })
-
-        # Get matches using RL system
-        matches = rl_system.match_student_to_tutors(
+        # Tutor pool comes from the in-memory store (no DB reads, no JSON parsing);
+        # repeat requests with an unchanged profile are served from match_cache,
+        # including the ranking precomputed when the survey was saved (if it is
+        # still being computed, wait for it rather than scoring twice)
+        match_precompute.wait(student_id, timeout=MATCH_PRECOMPUTE_WAIT)
+        refresh_shared_state()
+        pool_version, tutor_matrix = tutor_store.snapshot()
+        matches, total = rl_system.top_k_matches(
             student_id,
             student_profile,
-            tutors_list,
-            use_rl=use_rl
+            tutor_matrix,
+            k=k,
+            offset=offset,
+            use_rl=use_rl,
+            cache=match_cache,
+            pool_version=pool_version,
+            index=tutor_store.embedding_index,
+            available_only=available_only
         )
 
-        # Enhance with additional tutor info
+        # Enhance with additional tutor info (keyed lookup in the store)
         enhanced_matches = []
-        for match in matches[:10]:  # Top 10
-            tutor = next((t for t in tutors if t.user_id == match['tutor_id']), None)
+        for match in matches:
+            tutor = tutor_store.get(match['tutor_id'])
             if tutor:
                 enhanced_matches.append({
                     **match,
-                    'bio': tutor.bio,
-                    'hourly_rate': tutor.hourly_rate,
-                    'years_experience': getattr(tutor, 'years_experience', ''),
-                    'education': getattr(tutor, 'education', '')
+                    'bio': tutor['bio'],
+                    'hourly_rate': tutor['hourly_rate'],
+                    'years_experience': tutor['years_experience'],
+                    'education': tutor['education']
                 })
 
+        next_offset = offset + k if offset + k < total else None
+
         return jsonify({
             'success': True,
             'matches': enhanced_matches,
-            'using_rl': use_rl
+            'using_rl': use_rl,
+            'total': total,
+            'offset': offset,
+            'next_offset': next_offset
         }), 200
 
     except Exception as e:
@@ -3021,78 +3977,125 @@ def get_tutor_matches():
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/tutor/matched-students', methods=['GET'])
+@jwt_required()
+def get_matched_students():
     """
-    Get RL-enhanced tutor recommendations
+    Students ranked by how well the calling tutor fits them (reverse matching)
+
+    Query: "k" (page size, default 10, max 50), "offset" (default 0) and
+    "use_rl" (default true). Scores are the ones each student would see
+    for this tutor; the response carries "total" and "next_offset".
     """
     try:
-        student_id = get_jwt_identity()
-        data = request.get_json()
-        
-        student_profile = data.get('student_profile')
-        use_rl = data.get('use_rl', True)
-        if 'tutor_gender_preference' not in student_profile:
-            from_db = StudentProfile.query.filter_by(user_id=int(student_id)).first()
-            if from_db:
-                student_profile['tutor_gender_preference'] = from_db.tutor_gender_preference or 'no_preference'
-                student_profile['selected_goals'] = json.loads(from_db.selected_goals or '[]')
-                
-                if not student_profile:
-                    return jsonify({'error': 'Student profile required'}), 400
-        
-        # Get all tutors from database
-        tutors = db.session.query(TutorProfile).join(User).filter(
-            User.user_type == 'tutor',
-            TutorProfile.verified == True
-        ).all()
-        
-        # Convert to dict format for matching system
-        tutors_list = []
-        for tutor in tutors:
-            tutors_list.append({
-                'id': tutor.user_id,
-                'name': tutor.user.full_name,
-                'expertise': json.loads(tutor.expertise) if tutor.expertise else [],
-                'languages': json.loads(tutor.languages) if tutor.languages else [],
-                'availability': json.loads(tutor.availability) if tutor.availability else {},
-                'rating': tutor.rating if tutor.rating else None,
-                'total_sessions': tutor.total_sessions or 0,
-                'gender': getattr(tutor.user, 'gender', ''),
-                'teaching_style': getattr(tutor, 'teaching_style', 'adaptive')
-            })
-        
-        # Get matches using RL system
-        matches = rl_system.match_student_to_tutors(
-            student_id,
-            student_profile,
-            tutors_list,
+        user_id = int(get_jwt_identity())
+        user = User.query.get(user_id)
+
+        if not user or user.user_type != 'tutor':
+            return jsonify({'error': 'Only tutors can see matched students'}), 403
+        if not user.tutor_profile:
+            return jsonify({'error': 'Tutor profile not found'}), 404
+
+        k = max(1, min(50, request.args.get('k', 10, type=int)))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        use_rl = request.args.get('use_rl', 'true').lower() != 'false'
+
+        # One vectorized pass over the in-memory student pool
+        refresh_shared_state()
+        matches, total = rl_system.rank_students(
+            tutor_matcher_profile(user.tutor_profile),
+            student_pool,
+            k=k,
+            offset=offset,
             use_rl=use_rl
         )
-        
-        # Enhance with additional tutor info
-        enhanced_matches = []
-        for match in matches[:10]:  # Top 10
-            tutor = next((t for t in tutors if t.user_id == match['tutor_id']), None)
-            if tutor:
-                enhanced_matches.append({
-                    **match,
-                    'bio': tutor.bio,
-                    'hourly_rate': tutor.hourly_rate,
-                    'years_experience': getattr(tutor, 'years_experience', ''),
-                    'education': getattr(tutor, 'education', '')
-                })
-        
+
+        next_offset = offset + k if offset + k < total else None
+
         return jsonify({
             'success': True,
-            'matches': enhanced_matches,
+            'matches': matches,
+            'using_rl': use_rl,
+            'total': total,
+            'offset': offset,
+            'next_offset': next_offset
+        }), 200
+
+    except Exception as e:
+        print(f"Error in get_matched_students: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/match/tutors/batch', methods=['POST'], endpoint="match_batch")
+@jwt_required()
+def get_tutor_matches_batch():
+    """
+    Match a cohort of students (e.g. an onboarding intake) in one pass.
+    Admin users only (see `flask users create-admin`).
+
+    Request body:
+    {
+        "student_ids": [12, 13, ...],  // user ids with a saved survey
+        "k": 10,                       // matches per student (max 50)
+        "use_rl": true,
+        "respect_capacity": false      // give each tutor at most max_students students
+    }
+    """
+    try:
+        # Batch matching exposes other students' matches and runs large
+        # scoring passes: staff only
+        caller = User.query.get(int(get_jwt_identity()))
+        if not caller or caller.user_type != 'admin':
+            return jsonify({'error': 'Only staff can run batch matching'}), 403
+
+        data = request.get_json() or {}
+        try:
+            student_ids = [int(sid) for sid in (data.get('student_ids') or [])]
+            k = page_param(data.get('k'), 10, 1, 50)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'student_ids and k must be integers'}), 400
+        use_rl = data.get('use_rl', True)
+        respect_capacity = bool(data.get('respect_capacity', False))
+
+        if not student_ids:
+            return jsonify({'error': 'student_ids required'}), 400
+        if len(student_ids) > 1000:
+            return jsonify({'error': 'At most 1000 students per batch'}), 400
+
+        students = list(student_feature_cache.get_many(
+            student_ids, load_student_matcher_profiles
+        ).items())
+
+        found = {int(sid) for sid, _ in students}
+        missing = [sid for sid in student_ids if sid not in found]
+
+        refresh_shared_state()
+        matches = rl_system.match_many(
+            students,
+            tutor_store.matrix(),
+            k=k,
+            use_rl=use_rl,
+            respect_capacity=respect_capacity
+        )
+
+        print(f"[MATCH BATCH] Matched {len(students)} students, {len(missing)} without profile")
+
+        return jsonify({
+            'success': True,
+            'matches': matches,
+            'missing_profiles': missing,
             'using_rl': use_rl
         }), 200
-        
+
     except Exception as e:
-        print(f"Error in get_tutor_matches: {str(e)}")
+        print(f"Error in get_tutor_matches_batch: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+
 @app.route('/api/debug/check-tutor-data', methods=['GET'])
 def check_tutor_data():
     """Check for tutors with invalid data"""
@@ -3188,6 +4191,7 @@ def test_match():
                     'expertise': expertise,
                     'languages': languages,
                     'availability': json.loads(tutor.availability) if tutor.availability else {},
+                    'weekly_availability': weekly_availability_hex(tutor),
                     'rating': tutor.rating or 4.0,
                     'total_sessions': tutor.total_sessions or 0,
                     'teaching_style': getattr(tutor, 'teaching_style', 'adaptive')
@@ -3221,6 +4225,37 @@ def test_match():
 # ASSIGNMENT ENDPOINTS
 # ============================================================================
 
+def student_assignments_query(user_id):
+    """
+    (Assignment, own submission, Course, tutor name, class average) for
+    every assignment in a student's enrolled courses, latest due first, in
+    one query. The class average (graded scores) is a correlated subquery
+    on the (assignment_id, status) index.
+    """
+    class_average = (
+        select(func.avg(AssignmentSubmission.score))
+        .where(
+            AssignmentSubmission.assignment_id == Assignment.id,
+            AssignmentSubmission.status == 'graded'
+        )
+        .correlate(Assignment)
+        .scalar_subquery()
+    )
+    enrolled_course_ids = select(Enrollment.course_id).where(Enrollment.student_id == user_id)
+    return (
+        db.session.query(
+            Assignment, AssignmentSubmission, Course, User.full_name, class_average.label('class_average')
+        )
+        .outerjoin(AssignmentSubmission, (AssignmentSubmission.assignment_id == Assignment.id) &
+                   (AssignmentSubmission.student_id == user_id))
+        .outerjoin(Course, Course.id == Assignment.course_id)
+        .outerjoin(TutorProfile, TutorProfile.id == Assignment.tutor_id)
+        .outerjoin(User, User.id == TutorProfile.user_id)
+        .filter(Assignment.course_id.in_(enrolled_course_ids))
+        .order_by(Assignment.due_date.desc())
+    )
+
+
 @app.route('/api/student/assignments', methods=['GET'])
 @jwt_required()
 def get_student_assignments():
@@ -3233,37 +4268,8 @@ def get_student_assignments():
         if not user or user.user_type != 'student':
             return jsonify({'error': 'Only students can access assignments'}), 403
         
-        # Get all enrolled courses
-        enrollments = Enrollment.query.filter_by(student_id=user_id).all()
-        course_ids = [e.course_id for e in enrollments]
-        
-        # Get assignments for enrolled courses
-        assignments = Assignment.query.filter(
-            Assignment.course_id.in_(course_ids)
-        ).order_by(Assignment.due_date.desc()).all()
-        
         assignments_list = []
-        for assignment in assignments:
-            # Get submission if exists
-            submission = AssignmentSubmission.query.filter_by(
-                assignment_id=assignment.id,
-                student_id=user_id
-            ).first()
-            
-            course = Course.query.get(assignment.course_id)
-            
-            # Calculate class average
-            all_submissions = AssignmentSubmission.query.filter_by(
-                assignment_id=assignment.id,
-                status='graded'
-            ).all()
-            
-            class_average = None
-            if all_submissions:
-                scores = [s.score for s in all_submissions if s.score is not None]
-                if scores:
-                    class_average = round(sum(scores) / len(scores), 1)
-            
+        for assignment, submission, course, professor, class_average in student_assignments_query(user_id):
             # Determine status
             status = 'pending'
             if submission:
@@ -3285,13 +4291,13 @@ def get_student_assignments():
                 'status': status,
                 'score': submission.score if submission else None,
                 'maxScore': assignment.max_score,
-                'classAverage': class_average,
+                'classAverage': round(float(class_average), 1) if class_average is not None else None,
                 'grade': submission.grade if submission else None,
                 'feedback': submission.feedback if submission else None,
                 'comments': submission.comments if submission else None,
                 'files': json.loads(submission.files) if submission and submission.files else [],
                 'lateSubmission': submission.late_submission if submission else False,
-                'professor': assignment.tutor.user.full_name if assignment.tutor else 'Unknown',
+                'professor': professor or 'Unknown',
                 'rubric': json.loads(submission.rubric_scores) if submission and submission.rubric_scores else []
             }
             
@@ -3525,7 +4531,7 @@ def record_match_outcome():
             "response_time": 2.5,  // hours
             "punctuality_score": 0.95  // 0-1
         },
-        "student_profile": {...},  // Current student profile
+        "student_profile": {...},  // Only used before the survey is completed
         "session_type": "initial" | "ongoing" | "completed"
     }
     """
@@ -3535,61 +4541,42 @@ def record_match_outcome():
         
         tutor_id = int(data.get('tutor_id'))
         outcome = data.get('outcome')
-        student_profile = data.get('student_profile')
+        student_profile = student_features(student_id, fallback=data.get('student_profile'))
         
         if not all([tutor_id, outcome, student_profile]):
             return jsonify({'error': 'Missing required fields'}), 400
+
+        invalid = validate_outcome(outcome)
+        if invalid:
+            return jsonify({'error': invalid}), 400
         
         # Get tutor profile
         tutor = db.session.query(TutorProfile).filter_by(user_id=tutor_id).first()
         if not tutor:
             return jsonify({'error': 'Tutor not found'}), 404
         
-        tutor_profile = {
-            'id': tutor.user_id,
-            'expertise': tutor.expertise or [],
-            'languages': tutor.languages or [],
-            'availability': tutor.availability or {},
-            'rating': tutor.rating or 4.0,
-            'total_sessions': tutor.total_sessions or 0,
-            'teaching_style': tutor.teaching_style or 'adaptive'
-        }
+        tutor_profile = tutor_matcher_profile(tutor)
         
-        # Record outcome in RL system
-        reward = rl_system.record_match_outcome(
+        # Queue for the background learner, which applies outcomes in
+        # batches and updates tutor rating/total_sessions (apply_outcome_batch)
+        queued = outcome_queue.submit(OutcomeJournal.make_record(
             student_id,
             tutor_id,
             student_profile,
             tutor_profile,
             outcome
-        )
-        
-        # Update tutor statistics in database
-        tutor.total_sessions = rl_system.tutor_performance[tutor_id]['total_matches']
-        
-        # Update average rating
-        satisfaction = outcome.get('satisfaction_rating', 3) / 5.0
-        if tutor.rating:
-            # Running average
-            n = tutor.total_sessions
-            tutor.rating = (tutor.rating * (n - 1) + (satisfaction * 5)) / n
-        else:
-            tutor.rating = satisfaction * 5
-        
-        db.session.commit()
-        
-        # Save model periodically
-        save_model_if_needed()
+        ))
+        if not queued:
+            return jsonify({'error': 'Too much feedback right now, please retry shortly'}), 503
         
         return jsonify({
             'success': True,
-            'reward': round(reward, 3),
-            'message': 'Outcome recorded and model updated'
-        }), 200
+            'queued': True,
+            'message': 'Outcome recorded; the model will update shortly'
+        }), 202
         
     except Exception as e:
         print(f"Error in record_match_outcome: {str(e)}")
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
@@ -3614,11 +4601,11 @@ def record_quick_feedback():
         
         completed = data.get('completed', True)
         
-        # Get student and tutor profiles
-        student = db.session.query(StudentProfile).filter_by(user_id=student_id).first()
+        # Get student features (cached, from the saved survey) and tutor profile
+        student_profile = student_features(student_id)
         tutor = db.session.query(TutorProfile).filter_by(user_id=tutor_id).first()
         
-        if not student or not tutor:
+        if not student_profile or not tutor:
             return jsonify({'error': 'Profile not found'}), 404
         
         # Create simplified outcome
@@ -3626,59 +4613,31 @@ def record_quick_feedback():
 
         if not outcome:
                 return jsonify({'error': 'Outcome required'}), 400
+
+        invalid = validate_outcome(outcome)
+        if invalid:
+            return jsonify({'error': invalid}), 400
         
-        student_profile = {
-            'preferred_subjects': student.preferred_subjects or [],
-            'skill_level': student.skill_level or 'intermediate',
-            'learning_style': student.learning_style or 'visual',
-            'available_time': student.available_time or 'evening',
-            'preferred_languages': student.preferred_languages or ['english'],
-            'math_score': student.math_score or 5,
-            'science_score': student.science_score or 5,
-            'language_score': student.language_score or 5,
-            'tech_score': student.tech_score or 5,
-            'motivation_level': student.motivation_level or 7
-        }
-        
-        tutor_profile = {
-            'id': tutor.user_id,
-            'expertise': tutor.expertise or [],
-            'languages': tutor.languages or [],
-            'availability': tutor.availability or {},
-            'rating': tutor.rating or 4.0,
-            'total_sessions': tutor.total_sessions or 0,
-            'teaching_style': tutor.teaching_style or 'adaptive'
-        }
+        tutor_profile = tutor_matcher_profile(tutor)
         
-        reward = rl_system.record_match_outcome(
+        queued = outcome_queue.submit(OutcomeJournal.make_record(
             student_id,
             tutor_id,
             student_profile,
             tutor_profile,
             outcome
-        )
-
-        # Sync to DB
-        tutor.total_sessions = rl_system.tutor_performance[tutor_id]['total_matches']
-        satisfaction = outcome.get('satisfaction_rating', 3) / 5.0
-        n = tutor.total_sessions
-        if tutor.rating and n > 1:
-            tutor.rating = (tutor.rating * (n - 1) + (satisfaction * 5)) / n
-        else:
-            tutor.rating = satisfaction * 5
-        db.session.commit()
-
-        save_model_if_needed()
+        ))
+        if not queued:
+            return jsonify({'error': 'Too much feedback right now, please retry shortly'}), 503
 
         return jsonify({
             'success': True,
-            'reward': round(reward, 3),
+            'queued': True,
             'message': 'Feedback recorded'
-        }), 200
+        }), 202
     except Exception as e:
         import traceback
         traceback.print_exc()
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
@@ -3689,7 +4648,9 @@ def get_tutor_performance(tutor_id):
     Get detailed performance metrics for a tutor
     """
     try:
-        perf = rl_system.tutor_performance[int(tutor_id)]
+        refresh_shared_state()
+        snapshot = rl_system.snapshot()
+        perf = snapshot.performance[int(tutor_id)]
         
         if perf['total_matches'] == 0:
             return jsonify({
@@ -3710,7 +4671,9 @@ def get_tutor_performance(tutor_id):
                 'student_retention': perf['student_retention'],
                 'response_time_score': perf['response_time_score'],
                 'reliability_score': perf['reliability_score'],
-                'overall_score': rl_system.calculate_tutor_performance_score(tutor_id)
+                'overall_score': rl_system.calculate_tutor_performance_score(
+                    int(tutor_id), snapshot
+                )
             }
         }), 200
         
@@ -3727,9 +4690,10 @@ def get_student_preferences():
     """
     try:
         student_id = get_jwt_identity()
-        prefs = rl_system.student_preferences[student_id]
+        refresh_shared_state()
+        summary = rl_system.student_summary(student_id)
         
-        if not prefs['match_history']:
+        if summary is None:
             return jsonify({
                 'success': True,
                 'has_data': False,
@@ -3739,15 +4703,7 @@ def get_student_preferences():
         return jsonify({
             'success': True,
             'has_data': True,
-            'preferences': {
-                'total_matches': len(prefs['match_history']),
-                'avg_satisfaction': (
-                    sum(prefs['satisfaction_history']) / len(prefs['satisfaction_history'])
-                    if prefs['satisfaction_history'] else 0
-                ),
-                'weight_adjustments': prefs['weight_adjustments'],
-                'recent_matches': prefs['match_history'][-5:]  # Last 5
-            }
+            'preferences': summary
         }), 200
         
     except Exception as e:
@@ -3762,10 +4718,12 @@ def admin_save_model():
     """Admin endpoint to manually save model"""
     try:
         # Check if admin (you'd add proper admin check here)
-        rl_system.save_model(MODEL_PATH)
+        outcome_queue.wait_idle(timeout=10)
+        journal_seq = outcome_journal.snapshot()
         return jsonify({
             'success': True,
-            'message': 'Model saved successfully'
+            'message': 'Model saved successfully',
+            'journal_seq': journal_seq
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -3776,12 +4734,11 @@ def admin_save_model():
 def admin_get_stats():
     """Get overall RL system statistics"""
     try:
-        total_tutors = len(rl_system.tutor_performance)
+        refresh_shared_state(force=True)
+        snapshot = rl_system.snapshot()
+        total_tutors = len(snapshot.performance)
         total_students = len(rl_system.student_preferences)
-        total_matches = sum(
-            perf['total_matches'] 
-            for perf in rl_system.tutor_performance.values()
-        )
+        total_matches = int(snapshot.performance.records['total_matches'].sum())
         
         return jsonify({
             'success': True,
@@ -3789,8 +4746,22 @@ def admin_get_stats():
                 'total_tutors_tracked': total_tutors,
                 'total_students_tracked': total_students,
                 'total_matches_recorded': total_matches,
-                'model_updates': update_counter,
-                'exploration_rate': rl_system.epsilon
+                'model_updates': outcome_journal.appended,
+                'journal': outcome_journal.stats(),
+                'ingest_queue': outcome_queue.stats(),
+                'exploration_rate': rl_system.epsilon,
+                'model_version': snapshot.version,
+                'q_table_states': len(rl_system.q_table),
+                'q_table_pairs': rl_system.q_table.n_pairs,
+                'tutor_pool_size': len(tutor_store),
+                'tutor_pool_version': tutor_store.version,
+                'student_pool_size': len(student_pool),
+                'match_cache': match_cache.stats(),
+                'match_precompute': match_precompute.stats(),
+                'student_features': student_feature_cache.stats(),
+                'pool_changes': pool_changes.stats() if pool_changes else None,
+                'embedding_index': (tutor_store.embedding_index.stats()
+                                    if tutor_store.embedding_index else None)
             }
         }), 200
     except Exception as e:
@@ -3960,6 +4931,15 @@ def save_student_survey():
             'evening'
         )
         print(f"[SURVEY] Availability: {profile.available_time}")
+
+        # Optional hour-level weekly availability ({day: [hours]})
+        weekly = data.get('weekly_availability') or data.get('weeklyAvailability')
+        if weekly is not None:
+            try:
+                set_weekly_availability(profile, weekly)
+            except ValueError as e:
+                print(f"[SURVEY ERROR] Invalid weekly availability: {e}")
+                return jsonify({'error': str(e)}), 400
         
         # Handle languages
         languages = (
@@ -4015,6 +4995,13 @@ def save_student_survey():
         db.session.commit()
         
         print(f"✅ [SURVEY] Successfully saved survey for user {user_id}")
+
+        # Rank this student's tutors in the background so the match screen
+        # that follows the survey is served from match_cache
+        student_feature_cache.invalidate(user_id)
+        sync_student_pool(user)
+        if not match_precompute.submit(str(user_id)):
+            print(f"⚠️ [SURVEY] Match precompute queue full, skipping user {user_id}")
         
         response_data = {
             'message': 'Survey saved successfully',
@@ -4024,6 +5011,7 @@ def save_student_survey():
                 'preferred_subjects': json.loads(profile.preferred_subjects or '[]'),
                 'skill_level': profile.skill_level,
                 'available_time': profile.available_time,
+                'weekly_availability': decode_weekly_availability(profile.availability_bitmap),
                 'survey_completed': profile.survey_completed,
                 'tutor_gender_preference': profile.tutor_gender_preference,  # ← add this
                 'selected_goals': json.loads(profile.selected_goals or '[]')
@@ -4075,6 +5063,7 @@ def get_student_profile_enhanced():
             'skill_level': profile.skill_level,
             'learning_goals': profile.learning_goals,
             'available_time': profile.available_time,
+            'weekly_availability': decode_weekly_availability(profile.availability_bitmap),
             'preferred_languages': json.loads(profile.preferred_languages or '[]'),
             'survey_completed': profile.survey_completed,
             
@@ -4917,6 +5906,7 @@ def get_tutor_profile_enhanced():
             'total_sessions': profile.total_sessions,
             'languages': json.loads(profile.languages or '[]'),
             'availability': json.loads(profile.availability or '{}'),
+            'weekly_availability': decode_weekly_availability(profile.availability_bitmap),
             'verified': profile.verified,
             
             # Additional fields (using getattr for safety)
@@ -4977,6 +5967,12 @@ def update_tutor_profile_enhanced():
     if 'availability' in data:
         profile.availability = json.dumps(data['availability'])
         print(f"  📅 Updated availability: {sum(data['availability'].values())} slots")
+    if 'weekly_availability' in data:
+        try:
+            set_weekly_availability(profile, data['weekly_availability'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        print(f"  📅 Updated weekly availability")
     if 'gender' in data:
         user.gender = data['gender']
     # Additional fields - using setattr for safety
@@ -5010,7 +6006,8 @@ def update_tutor_profile_enhanced():
         profile.languages and len(json.loads(profile.languages)) > 0,
         getattr(profile, 'years_experience', ''),
         getattr(profile, 'education', ''),
-        profile.availability and any(json.loads(profile.availability).values())
+        (profile.availability and any(json.loads(profile.availability).values()))
+        or profile.availability_bitmap
     ])
     
     # Mark as verified if complete
@@ -5024,6 +6021,7 @@ def update_tutor_profile_enhanced():
     try:
         db.session.commit()
         print("✅ [TUTOR PROFILE UPDATE] Profile committed to database successfully")
+        sync_tutor_store(profile)
     except Exception as e:
         db.session.rollback()
         print(f"❌ [TUTOR PROFILE ERROR] Database commit failed: {str(e)}")
@@ -5042,6 +6040,7 @@ def update_tutor_profile_enhanced():
             'hourly_rate': profile.hourly_rate,
             'languages': json.loads(profile.languages or '[]'),
             'availability': json.loads(profile.availability or '{}'),
+            'weekly_availability': decode_weekly_availability(profile.availability_bitmap),
             'teaching_style': getattr(profile, 'teaching_style', 'adaptive'),
             'years_experience': getattr(profile, 'years_experience', ''),
             'education': getattr(profile, 'education', ''),
@@ -5139,6 +6138,8 @@ def update_user_info():
         
         db.session.commit()
         print("✅ [USER UPDATE] User info committed to database")
+        if user.tutor_profile:
+            sync_tutor_store(user.tutor_profile)
         
         return jsonify({
             'message': 'User info updated successfully',
@@ -5619,6 +6620,8 @@ def verify_all_tutors():
                 print(f"✅ Verified tutor {tutor.id}")
         
         db.session.commit()
+        for tutor in tutors:
+            sync_tutor_store(tutor)
         
         return jsonify({
             'message': f'Verified {count} tutors',
@@ -5840,15 +6843,373 @@ def get_tutor_assignments():
 
 
 
+# ============================================================================
+# RL OFFLINE TRAINING CLI
+# ============================================================================
+
+rl_cli = AppGroup('rl', help='Offline RL matcher training.')
+
+
+def load_outcome_replay(source, fmt):
+    """
+    OutcomeReplay loaded from a JSONL file/journal dir, Parquet file, or
+    the DB journal (archive included). Refuses a history with missing
+    seqs (e.g. compacted without an archive): a model rebuilt from part
+    of the outcomes would silently replace the learned state.
+    """
+    if fmt == 'db':
+        records = SharedOutcomeLog(
+            db.engine, RLOutcomeEvent.__table__, RLModelState.__table__,
+            archive=RLOutcomeArchive.__table__
+        ).read_history()
+    elif fmt == 'parquet':
+        records = read_outcome_parquet(source)
+    else:
+        records = read_outcome_jsonl(source)
+
+    last_seq = [0]
+
+    def tracked(records):
+        for record in records:
+            seq = record.get('seq')
+            if seq is not None:
+                if seq != last_seq[0] + 1:
+                    raise click.ClickException(
+                        f"Outcome history is incomplete: expected seq {last_seq[0] + 1}, "
+                        f"found {seq}. Outcomes compacted before the journal archive "
+                        f"existed cannot be replayed.")
+                last_seq[0] = seq
+            yield record
+
+    started = time.perf_counter()
+    replay = OutcomeReplay(RLTutorMatchingSystem()).load(tracked(records))
+    print(f"✓ Loaded {replay.size} outcomes ({replay.skipped} skipped) "
+          f"in {time.perf_counter() - started:.1f}s")
+    return replay, last_seq[0]
+
+
+def parse_grid(values, cast=float):
+    return [cast(v) for v in values.split(',') if v.strip()]
+
+
+@rl_cli.command('replay')
+@click.option('--source', default='rl_journal', show_default=True,
+              help='JSONL file, journal directory or Parquet file (ignored for --format db).')
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'parquet', 'db']),
+              default='jsonl', show_default=True)
+@click.option('--output', default='rl_model.replay.pkl', show_default=True)
+@click.option('--learning-rate', type=float, default=None)
+@click.option('--discount-factor', type=float, default=None)
+@click.option('--epsilon', type=float, default=None)
+def rl_replay(source, fmt, output, learning_rate, discount_factor, epsilon):
+    """Rebuild the RL model from the full outcome history."""
+    replay, last_seq = load_outcome_replay(source, fmt)
+    started = time.perf_counter()
+    matcher = replay.build(learning_rate, discount_factor, epsilon)
+    print(f"✓ Rebuilt model in {time.perf_counter() - started:.1f}s: "
+          f"{len(matcher.q_table)} states, {len(matcher.tutor_performance)} tutors, "
+          f"{len(matcher.student_preferences)} students")
+    # journal_seq lets the journal replay only newer outcomes on top of it
+    matcher.save_model(output, extra={'journal_seq': last_seq})
+
+
+@rl_cli.command('sweep')
+@click.option('--source', default='rl_journal', show_default=True)
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'parquet', 'db']),
+              default='jsonl', show_default=True)
+@click.option('--learning-rates', default='0.05,0.1,0.2,0.3', show_default=True)
+@click.option('--discount-factors', default='0.5,0.8,0.95', show_default=True)
+@click.option('--epsilons', default='0.05,0.15,0.3', show_default=True)
+@click.option('--holdout', type=float, default=0.2, show_default=True,
+              help='Fraction of the newest outcomes held out for scoring.')
+@click.option('--processes', type=int, default=None, help='Worker processes (default: CPU count).')
+def rl_sweep(source, fmt, learning_rates, discount_factors, epsilons, holdout, processes):
+    """Grid-search learning_rate/discount_factor/epsilon on the outcome history."""
+    replay, _ = load_outcome_replay(source, fmt)
+    grid = [
+        (lr, gamma, eps)
+        for lr in parse_grid(learning_rates)
+        for gamma in parse_grid(discount_factors)
+        for eps in parse_grid(epsilons)
+    ]
+    started = time.perf_counter()
+    results = replay.sweep(grid, holdout=holdout, processes=processes)
+    if not results:
+        print("⚠️ Nothing to sweep (no outcomes or empty grid)")
+        return
+    print(f"✓ Swept {len(grid)} configurations in {time.perf_counter() - started:.1f}s "
+          f"(held-out coverage {results[0]['coverage']:.0%})")
+    print(f"{'lr':>6} {'gamma':>6} {'eps':>6} {'policy':>8} {'logged':>8}")
+    for r in results:
+        print(f"{r['learning_rate']:>6g} {r['discount_factor']:>6g} {r['epsilon']:>6g} "
+              f"{r['policy_value']:>8.4f} {r['logged_value']:>8.4f}")
+
+
+app.cli.add_command(rl_cli)
+
+
+# ============================================================================
+# USER ADMIN CLI
+# ============================================================================
+
+users_cli = AppGroup('users', help='User administration.')
+
+
+@users_cli.command('create-admin')
+@click.argument('email')
+@click.option('--name', default='Staff', show_default=True)
+@click.password_option()
+def users_create_admin(email, name, password):
+    """Create a staff (admin) account; it has no student/tutor profile."""
+    if User.query.filter_by(email=email).first():
+        raise click.ClickException(f'User already exists: {email}')
+    if len(password) < 8:
+        raise click.ClickException('Password must be at least 8 characters')
+    db.session.add(User(
+        email=email,
+        password_hash=bcrypt.generate_password_hash(password).decode('utf-8'),
+        full_name=name,
+        user_type='admin',
+        email_verified=True,
+        failed_login_attempts=0
+    ))
+    db.session.commit()
+    print(f"✓ Created admin {email}")
+
+
+app.cli.add_command(users_cli)
+
+
+# ============================================================================
+# QUERY PLAN CHECK
+# ============================================================================
+
+perf_cli = AppGroup('perf', help='Database performance checks.')
+
+# Hot lookup paths, built the way the endpoints build them, with sample
+# parameters. `flask perf query-plans` fails if any needs a full table
+# scan; register new hot queries here with @hot_query.
+HOT_QUERIES = {}
+
+
+def hot_query(name):
+    def register(build):
+        HOT_QUERIES[name] = build
+        return build
+    return register
+
+
+@hot_query('messages of a conversation')
+def hot_conversation_messages():
+    return Message.query.filter_by(conversation_id=1).order_by(
+        Message.timestamp.desc(), Message.id.desc()
+    ).limit(51)
+
+
+@hot_query('older page of a conversation')
+def hot_conversation_messages_before():
+    ts = datetime(2026, 1, 1)
+    return Message.query.filter(
+        Message.conversation_id == 1,
+        (Message.timestamp < ts) | ((Message.timestamp == ts) & (Message.id < 100))
+    ).order_by(Message.timestamp.desc(), Message.id.desc()).limit(51)
+
+
+@hot_query('new messages of a user since a cursor')
+def hot_message_sync():
+    return Message.query.filter(
+        Message.conversation_id.in_(user_conversation_ids(1)),
+        Message.change_seq > 100, Message.change_seq <= 200
+    ).order_by(Message.change_seq.asc()).limit(501)
+
+
+@hot_query('conversation between two users')
+def hot_conversation_between():
+    return Conversation.query.filter(
+        ((Conversation.participant1_id == 1) & (Conversation.participant2_id == 2)) |
+        ((Conversation.participant1_id == 2) & (Conversation.participant2_id == 1))
+    ).limit(1)
+
+
+@hot_query('conversations of a user')
+def hot_user_conversations():
+    return Conversation.query.filter(
+        (Conversation.participant1_id == 1) | (Conversation.participant2_id == 1)
+    ).order_by(Conversation.last_message_time.desc())
+
+
+@hot_query('conversation inbox of a user')
+def hot_conversation_inbox():
+    return conversation_inbox_query(1).order_by(inbox_sort_key().desc(), Conversation.id.desc())
+
+
+@hot_query('active FCM tokens of a user')
+def hot_fcm_tokens():
+    return FCMToken.query.filter_by(user_id=1, is_active=True)
+
+
+@hot_query('enrollment of a student in a course')
+def hot_enrollment():
+    return Enrollment.query.filter_by(student_id=1, course_id=1).limit(1)
+
+
+@hot_query('enrollments of a student')
+def hot_student_enrollments():
+    return Enrollment.query.filter_by(student_id=1)
+
+
+@hot_query('assignments of courses')
+def hot_course_assignments():
+    return Assignment.query.filter(
+        Assignment.course_id.in_([1, 2])
+    ).order_by(Assignment.due_date.desc())
+
+
+@hot_query('assignments of a student')
+def hot_student_assignments():
+    return student_assignments_query(1)
+
+
+@hot_query('submission of a student')
+def hot_student_submission():
+    return AssignmentSubmission.query.filter_by(assignment_id=1, student_id=1).limit(1)
+
+
+@hot_query('graded submissions of an assignment')
+def hot_graded_submissions():
+    return AssignmentSubmission.query.filter_by(assignment_id=1, status='graded')
+
+
+@hot_query('submissions of an assignment')
+def hot_assignment_submissions():
+    return AssignmentSubmission.query.filter_by(
+        assignment_id=1
+    ).order_by(AssignmentSubmission.submitted_at.desc())
+
+
+@hot_query('latest session of a student/tutor pair')
+def hot_latest_session():
+    return TutoringSession.query.filter(
+        TutoringSession.student_id == 1,
+        TutoringSession.tutor_user_id == 2
+    ).order_by(TutoringSession.started_at.desc()).limit(1)
+
+
+@hot_query('offline download of a course')
+def hot_offline_download():
+    return OfflineDownload.query.filter_by(user_id=1, course_id=1).limit(1)
+
+
+@hot_query('offline downloads of a user')
+def hot_user_downloads():
+    return OfflineDownload.query.filter_by(user_id=1)
+
+
+@hot_query('materials of a course')
+def hot_course_materials():
+    return CourseMaterial.query.filter_by(course_id=1).order_by(CourseMaterial.order)
+
+
+@hot_query('materials of a section')
+def hot_section_materials():
+    return CourseMaterial.query.filter_by(section_id=1).order_by(CourseMaterial.order)
+
+
+@hot_query('sections of a course')
+def hot_course_sections():
+    return CourseSection.query.filter_by(course_id=1).order_by(CourseSection.order)
+
+
+@hot_query('tutor profile of a user')
+def hot_tutor_profile():
+    return TutorProfile.query.filter_by(user_id=1).limit(1)
+
+
+def query_plan(query):
+    """(plan lines, fully scanned tables) of a Query on the app database"""
+    compiled = query.statement.compile(db.engine, compile_kwargs={'render_postcompile': True})
+    with db.engine.connect() as conn:
+        if db.engine.dialect.name == 'sqlite':
+            params = tuple(compiled.params[name] for name in compiled.positiontup)
+            rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params)
+            plan = [row[-1] for row in rows]
+            scans = [m.group(1) for m in (re.match(r'SCAN (\w+)', line) for line in plan) if m]
+        else:
+            # Postgres: with seq scans disabled, one only remains when no
+            # index can serve the query (small tables would otherwise hide it)
+            conn.exec_driver_sql('SET enable_seqscan = off')
+            rows = conn.exec_driver_sql('EXPLAIN ' + str(compiled), compiled.params)
+            plan = [row[0] for row in rows]
+            scans = re.findall(r'Seq Scan on (\w+)', '\n'.join(plan))
+    return plan, scans
+
+
+@perf_cli.command('query-plans')
+@click.option('--verbose', is_flag=True, help='Print every plan, not only failing ones.')
+def perf_query_plans(verbose):
+    """Fail if a registered hot query falls back to a full table scan."""
+    failed = []
+    for name, build in HOT_QUERIES.items():
+        plan, scans = query_plan(build())
+        if scans:
+            failed.append(name)
+            print(f"❌ {name}: full scan of {', '.join(scans)}")
+        else:
+            print(f"✓ {name}")
+        if scans or verbose:
+            for line in plan:
+                print(f"    {line}")
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} of {len(HOT_QUERIES)} hot queries need a full table scan")
+    print(f"✓ All {len(HOT_QUERIES)} hot queries use an index")
+
+
+app.cli.add_command(perf_cli)
+
+
 # ============================================================================
 # INITIALIZE DATABASE
 # ============================================================================
 
-with app.app_context():
-    db.create_all()
+# Nothing here runs on import: `flask db upgrade` and the other CLI commands
+# must work on a DB that is not migrated yet and must not touch RL state.
+# The server calls start_services once per process instead (gunicorn's
+# post_worker_init, `python app.py`, else the first request or socket).
+_services_lock = threading.Lock()
+_services_started = False
+
+
+def start_services():
+    """
+    Create missing tables, recover the RL journal and start the background
+    learner and precompute threads (once). The matcher pools are warmed on
+    first use, see ensure_matcher_pools
+    """
+    global outcome_journal, outcome_queue, pool_changes, match_precompute, _services_started
+    if _services_started:
+        return
+    with _services_lock:
+        if _services_started:
+            return
+        with app.app_context():
+            db.create_all()
+            ensure_state_row(MessageSyncState, seq=0)
+            ensure_state_row(RLStatsState, floor=0)
+            outcome_journal = init_outcome_journal()
+            outcome_queue = init_outcome_queue(outcome_journal)
+            pool_changes = init_pool_changes()
+            match_precompute = init_match_precompute()
+        _services_started = True
+
+
+@app.before_request
+def ensure_services():
+    start_services()
 
 
 if __name__ == '__main__':
+    start_services()
     port = int(os.environ.get('PORT', 10000))
     socketio.run(
         app,
@@ -0,0 +1,298 @@
+"""
+Benchmarks for the RL tutor matcher.
+
+Generates synthetic tutors and students from the matcher's own
+vocabularies (subject_groups, the survey's learning styles, time slots
+and languages) and, at each tutor pool size, times:
+
+    match_student_to_tutors   scalar scoring over the full tutor list
+    top_k_matches             what /api/match/tutors calls (matrix path)
+    record_match_outcome      one learner update
+    save_model / load_model   model pickle round trip
+
+Each size runs in a fresh process so peak RSS belongs to that size.
+Reports p50/p99 latency, bytes allocated per call (tracemalloc peak)
+and peak RSS, and compares against a stored baseline:
+
+    python bench_matcher.py --save-baseline        # record bench_baseline.json
+    python bench_matcher.py                        # exit 1 on a regression
+    python bench_matcher.py --sizes 100,1000 --budget 1
+
+Baselines are only comparable on the machine that recorded them.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from ml_matcher import RLTutorMatchingSystem
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# Vocabularies used by the survey, onboarding and profile forms
+SUBJECTS = sorted({
+    subject for keywords in RLTutorMatchingSystem().subject_groups.values() for subject in keywords
+} | {'history', 'business', 'economics', 'geography'})
+SURVEY_SUBJECTS = ['Mathematics', 'Science', 'English', 'Physics', 'Chemistry', 'Biology',
+                   'Computer Science', 'History', 'Art', 'Music', 'Business', 'Languages']
+LANGUAGES = ['English', 'Spanish', 'French', 'Mandarin', 'Hindi', 'Arabic', 'Portuguese', 'Russian']
+LEARNING_STYLES = ['visual', 'auditory', 'kinesthetic', 'hands-on']
+TEACHING_STYLES = ['adaptive', 'structured', 'interactive', 'hands-on']
+SKILL_LEVELS = ['beginner', 'intermediate', 'advanced']
+TIME_SLOTS = ['morning', 'afternoon', 'evening']
+AVAILABILITY_SLOTS = TIME_SLOTS + ['weekends']
+GOALS = ['exam prep', 'homework help', 'career change', 'university admission', 'hobby']
+
+OPERATIONS = ['match_student_to_tutors', 'top_k_matches', 'record_match_outcome',
+              'save_model', 'load_model']
+
+
+def _popular(rnd, items, k):
+    """k distinct items, earlier ones more likely (a few subjects dominate)"""
+    weights = [1.0 / (rank + 1) for rank in range(len(items))]
+    picked = []
+    while len(picked) < k:
+        item = rnd.choices(items, weights)[0]
+        if item not in picked:
+            picked.append(item)
+    return picked
+
+
+def make_tutor(i, rnd):
+    """A tutor_store_entry()-shaped dict"""
+    sessions = int(rnd.paretovariate(1.2)) - 1
+    return {
+        'id': i,
+        'name': f'Tutor {i}',
+        'expertise': _popular(rnd, SUBJECTS, rnd.randint(1, 4)),
+        'languages': ['English'] + _popular(rnd, LANGUAGES[1:], rnd.randint(0, 2)),
+        'availability': {slot: rnd.random() < 0.5 for slot in AVAILABILITY_SLOTS},
+        'rating': round(rnd.uniform(3.0, 5.0), 1) if sessions else None,
+        'total_sessions': min(sessions, 500),
+        'gender': rnd.choice(['male', 'female', '']),
+        'teaching_style': rnd.choice(TEACHING_STYLES),
+        'bio': '',
+        'hourly_rate': rnd.choice([10, 15, 20, 30]),
+        'max_students': rnd.choice([None, 5, 10, 20]),
+    }
+
+
+def make_student(rnd):
+    """A student_matcher_profile()-shaped dict"""
+    return {
+        'learning_style': rnd.choice(LEARNING_STYLES[:3]),
+        'preferred_subjects': _popular(rnd, SURVEY_SUBJECTS, rnd.randint(1, 3)),
+        'skill_level': rnd.choice(SKILL_LEVELS),
+        'available_time': rnd.choice(TIME_SLOTS),
+        'preferred_languages': _popular(rnd, LANGUAGES, rnd.randint(1, 2)),
+        'math_score': rnd.randint(1, 10),
+        'science_score': rnd.randint(1, 10),
+        'language_score': rnd.randint(1, 10),
+        'tech_score': rnd.randint(1, 10),
+        'motivation_level': rnd.randint(1, 10),
+        'tutor_gender_preference': rnd.choice(['no_preference'] * 3 + ['male', 'female']),
+        'selected_goals': rnd.sample(GOALS, rnd.randint(0, 2)),
+    }
+
+
+def make_outcome(rnd):
+    rating = rnd.randint(1, 5)
+    outcome = {
+        'satisfaction_rating': rating,
+        'completed': rnd.random() < 0.7,
+        'would_recommend': rating >= 4,
+    }
+    if rnd.random() < 0.5:
+        outcome['response_time'] = rnd.uniform(0, 24)
+    return outcome
+
+
+def _percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def _measure(fn, calls, budget, alloc_calls=3):
+    """p50/p99 of fn() over up to `calls` calls within `budget` seconds, plus allocation"""
+    fn()  # warm caches and lazy imports
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < calls and (len(samples) < 5 or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+
+    allocated = []
+    tracemalloc.start()
+    for _ in range(alloc_calls):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        allocated.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return {
+        'calls': len(samples),
+        'p50_ms': _percentile_ms(samples, 50),
+        'p99_ms': _percentile_ms(samples, 99),
+        'alloc_kb': round(float(np.median(allocated)) / 1024, 1),
+    }
+
+
+def run_size(n_tutors, budget, seed=7):
+    """All operations at one pool size (run in its own process)"""
+    # The matcher logs per tutor and per save; keep that off the report
+    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        return _run_size(n_tutors, budget, seed)
+
+
+def _run_size(n_tutors, budget, seed):
+    rnd = random.Random(seed)
+    matcher = RLTutorMatchingSystem()
+    tutors = [make_tutor(i, rnd) for i in range(n_tutors)]
+    students = [(f'student_{i}', make_student(rnd)) for i in range(500)]
+    matrix = matcher.build_tutor_matrix(tutors)
+    results = {}
+
+    # Learn from a history that grows with the pool, timing each update
+    history = [
+        (rnd.choice(students), rnd.choice(tutors), make_outcome(rnd))
+        for _ in range(min(max(n_tutors, 1000), 20000))
+    ]
+    position = [0]
+
+    def record():
+        (student_id, profile), tutor, outcome = history[position[0] % len(history)]
+        position[0] += 1
+        matcher.record_match_outcome(student_id, tutor['id'], profile, tutor, outcome)
+
+    results['record_match_outcome'] = _measure(record, len(history), budget * 5)
+
+    def pick():
+        return students[rnd.randrange(len(students))]
+
+    results['match_student_to_tutors'] = _measure(
+        lambda: matcher.match_student_to_tutors(*pick(), tutors), 200, budget)
+    results['top_k_matches'] = _measure(
+        lambda: matcher.top_k_matches(*pick(), matrix, k=10), 500, budget)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'rl_model.pkl')
+        results['save_model'] = _measure(lambda: matcher.save_model(path), 20, budget)
+        results['load_model'] = _measure(
+            lambda: RLTutorMatchingSystem().load_model(path), 20, budget)
+        results['model_kb'] = round(os.path.getsize(path) / 1024, 1)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    results['peak_rss_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    return results
+
+
+def compare(results, baseline, tolerance, p99_tolerance, floor_ms):
+    """Human-readable regressions of `results` against `baseline`"""
+    regressions = []
+    for size, ops in results.items():
+        base_ops = baseline.get(size)
+        if not base_ops:
+            continue
+        for op in OPERATIONS:
+            now, before = ops.get(op), base_ops.get(op)
+            if not now or not before:
+                continue
+            for metric, allowed in (('p50_ms', tolerance), ('p99_ms', p99_tolerance)):
+                if now[metric] > before[metric] * (1 + allowed) and now[metric] - before[metric] > floor_ms:
+                    regressions.append(
+                        f"{op} @ {size} tutors: {metric} {before[metric]} -> {now[metric]}")
+            if now['alloc_kb'] > before['alloc_kb'] * (1 + tolerance) + 1:
+                regressions.append(
+                    f"{op} @ {size} tutors: alloc_kb {before['alloc_kb']} -> {now['alloc_kb']}")
+        if ops['peak_rss_mb'] > base_ops['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(
+                f"peak RSS @ {size} tutors: {base_ops['peak_rss_mb']} -> {ops['peak_rss_mb']} MB")
+    return regressions
+
+
+def print_table(size, ops):
+    print(f"\n{size} tutors (peak RSS {ops['peak_rss_mb']} MB, model {ops['model_kb']} KB)")
+    print(f"  {'operation':<26}{'calls':>7}{'p50 ms':>11}{'p99 ms':>11}{'alloc KB':>11}")
+    for op in OPERATIONS:
+        r = ops[op]
+        print(f"  {op:<26}{r['calls']:>7}{r['p50_ms']:>11}{r['p99_ms']:>11}{r['alloc_kb']:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000,100000')
+    parser.add_argument('--budget', type=float, default=3.0,
+                        help='seconds of timed calls per operation (at least 5 calls)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p50 / allocation / RSS growth (0.25 = 25%%)')
+    parser.add_argument('--p99-tolerance', type=float, default=0.5)
+    parser.add_argument('--floor-ms', type=float, default=0.05,
+                        help='ignore latency changes smaller than this')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for size in [int(n) for n in args.sizes.split(',')]:
+        with context.Pool(1) as pool:
+            results[str(size)] = pool.apply(run_size, (size, args.budget))
+        print_table(size, results[str(size)])
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.node(),
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({k: v for k, v in report.items() if k != 'results'})
+        baseline['results'].update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\n✓ Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️ No baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('machine') != report['machine']:
+        print(f"\n⚠️ Baseline was recorded on {baseline.get('machine')}, not {report['machine']}")
+    missing = [size for size in results if size not in baseline.get('results', {})]
+    if missing:
+        print(f"\n⚠️ No baseline for {', '.join(missing)} tutors; not compared")
+    regressions = compare(results, baseline.get('results', {}),
+                          args.tolerance, args.p99_tolerance, args.floor_ms)
+    if regressions:
+        print("\n❌ PERFORMANCE REGRESSION")
+        for line in regressions:
+            print(f"   {line}")
+        raise SystemExit(1)
+    print("\n✓ No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
 import multiprocessing
+import os
 
-# Render free tier has limited memory
-workers = 1  # Use only 1 worker
+# Render free tier has limited memory: 1 worker by default.
+# More workers need RL_STATE_BACKEND=db: they share one RL model and
+# poll a pool change log so tutor/student pools stay current everywhere.
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+if workers > 1 and os.getenv('RL_STATE_BACKEND', 'file') != 'db':
+    raise RuntimeError('WEB_CONCURRENCY > 1 requires RL_STATE_BACKEND=db')
 worker_class = "sync"
 worker_connections = 1000
 timeout = 120  # Increase timeout to 120 seconds
@@ -17,4 +22,11 @@ bind = "0.0.0.0:10000"
 # Logging
 accesslog = "-"
 errorlog = "-"
-loglevel = "info"
\ No newline at end of file
+loglevel = "info"
+
+
+def post_worker_init(worker):
+    # Importing the app has no side effects; recover RL state, start the
+    # background threads in each worker
+    from app import start_services
+    start_services()
@@ -0,0 +1,30 @@
+"""message keyset index
+
+Revision ID: a3d8f6b1c9e2
+Revises: f1a9d4c7e2b8
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d8f6b1c9e2'
+down_revision = 'f1a9d4c7e2b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Message history pages by (timestamp, id) within a conversation; id
+    # breaks timestamp ties so the keyset cursor is exact
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_conversation_id_timestamp')
+        batch_op.create_index('ix_message_conversation_id_timestamp_id', ['conversation_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_conversation_id_timestamp_id')
+        batch_op.create_index('ix_message_conversation_id_timestamp', ['conversation_id', 'timestamp'], unique=False)
@@ -0,0 +1,38 @@
+"""matcher pool changes
+
+Revision ID: b6e2c9d4a7f1
+Revises: a3d8f6b1c9e2
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2c9d4a7f1'
+down_revision = 'a3d8f6b1c9e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('matcher_pool_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('version')
+    )
+    op.create_table('matcher_pool_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('matcher_pool_state')
+    op.drop_table('matcher_pool_change')
@@ -0,0 +1,38 @@
+"""rl shared state
+
+Revision ID: c4e1a7d2f9b3
+Revises: b3f465664707
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e1a7d2f9b3'
+down_revision = 'b3f465664707'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rl_outcome_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('seq')
+    )
+    op.create_table('rl_model_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.Column('snapshot_seq', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('rl_model_state')
+    op.drop_table('rl_outcome_event')
@@ -0,0 +1,31 @@
+"""rl outcome archive
+
+Revision ID: c8f3a1e6d2b9
+Revises: b6e2c9d4a7f1
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f3a1e6d2b9'
+down_revision = 'b6e2c9d4a7f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rl_outcome_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('seq')
+    )
+
+
+def downgrade():
+    op.drop_table('rl_outcome_archive')
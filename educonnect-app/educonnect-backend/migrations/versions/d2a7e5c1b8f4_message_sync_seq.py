@@ -0,0 +1,44 @@
+"""message sync seq
+
+Revision ID: d2a7e5c1b8f4
+Revises: c8f3a1e6d2b9
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7e5c1b8f4'
+down_revision = 'c8f3a1e6d2b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Message sync pages by a commit-ordered seq instead of the message id;
+    # conversations get one too so moved read positions are synced
+    message_sync_state = op.create_table('message_sync_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(message_sync_state, [{'id': 1, 'seq': 0}])
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=True))
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=True))
+        batch_op.create_index('ix_message_conversation_id_change_seq', ['conversation_id', 'change_seq'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_conversation_id_change_seq')
+        batch_op.drop_column('change_seq')
+
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.drop_column('change_seq')
+
+    op.drop_table('message_sync_state')
@@ -0,0 +1,32 @@
+"""weekly availability bitmap
+
+Revision ID: d7b2e5a9c1f4
+Revises: c4e1a7d2f9b3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7b2e5a9c1f4'
+down_revision = 'c4e1a7d2f9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('student_profile', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('availability_bitmap', sa.LargeBinary(length=21), nullable=True))
+
+    with op.batch_alter_table('tutor_profile', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('availability_bitmap', sa.LargeBinary(length=21), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('tutor_profile', schema=None) as batch_op:
+        batch_op.drop_column('availability_bitmap')
+
+    with op.batch_alter_table('student_profile', schema=None) as batch_op:
+        batch_op.drop_column('availability_bitmap')
@@ -0,0 +1,85 @@
+"""hot path indexes
+
+Revision ID: e5c3f8a1b2d6
+Revises: d7b2e5a9c1f4
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c3f8a1b2d6'
+down_revision = 'd7b2e5a9c1f4'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, unique), matching the model __table_args__
+INDEXES = [
+    ('ix_message_conversation_id_timestamp', 'message', ['conversation_id', 'timestamp'], False),
+    ('uq_conversation_participants', 'conversation', ['participant1_id', 'participant2_id'], True),
+    ('ix_conversation_participant2_id', 'conversation', ['participant2_id'], False),
+    ('ix_fcm_token_user_id_is_active', 'fcm_token', ['user_id', 'is_active'], False),
+    ('uq_enrollment_student_id_course_id', 'enrollment', ['student_id', 'course_id'], True),
+    ('uq_assignment_submission_assignment_id_student_id', 'assignment_submission',
+     ['assignment_id', 'student_id'], True),
+    ('ix_assignment_submission_assignment_id_status', 'assignment_submission',
+     ['assignment_id', 'status'], False),
+    ('ix_assignment_course_id_due_date', 'assignment', ['course_id', 'due_date'], False),
+    ('ix_tutoring_session_pair_started_at', 'tutoring_session',
+     ['student_id', 'tutor_user_id', 'started_at'], False),
+    ('uq_offline_download_user_id_course_id', 'offline_download', ['user_id', 'course_id'], True),
+    ('ix_course_material_course_id_order', 'course_material', ['course_id', 'order'], False),
+    ('ix_course_material_section_id_order', 'course_material', ['section_id', 'order'], False),
+    ('ix_course_section_course_id_order', 'course_section', ['course_id', 'order'], False),
+    ('ix_tutor_profile_user_id_verified', 'tutor_profile', ['user_id', 'verified'], False),
+]
+
+
+def check_unique(table, columns):
+    """Stop before a unique index fails half-way on existing duplicate rows"""
+    cols = ', '.join(columns)
+    duplicates = op.get_bind().execute(sa.text(
+        f'SELECT {cols}, COUNT(*) FROM {table} GROUP BY {cols} HAVING COUNT(*) > 1 LIMIT 5'
+    )).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            f'{table} has duplicate ({cols}) rows, e.g. {[tuple(d) for d in duplicates]}; '
+            f'merge them before upgrading'
+        )
+
+
+def existing_indexes():
+    """
+    INDEXES entries whose table and columns exist. On a DB managed by
+    migrations alone, no migration creates tutoring_session and
+    course_material.section_id was dropped again (b3f465664707); only
+    db.create_all adds them, and it creates their indexes too.
+    """
+    inspector = sa.inspect(op.get_bind())
+    indexes = []
+    for entry in INDEXES:
+        table, columns = entry[1], entry[2]
+        if not inspector.has_table(table):
+            continue
+        if set(columns) <= {c['name'] for c in inspector.get_columns(table)}:
+            indexes.append(entry)
+    return indexes
+
+
+def upgrade():
+    indexes = existing_indexes()
+    for name, table, columns, unique in indexes:
+        if unique:
+            check_unique(table, columns)
+    for name, table, columns, unique in indexes:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, columns, unique in reversed(existing_indexes()):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
@@ -0,0 +1,36 @@
+"""rl stats applied
+
+Revision ID: e7b4c2a9f3d1
+Revises: d2a7e5c1b8f4
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b4c2a9f3d1'
+down_revision = 'd2a7e5c1b8f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Which journaled outcomes are already in tutor rating/total_sessions,
+    # so outcomes recovered after a crash are applied exactly once
+    op.create_table('rl_stats_applied',
+    sa.Column('seq', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    rl_stats_state = op.create_table('rl_stats_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('floor', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(rl_stats_state, [{'id': 1, 'floor': 0}])
+
+
+def downgrade():
+    op.drop_table('rl_stats_state')
+    op.drop_table('rl_stats_applied')
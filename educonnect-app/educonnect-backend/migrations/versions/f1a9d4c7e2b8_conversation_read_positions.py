@@ -0,0 +1,43 @@
+"""conversation read positions
+
+Revision ID: f1a9d4c7e2b8
+Revises: e5c3f8a1b2d6
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a9d4c7e2b8'
+down_revision = 'e5c3f8a1b2d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('participant1_last_read_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('participant2_last_read_id', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.create_index('ix_message_conversation_id_id', ['conversation_id', 'id'], unique=False)
+
+    # Existing history counts as read; unread counts start with new messages
+    op.execute(
+        'UPDATE conversation SET '
+        'participant1_last_read_id = (SELECT COALESCE(MAX(id), 0) FROM message '
+        'WHERE message.conversation_id = conversation.id), '
+        'participant2_last_read_id = (SELECT COALESCE(MAX(id), 0) FROM message '
+        'WHERE message.conversation_id = conversation.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_conversation_id_id')
+
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.drop_column('participant2_last_read_id')
+        batch_op.drop_column('participant1_last_read_id')
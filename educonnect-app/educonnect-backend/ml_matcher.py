@@ -3,8 +3,22 @@ import pandas as pd
 from sklearn.preprocessing import StandardScaler
 import json
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
 import pickle
+import threading
+import hashlib
+import time
+import os
+import glob
+import tempfile
+import queue
+import zlib
+
+try:
+    import fcntl  # POSIX: serializes snapshot writes across workers
+except ImportError:
+    fcntl = None
 
 class RLTutorMatchingSystem:
     """
@@ -37,28 +51,40 @@ class RLTutorMatchingSystem:
         }
         
         # RL Components
-        self.q_table = defaultdict(lambda: defaultdict(float))  # State-action values
-        self.tutor_performance = defaultdict(lambda: {
-            'total_matches': 0,
-            'successful_matches': 0,
-            'avg_satisfaction': 0.0,
-            'completion_rate': 0.0,
-            'student_retention': 0.0,
-            'response_time_score': 1.0,
-            'reliability_score': 1.0,
-            'n_ratings': 0
-        })
+        self.q_table = QTable()  # State-action values (interned, array-backed)
+        self.tutor_performance = TutorPerformanceTable()  # Per-tutor record array
+        
+        # Per-student history is capped: ring buffers keep the last
+        # `history_size` outcomes, feature importance the last `feature_window`
+        self.history_size = 50
+        self.feature_window = 10
         
         # Personalized student preferences (learned over time)
-        self.student_preferences = defaultdict(lambda: {
-            'weight_adjustments': {},
-            'preferred_tutor_traits': {},
-            'match_history': [],
-            'satisfaction_history': []
-        })
+        self.student_preferences = defaultdict(self._new_preferences)
+        
+        # Feature importance learning (student_id -> WindowedCovariance)
+        self.feature_rewards = defaultdict(self._new_feature_window)
+        
+        # Candidate retrieval: below this many subject-index hits, fall
+        # back to scoring the whole pool
+        self.min_candidates = 20
+
+        # Embedding retrieval (TutorEmbeddingIndex): tutors fetched per
+        # request before exact re-ranking, at least 4x the page depth
+        self.embedding_candidates = 200
+        
+        # Bumped whenever learned state changes (keys match result caches)
+        self.model_version = 0
         
-        # Feature importance learning
-        self.feature_rewards = defaultdict(list)
+        # Concurrency: writers (record_match_outcome, restore_state) hold
+        # _write_lock; scoring reads the immutable ModelSnapshot published
+        # when the outermost writer() exits, so readers never take a lock
+        # and never see a half-applied outcome
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._dirty_students = set()
+        self._dirty_tutors = set()
+        self._snapshot = ModelSnapshot(0, self.tutor_performance.frozen_copy(), {})
         
         # Subject similarity mappings
         self.subject_groups = {
@@ -68,14 +94,85 @@ class RLTutorMatchingSystem:
             'language': ['english', 'writing', 'literature', 'grammar', 'composition'],
             'arts': ['art', 'music', 'drawing', 'painting', 'design']
         }
+        self._subject_categories = {}
     
+    # Features whose score/reward correlation personalizes weights
+    IMPORTANCE_FEATURES = (
+        'subject_match', 'skill_compatibility', 'schedule_match',
+        'language_match', 'learning_style_match', 'gender_match',
+    )
+
+    def _new_preferences(self):
+        return {
+            'weight_adjustments': {},
+            'preferred_tutor_traits': {},
+            'match_history': RingBuffer(self.history_size, MATCH_HISTORY_DTYPE),
+            'satisfaction_history': RingBuffer(self.history_size),
+            'satisfaction_sum': 0.0,
+        }
+
+    def _new_feature_window(self):
+        return WindowedCovariance(len(self.IMPORTANCE_FEATURES), self.feature_window)
+
+    @contextmanager
+    def writer(self):
+        """
+        Hold the write lock for a group of updates. Nested writers are
+        free; the outermost one publishes a single new snapshot on exit.
+        """
+        with self._write_lock:
+            self._write_depth += 1
+            try:
+                yield self
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._publish()
+
+    def snapshot(self):
+        """Current immutable ModelSnapshot (one attribute read, no lock)"""
+        return self._snapshot
+
+    def _publish(self):
+        """Copy-on-write swap of the reader snapshot (write lock held)"""
+        current = self._snapshot
+        dirty = self._dirty_students
+        if dirty is not None and not dirty and current.version == self.model_version:
+            return current
+        tutors = self._dirty_tutors
+        changes = current.changes + ((
+            current.version, self.model_version,
+            None if tutors is None else frozenset(tutors)
+        ),)
+        if dirty is None:  # state replaced wholesale
+            dirty, weights = list(self.student_preferences), {}
+        else:
+            weights = dict(current.personal_weights)
+        for student_id in dirty:
+            prefs = self.student_preferences.get(student_id)
+            if prefs is not None and prefs['match_history'].total >= 3:
+                weights[student_id] = dict(prefs['weight_adjustments'])
+            else:
+                weights.pop(student_id, None)
+        self._dirty_students = set()
+        self._dirty_tutors = set()
+        self._snapshot = ModelSnapshot(
+            self.model_version, self.tutor_performance.frozen_copy(), weights,
+            changes[-ModelSnapshot.MAX_CHANGES:]
+        )
+        return self._snapshot
+
     def get_state_representation(self, student_profile, tutor_profile):
         """
         Convert student-tutor pair into a state representation for RL
         """
-        student_features = self.prepare_student_features(student_profile)
-        tutor_features = self.prepare_tutor_features(tutor_profile)
-        
+        return self.state_from_features(
+            self.prepare_student_features(student_profile),
+            self.prepare_tutor_features(tutor_profile)
+        )
+
+    def state_from_features(self, student_features, tutor_features):
+        """get_state_representation() from already-prepared feature dicts"""
         # Create a hashable state key
         state = (
             tuple(sorted(student_features['preferred_subjects'])),
@@ -88,19 +185,19 @@ class RLTutorMatchingSystem:
         )
         
         return state
-    def calculate_missing_penalty(self, tutor_profile, tutor_id):
+    def calculate_missing_penalty(self, tutor_profile, tutor_id, snapshot=None):
         """
         Each absent critical field subtracts a fixed amount.
         Penalties stack — a tutor missing 3 fields can lose 0.19 points
         before confidence is even applied.
         """
         penalty = 0.0
-        perf = self.tutor_performance[tutor_id]
+        perf = (snapshot or self._snapshot).performance[tutor_id]
     
         if tutor_profile.get('rating') is None:
             penalty += 0.08   # No rating: significant unknown
     
-        if not tutor_profile.get('availability'):
+        if not (tutor_profile.get('availability') or tutor_profile.get('weekly_availability')):
             penalty += 0.06   # Unavailable or unspecified
     
         if not tutor_profile.get('expertise'):
@@ -113,12 +210,12 @@ class RLTutorMatchingSystem:
             penalty += 0.05   # No history: extra cold-start tax
 
         return penalty
-    def calculate_confidence(self, tutor_id, tutor_profile):
+    def calculate_confidence(self, tutor_id, tutor_profile, snapshot=None):
         """
         Confidence reflects how much we can trust a tutor's score.
         Three sub-components, each 0–1, combined with fixed weights.
         """
-        perf = self.tutor_performance[tutor_id]
+        perf = (snapshot or self._snapshot).performance[tutor_id]
         n_matches  = perf['total_matches']
         n_ratings  = perf.get('n_ratings', 0)
     
@@ -132,7 +229,7 @@ class RLTutorMatchingSystem:
         tutor_features = self.prepare_tutor_features(tutor_profile)
         present = sum([
             bool(tutor_features['expertise']),
-            bool(tutor_features['availability']),
+            bool(tutor_features['availability'] or tutor_features['weekly_availability']),
             bool(tutor_features['languages']),
             tutor_profile.get('rating') is not None,
             n_matches > 0,
@@ -146,13 +243,13 @@ class RLTutorMatchingSystem:
         )
         return confidence
 
-    def calculate_rl_gate(self, tutor_id):
+    def calculate_rl_gate(self, tutor_id, snapshot=None):
         """
         RL only contributes once sufficient real data exists.
         Gate = 0 means RL adds nothing. Gate = 1 means full RL weight.
         Requires at least 10 matches AND 5 ratings before RL kicks in.
         """
-        perf = self.tutor_performance[tutor_id]
+        perf = (snapshot or self._snapshot).performance[tutor_id]
         n_matches = perf['total_matches']
         n_ratings = perf.get('n_ratings', 0)
     
@@ -161,12 +258,12 @@ class RLTutorMatchingSystem:
     
         return match_gate * feedback_gate  # Both must ramp up together
     
-    def calculate_tutor_performance_score(self, tutor_id):
+    def calculate_tutor_performance_score(self, tutor_id, snapshot=None):
         """
         Calculate dynamic performance score based on historical data
         This is what differentiates tutors beyond static features
         """
-        perf = self.tutor_performance[tutor_id]
+        perf = (snapshot or self._snapshot).performance[tutor_id]
         
         if perf['total_matches'] == 0:
             return 0.7  # Neutral score for new tutors
@@ -197,20 +294,18 @@ class RLTutorMatchingSystem:
         
         return final_score
     
-    def get_personalized_weights(self, student_id, base_weights):
+    def get_personalized_weights(self, student_id, base_weights, snapshot=None):
         """
         Get personalized feature weights for a student based on their history
         """
-        if student_id not in self.student_preferences:
-            return base_weights
-        
-        prefs = self.student_preferences[student_id]
+        # Only students with enough history (3+ outcomes) are in the snapshot
+        adjustments = (snapshot or self._snapshot).personal_weights.get(student_id)
         
         # If student has enough history, use learned weights
-        if len(prefs['match_history']) >= 3:
+        if adjustments is not None:
             adjusted_weights = base_weights.copy()
             
-            for feature, adjustment in prefs['weight_adjustments'].items():
+            for feature, adjustment in adjustments.items():
                 if feature in adjusted_weights:
                     adjusted_weights[feature] *= (1 + adjustment)
             
@@ -229,27 +324,28 @@ class RLTutorMatchingSystem:
             return np.random.choice(available_tutors)
         else:
             # Exploit: select best tutor based on Q-values
-            q_values = {tutor: self.q_table[state][tutor] for tutor in available_tutors}
-            return max(q_values, key=q_values.get)
+            q_values = self.q_table.values_for(state, available_tutors)
+            return available_tutors[int(np.argmax(q_values))]
     
     def update_q_value(self, state, action, reward, next_state):
         """
         Update Q-table using Q-learning algorithm
         """
-        current_q = self.q_table[state][action]
+        slot = self.q_table.slot(state, action)
+        current_q = float(self.q_table.values[slot])
         
-        # Get max Q-value for next state
-        max_next_q = max(self.q_table[next_state].values()) if self.q_table[next_state] else 0
+        # Get max Q-value for next state (0 if never seen; not inserted)
+        max_next_q = self.q_table.max_value(next_state)
         
         # Q-learning update rule
         new_q = current_q + self.learning_rate * (
             reward + self.discount_factor * max_next_q - current_q
         )
         
-        self.q_table[state][action] = new_q
+        self.q_table.set_slot(slot, new_q)
     
     def record_match_outcome(self, student_id, tutor_id, student_profile, 
-                            tutor_profile, outcome_data):
+                            tutor_profile, outcome_data, timestamp=None):
         """
         Learn from match outcomes to improve future recommendations
         
@@ -259,69 +355,78 @@ class RLTutorMatchingSystem:
         - would_recommend: bool
         - response_time: average response time in hours
         - punctuality_score: 0-1 (showed up on time)
-        """
-        # Calculate reward based on outcome
-        satisfaction = outcome_data.get('satisfaction_rating', 3) / 5.0
-        completed = 1.0 if outcome_data.get('completed', False) else 0.0
-        recommend = 1.0 if outcome_data.get('would_recommend', False) else 0.0
         
-        # Overall reward (0 to 1)
-        reward = 0.4 * satisfaction + 0.3 * completed + 0.3 * recommend
+        timestamp (POSIX seconds) defaults to now; journal replay passes
+        the original time so replayed history is identical.
+        """
+        with self.writer():
+            self.model_version += 1
         
-        # Update tutor performance metrics
-        perf = self.tutor_performance[tutor_id]
-        perf['total_matches'] += 1
-        if outcome_data.get('satisfaction_rating') is not None:
-            perf['n_ratings'] = perf.get('n_ratings', 0) + 1
+            # Calculate reward based on outcome
+            satisfaction = outcome_data.get('satisfaction_rating', 3) / 5.0
+            completed = 1.0 if outcome_data.get('completed', False) else 0.0
+            recommend = 1.0 if outcome_data.get('would_recommend', False) else 0.0
         
-        if reward > 0.6:  # Consider it successful
-            perf['successful_matches'] += 1
+            # Overall reward (0 to 1)
+            reward = 0.4 * satisfaction + 0.3 * completed + 0.3 * recommend
         
-        # Running average of satisfaction
-        n = perf['total_matches']
-        perf['avg_satisfaction'] = (
-            (perf['avg_satisfaction'] * (n - 1) + satisfaction) / n
-        )
+            # Update tutor performance metrics
+            perf = self.tutor_performance[tutor_id]
+            perf['total_matches'] += 1
+            if outcome_data.get('satisfaction_rating') is not None:
+                perf['n_ratings'] = perf.get('n_ratings', 0) + 1
         
-        # Update completion rate
-        perf['completion_rate'] = (
-            (perf['completion_rate'] * (n - 1) + completed) / n
-        )
+            if reward > 0.6:  # Consider it successful
+                perf['successful_matches'] += 1
         
-        # Update response time score
-        if 'response_time' in outcome_data:
-            response_hours = outcome_data['response_time']
-            # Excellent: <2h, Good: <6h, OK: <24h, Poor: >24h
-            response_score = max(0, 1 - (response_hours / 24))
-            perf['response_time_score'] = (
-                (perf['response_time_score'] * (n - 1) + response_score) / n
+            # Running average of satisfaction
+            n = perf['total_matches']
+            perf['avg_satisfaction'] = (
+                (perf['avg_satisfaction'] * (n - 1) + satisfaction) / n
             )
         
-        # Update reliability score
-        if 'punctuality_score' in outcome_data:
-            perf['reliability_score'] = (
-                (perf['reliability_score'] * (n - 1) + 
-                 outcome_data['punctuality_score']) / n
+            # Update completion rate
+            perf['completion_rate'] = (
+                (perf['completion_rate'] * (n - 1) + completed) / n
             )
         
-        # Update Q-table
-        state = self.get_state_representation(student_profile, tutor_profile)
-        self.update_q_value(state, tutor_id, reward, state)
+            # Update response time score
+            if 'response_time' in outcome_data:
+                response_hours = outcome_data['response_time']
+                # Excellent: <2h, Good: <6h, OK: <24h, Poor: >24h
+                response_score = max(0, 1 - (response_hours / 24))
+                perf['response_time_score'] = (
+                    (perf['response_time_score'] * (n - 1) + response_score) / n
+                )
         
-        # Update student preferences
-        prefs = self.student_preferences[student_id]
-        prefs['match_history'].append({
-            'tutor_id': tutor_id,
-            'reward': reward,
-            'timestamp': datetime.now().isoformat()
-        })
-        prefs['satisfaction_history'].append(satisfaction)
+            # Update reliability score
+            if 'punctuality_score' in outcome_data:
+                perf['reliability_score'] = (
+                    (perf['reliability_score'] * (n - 1) + 
+                     outcome_data['punctuality_score']) / n
+                )
+
+            self.tutor_performance[tutor_id] = perf
+
+            # Update Q-table
+            state = self.get_state_representation(student_profile, tutor_profile)
+            self.update_q_value(state, tutor_id, reward, state)
         
-        # Learn which features matter most for this student
-        self._update_feature_importance(student_id, student_profile, 
-                                       tutor_profile, reward)
+            # Update student preferences
+            prefs = self.student_preferences[student_id]
+            if timestamp is None:
+                timestamp = time.time()
+            prefs['match_history'].append((tutor_id, reward, timestamp))
+            prefs['satisfaction_history'].append(satisfaction)
+            prefs['satisfaction_sum'] += satisfaction
         
-        return reward
+            # Learn which features matter most for this student
+            self._update_feature_importance(student_id, student_profile, 
+                                            tutor_profile, reward)
+            self._dirty_students.add(student_id)
+            self._dirty_tutors.add(tutor_id)
+            
+            return reward
     
     def _update_feature_importance(self, student_id, student_profile, 
                                    tutor_profile, reward):
@@ -330,7 +435,14 @@ class RLTutorMatchingSystem:
         """
         prefs = self.student_preferences[student_id]
         
-        # Calculate how well each feature matched
+        # Update weight adjustments based on correlation with reward
+        # over the last `feature_window` outcomes (running sums, O(1))
+        window = self.feature_rewards[student_id]
+        window.push(self.feature_match_scores(student_profile, tutor_profile), reward)
+        self._adjust_weights(prefs, window)
+
+    def feature_match_scores(self, student_profile, tutor_profile):
+        """How well each IMPORTANCE_FEATURES feature matched, in that order"""
         student_features = self.prepare_student_features(student_profile)
         tutor_features = self.prepare_tutor_features(tutor_profile)
         
@@ -344,10 +456,7 @@ class RLTutorMatchingSystem:
                 tutor_features['total_sessions'],
                 student_features['skill_level']
             ),
-            'schedule_match': self.calculate_schedule_match(
-                student_features['available_time'],
-                tutor_features['availability']
-            ),
+            'schedule_match': self.schedule_match(student_features, tutor_features),
             'language_match': self.calculate_language_match(
                 student_features['preferred_languages'],
                 tutor_features['languages']
@@ -361,32 +470,48 @@ class RLTutorMatchingSystem:
                 tutor_features.get('gender', '')
             ),
         }
-        
-        # Update weight adjustments based on correlation with reward
-        for feature, score in feature_scores.items():
-            self.feature_rewards[f"{student_id}_{feature}"].append({
-                'score': score,
-                'reward': reward
-            })
-            
-            # If we have enough data, adjust weights
-            history = self.feature_rewards[f"{student_id}_{feature}"]
-            if len(history) >= 5:
-                # Calculate correlation between feature score and reward
-                scores = [h['score'] for h in history[-10:]]
-                rewards = [h['reward'] for h in history[-10:]]
-                
-                correlation = np.corrcoef(scores, rewards)[0, 1]
-                
-                # Adjust weight based on correlation
+        return [feature_scores[f] for f in self.IMPORTANCE_FEATURES]
+
+    def _adjust_weights(self, prefs, window):
+        """Set weight adjustments from the window's correlations (5+ outcomes)"""
+        # If we have enough data, adjust weights
+        if window.total >= 5:
+            correlations = window.correlation()
+            for feature, correlation in zip(self.IMPORTANCE_FEATURES, correlations):
                 if not np.isnan(correlation):
                     # Positive correlation: increase weight
                     # Negative correlation: decrease weight
-                    adjustment = correlation * 0.2  # Max 20% adjustment
+                    adjustment = float(correlation) * 0.2  # Max 20% adjustment
                     prefs['weight_adjustments'][feature] = adjustment
     
+    def student_summary(self, student_id, recent=5):
+        """Learned-preference summary for one student (None if no history)"""
+        with self._write_lock:
+            return self._student_summary(student_id, recent)
+
+    def _student_summary(self, student_id, recent):
+        prefs = self.student_preferences.get(student_id)
+        if prefs is None or prefs['match_history'].total == 0:
+            return None
+        history = prefs['match_history']
+        return {
+            'total_matches': history.total,
+            'avg_satisfaction': prefs['satisfaction_sum'] / max(history.total, 1),
+            'weight_adjustments': dict(prefs['weight_adjustments']),
+            'recent_matches': [
+                {
+                    'tutor_id': int(m['tutor_id']),
+                    'reward': float(m['reward']),
+                    'timestamp': datetime.fromtimestamp(m['timestamp']).isoformat(),
+                }
+                for m in history.recent(recent)
+            ],
+        }
+    
     def prepare_student_features(self, student_profile):
         """Enhanced student feature extraction with None safety"""
+        if isinstance(student_profile, StudentFeatureVector):
+            return student_profile  # already prepared
         features = {
             'math_score': max(1, min(10, student_profile.get('math_score', 5) or 5)),
             'science_score': max(1, min(10, student_profile.get('science_score', 5) or 5)),
@@ -414,6 +539,7 @@ class RLTutorMatchingSystem:
         'tutor_gender_preference': (
             student_profile.get('tutor_gender_preference') or 'no_preference'
         ).lower(),
+        'weekly_availability': _weekly_feature(student_profile.get('weekly_availability')),
         }
         return features
         
@@ -440,6 +566,7 @@ class RLTutorMatchingSystem:
                 if l
             ],
             'availability': tutor_profile.get('availability') or {},
+            'weekly_availability': _weekly_feature(tutor_profile.get('weekly_availability')),
             'rating': max(0.0, min(5.0, tutor_profile.get('rating', 4.0) or 4.0)),
             'total_sessions': max(0, tutor_profile.get('total_sessions', 0) or 0),
             'teaching_style': (tutor_profile.get('teaching_style') or 'adaptive').lower(),
@@ -450,10 +577,15 @@ class RLTutorMatchingSystem:
     def get_subject_category(self, subject):
         """Map subject to category"""
         subject = subject.lower()
-        for category, keywords in self.subject_groups.items():
-            if subject in keywords or any(keyword in subject for keyword in keywords):
-                return category
-        return subject
+        category = self._subject_categories.get(subject)
+        if category is None:
+            category = subject
+            for name, keywords in self.subject_groups.items():
+                if subject in keywords or any(keyword in subject for keyword in keywords):
+                    category = name
+                    break
+            self._subject_categories[subject] = category
+        return category
     
     def calculate_subject_match(self, student_subjects, tutor_expertise):
         """Enhanced subject matching with fuzzy matching"""
@@ -472,11 +604,11 @@ class RLTutorMatchingSystem:
             if student_subject in tutor_expertise:
                 subject_score = 1.0
             else:
+                student_category = self.get_subject_category(student_subject)
                 for tutor_subject in tutor_expertise:
                     if student_subject in tutor_subject or tutor_subject in student_subject:
                         subject_score = max(subject_score, 0.8)
                     
-                    student_category = self.get_subject_category(student_subject)
                     tutor_category = self.get_subject_category(tutor_subject)
                     if student_category == tutor_category and student_category in self.subject_groups:
                         subject_score = max(subject_score, 0.6)
@@ -487,12 +619,12 @@ class RLTutorMatchingSystem:
     
     def calculate_skill_compatibility(self, student_features, tutor_sessions, student_skill):
         """Multi-factor skill compatibility"""
-        avg_score = np.mean([
+        avg_score = sum([
             student_features.get('math_score', 5),
             student_features.get('science_score', 5),
             student_features.get('language_score', 5),
             student_features.get('tech_score', 5)
-        ])
+        ]) / 4.0
         
         normalized_score = avg_score / 10.0
         
@@ -507,11 +639,11 @@ class RLTutorMatchingSystem:
         student_capability = 0.6 * skill_value + 0.4 * normalized_score
         
         if tutor_sessions > 200:
-            experience_score = 1.0
+            compatibility = 1.0
         elif tutor_sessions > 100:
-            experience_score = 0.85
+            compatibility = 0.85
         elif tutor_sessions > 30:
-            experience_score = 0.70
+            compatibility = 0.70
         else:
             compatibility = 0.90 if student_capability < 0.5 else 0.65
         
@@ -521,6 +653,26 @@ class RLTutorMatchingSystem:
         
         return compatibility
     
+    def schedule_match(self, student_features, tutor_features):
+        """Weekly bitmap overlap when both sides have one, else the slot match"""
+        student_weekly = student_features.get('weekly_availability')
+        tutor_weekly = tutor_features.get('weekly_availability')
+        if student_weekly and tutor_weekly:
+            return self.calculate_weekly_schedule_match(student_weekly, tutor_weekly)
+        return self.calculate_schedule_match(
+            student_features['available_time'], tutor_features['availability'])
+
+    def calculate_weekly_schedule_match(self, student_weekly, tutor_weekly):
+        """
+        Schedule matching on weekly bitmaps (hex): the share of the
+        student's hours the tutor also has, saturating at
+        WEEKLY_MATCH_HOURS shared hours. No overlap scores like a slot miss.
+        """
+        student_bits = int(student_weekly, 16)
+        needed = min(student_bits.bit_count(), WEEKLY_MATCH_HOURS)
+        overlap = (student_bits & int(tutor_weekly, 16)).bit_count()
+        return 0.35 + 0.6 * min(1.0, overlap / needed)
+
     def calculate_schedule_match(self, student_time, tutor_availability):
         """Schedule matching"""
         if not tutor_availability or not isinstance(tutor_availability, dict):
@@ -577,12 +729,12 @@ class RLTutorMatchingSystem:
         
         if tutor_style == 'adaptive':
             adaptive_scores = {
-            'visual': 0.85,
-            'auditory': 0.80,
-            'kinesthetic': 0.85,
-            'hands-on': 0.90
-        }
-        return adaptive_scores.get(student_style, 0.75)
+                'visual': 0.85,
+                'auditory': 0.80,
+                'kinesthetic': 0.85,
+                'hands-on': 0.90
+            }
+            return adaptive_scores.get(student_style, 0.75)
         
         if student_style == tutor_style:
             return 0.95
@@ -625,9 +777,10 @@ class RLTutorMatchingSystem:
         return float(np.clip(raw, 0.0, 1.0))
     
     def match_student_to_tutors(self, student_id, student_profile, tutors_list, use_rl=True):
+        snapshot = self.snapshot()
         student_features = self.prepare_student_features(student_profile)
         weights = (
-            self.get_personalized_weights(student_id, self.base_weights)
+            self.get_personalized_weights(student_id, self.base_weights, snapshot)
             if use_rl and student_id else self.base_weights.copy()
         )
     
@@ -658,10 +811,7 @@ class RLTutorMatchingSystem:
                 tutor_features['total_sessions'],
                 student_features['skill_level']
             )
-            schedule_score = self.calculate_schedule_match(
-                student_features['available_time'],
-                tutor_features['availability']
-            )
+            schedule_score = self.schedule_match(student_features, tutor_features)
             language_score = self.calculate_language_match(
                 student_features['preferred_languages'],
                 tutor_features['languages']
@@ -687,10 +837,10 @@ class RLTutorMatchingSystem:
             )
     
             # Confidence, RL gate, missing-data penalty
-            confidence      = self.calculate_confidence(tutor_id, tutor)
-            rl_gate         = self.calculate_rl_gate(tutor_id) if use_rl else 0.0
-            rl_score        = self.calculate_tutor_performance_score(tutor_id)
-            missing_penalty = self.calculate_missing_penalty(tutor, tutor_id)
+            confidence      = self.calculate_confidence(tutor_id, tutor, snapshot)
+            rl_gate         = self.calculate_rl_gate(tutor_id, snapshot) if use_rl else 0.0
+            rl_score        = self.calculate_tutor_performance_score(tutor_id, snapshot)
+            missing_penalty = self.calculate_missing_penalty(tutor, tutor_id, snapshot)
     
             final_score = self.compute_final_score(
                 base_score, confidence, rl_gate, rl_score, missing_penalty
@@ -718,51 +868,4177 @@ class RLTutorMatchingSystem:
     
         matches.sort(key=lambda x: x['match_score'], reverse=True)
         return matches
-    def save_model(self, filepath):
-        """Save model with RL state"""
-        model_data = {
+
+    # ------------------------------------------------------------------
+    # Batch scoring over a columnar tutor pool
+    # ------------------------------------------------------------------
+
+    def build_tutor_matrix(self, tutors_list):
+        """Encode a list of tutor dicts into a TutorFeatureMatrix"""
+        return TutorFeatureMatrix(tutors_list, self)
+
+    def _performance_score_vector(self, perf):
+        """Vectorized calculate_tutor_performance_score"""
+        total = perf['total_matches']
+        success_rate = perf['successful_matches'] / np.maximum(total, 1)
+        performance_score = (
+            0.25 * success_rate +
+            0.20 * perf['avg_satisfaction'] +
+            0.20 * perf['completion_rate'] +
+            0.15 * perf['student_retention'] +
+            0.10 * perf['response_time_score'] +
+            0.10 * perf['reliability_score']
+        )
+        confidence = np.minimum(1.0, total / 20)
+        final_score = confidence * performance_score + (1 - confidence) * 0.7
+        return np.where(total == 0, 0.7, final_score)
+
+    def score_tutor_matrix(self, student_id, student_profile, matrix, use_rl=True,
+                           snapshot=None):
+        """
+        Compute every sub-score and the final score for all tutors in
+        `matrix` at once. Returns a dict of arrays aligned with matrix rows;
+        the same formulas as match_student_to_tutors, one array op each.
+        """
+        snapshot = snapshot or self.snapshot()
+        student_features = self.prepare_student_features(student_profile)
+        weights = (
+            self.get_personalized_weights(student_id, self.base_weights, snapshot)
+            if use_rl and student_id else self.base_weights.copy()
+        )
+        scores = self._student_side_scores(student_features, matrix)
+        scores.update(self.tutor_side_terms(matrix, use_rl, snapshot))
+        return self._finish_scores(scores, weights)
+
+    def _student_side_scores(self, student_features, matrix, memo=None):
+        """
+        Eligibility and the five feature sub-scores for one student.
+        `memo` lets a cohort share results for identical schedule,
+        language and style inputs.
+        """
+        memo = {} if memo is None else memo
+        eligible = self._eligible_rows(student_features, matrix)
+
+        def shared(key, compute):
+            if key not in memo:
+                memo[key] = compute()
+            return memo[key]
+
+        available_time = student_features['available_time']
+        weekly = student_features.get('weekly_availability')
+        languages = student_features['preferred_languages']
+        style = student_features['learning_style']
+        return {
+            'eligible': eligible,
+            'subject_match': matrix.subject_scores(student_features['preferred_subjects']),
+            'skill_compatibility': matrix.skill_scores(student_features),
+            'schedule_match': shared(
+                ('schedule', available_time, weekly),
+                lambda: matrix.schedule_scores(available_time, weekly)),
+            'language_match': shared(
+                ('language', tuple(languages)),
+                lambda: matrix.language_scores(languages)),
+            'learning_style_match': shared(
+                ('style', style),
+                lambda: matrix.style_scores(style)),
+            'rating': matrix.rating_score,
+        }
+
+    def _eligible_rows(self, student_features, matrix):
+        """Hard filter: gender preference (unknown tutor gender is kept)"""
+        gender_pref = student_features.get('tutor_gender_preference', 'no_preference')
+        if gender_pref != 'no_preference':
+            pref_code = matrix.gender_vocab.get(gender_pref, -1)
+            return (matrix.gender_codes == 0) | (matrix.gender_codes == pref_code)
+        return np.ones(matrix.size, dtype=bool)
+
+    def tutor_side_terms(self, matrix, use_rl=True, snapshot=None):
+        """
+        Student-independent per-tutor terms: confidence, RL gate, RL
+        performance score and missing-data penalty. These are columns the
+        pool's matrix keeps per model snapshot (TutorFeatureMatrix.tutor_terms),
+        so scoring reads them instead of recomputing per request.
+        """
+        terms = matrix.tutor_terms(snapshot or self._snapshot)
+        if not use_rl:
+            terms = dict(terms, rl_gate=np.zeros(matrix.size))
+        return terms
+
+    def compute_tutor_terms(self, matrix, rows, performance):
+        """
+        tutor_side_terms() arrays for matrix `rows` (None = all rows),
+        from a TutorPerformanceTable and the matrix profile columns.
+        """
+        if rows is None:
+            rows = slice(None)
+            ids = matrix.ids
+        else:
+            ids = [matrix.ids[row] for row in rows]
+        perf = performance.columns(ids)
+        n_matches = perf['total_matches']
+        n_ratings = perf['n_ratings']
+        has_history = n_matches > 0
+
+        present = (
+            matrix.has_expertise[rows].astype(int) +
+            matrix.has_availability[rows] +
+            matrix.has_languages[rows] +
+            matrix.rating_present[rows] +
+            has_history
+        )
+        confidence = (
+            0.40 * np.minimum(1.0, n_matches / 20) +
+            0.40 * np.minimum(1.0, n_ratings / 10) +
+            0.20 * (present / 5.0)
+        )
+        return {
+            'confidence': confidence,
+            'rl_gate': np.minimum(1.0, n_matches / 10) * np.minimum(1.0, n_ratings / 5),
+            'rl_score': self._performance_score_vector(perf),
+            'missing_penalty': matrix.profile_penalty[rows] + np.where(has_history, 0.0, 0.05),
+        }
+
+    def _finish_scores(self, scores, weights):
+        """
+        Weighted base score and compute_final_score, element-wise.
+        Sub-scores may be (tutors,) for one student or (students, tutors)
+        for a cohort; weights are then per-student columns.
+        """
+        base_score = (
+            weights['subject_match']        * scores['subject_match']        +
+            weights['skill_compatibility']  * scores['skill_compatibility']  +
+            weights['schedule_match']       * scores['schedule_match']       +
+            weights['language_match']       * scores['language_match']       +
+            weights['learning_style_match'] * scores['learning_style_match'] +
+            weights['rating']               * scores['rating']
+        )
+        final_score = np.clip(self._raw_final_scores(base_score, scores), 0.0, 1.0)
+
+        scores['final_score'] = final_score
+        scores['match_score'] = (final_score * 100).astype(int)
+        return scores
+
+    def _raw_final_scores(self, base_score, terms):
+        """compute_final_score before clipping, from tutor_side_terms() arrays"""
+        conf_weight = 0.85 * terms['confidence'] + 0.15
+        rl_weight = 0.30 * terms['rl_gate']
+        base_weight = 1.0 - rl_weight
+        return (
+            base_score * base_weight * conf_weight
+            + terms['rl_score'] * rl_weight * conf_weight
+            - terms['missing_penalty']
+        )
+
+    def retrieve_candidates(self, student_profile, matrix, limit=None):
+        """
+        Narrow `matrix` to tutors the subject index says are relevant.
+        Returns the full matrix when the student has no subjects, when
+        every row is needed (`limit` None) or when the index yields fewer
+        than max(min_candidates, limit) tutors: tutors without overlapping
+        expertise still get the baseline subject score and could fill
+        the page on rating or availability.
+
+        This trades recall for speed: with enough candidates, a tutor
+        outside the index ranks only after them, even if its exact score
+        would be higher.
+        """
+        subjects = self.prepare_student_features(student_profile)['preferred_subjects']
+        if not subjects or limit is None:
+            return matrix
+        rows = matrix.candidate_rows(subjects)
+        if len(rows) < max(self.min_candidates, limit) or len(rows) == matrix.size:
+            return matrix
+        return matrix.subset(rows)
+
+    def filter_available(self, student_profile, matrix):
+        """
+        Narrow `matrix` to tutors sharing at least one weekly hour with
+        the student (bitmap AND over the pool). Returns the full matrix
+        when the student has no weekly availability.
+        """
+        weekly = self.prepare_student_features(student_profile)['weekly_availability']
+        if not weekly:
+            return matrix
+        rows = matrix.available_rows(weekly)
+        return matrix if len(rows) == matrix.size else matrix.subset(rows)
+
+    def embed_tutor(self, tutor_profile):
+        """
+        Fixed-length vector of the profile features match_student_to_tutors
+        scores (see EMBEDDING_BLOCKS); its dot product with embed_student()
+        approximates the weighted base score. Vocabulary tokens are hashed
+        into buckets so the length never depends on the pool. Schedule and
+        style blocks hold the exact score for each student-side value.
+        """
+        features = self.prepare_tutor_features(tutor_profile)
+        vector = np.zeros(EMBEDDING_DIM)
+        blocks = EMBEDDING_BLOCKS
+
+        for token in features['expertise']:
+            vector[_embed_col('expertise', token)] = 1.0
+            category = self.get_subject_category(token)
+            if category in self.subject_groups:
+                vector[_embed_col('category', category)] = 1.0
+        if not features['expertise']:
+            vector[blocks['no_expertise'].start] = 1.0
+
+        sessions = features['total_sessions']
+        tier = 0 if sessions > 200 else 1 if sessions > 100 else 2 if sessions > 30 else 3
+        vector[blocks['sessions'].start + tier] = 1.0
+
+        vector[blocks['schedule']] = [
+            self.calculate_schedule_match(time_slot, features['availability'])
+            for time_slot in EMBEDDING_TIMES + ('',)
+        ]
+
+        for language in features['languages']:
+            vector[_embed_col('language', language)] = 1.0
+        if not features['languages']:
+            vector[blocks['no_language'].start] = 1.0
+
+        vector[blocks['style']] = [
+            self.calculate_learning_style_match(style, features['teaching_style'])
+            for style in EMBEDDING_LEARNING_STYLES + ('',)
+        ]
+
+        # Rounded so tutors differing only slightly in rating share a vector
+        rating = tutor_profile.get('rating')
+        vector[blocks['rating'].start] = round(self.normalize_rating(rating), 1) if rating else 0.0
+        return vector
+
+    def embed_student(self, student_id, student_profile, use_rl=True, snapshot=None):
+        """
+        Query vector for embed_tutor() vectors, each block scaled by the
+        student's personalized weight (base_weights + weight_adjustments)
+        for that feature.
+        """
+        snapshot = snapshot or self.snapshot()
+        features = self.prepare_student_features(student_profile)
+        weights = (
+            self.get_personalized_weights(student_id, self.base_weights, snapshot)
+            if use_rl and student_id else self.base_weights
+        )
+        vector = np.zeros(EMBEDDING_DIM)
+        blocks = EMBEDDING_BLOCKS
+
+        # Exact and category hits add up, where the real score takes the
+        # best per subject; the exact re-rank corrects the difference
+        subjects = features['preferred_subjects']
+        w = weights['subject_match']
+        for subject in subjects:
+            vector[_embed_col('expertise', subject)] += w / len(subjects)
+            category = self.get_subject_category(subject)
+            if category in self.subject_groups:
+                vector[_embed_col('category', category)] += w * 0.6 / len(subjects)
+        if subjects:
+            vector[blocks['no_expertise'].start] = w * 0.3
+
+        w = weights['skill_compatibility']
+        vector[blocks['sessions']] = [
+            w * self.calculate_skill_compatibility(features, sessions, features['skill_level'])
+            for sessions in (201, 101, 31, 0)
+        ]
+
+        vector[_embed_vocab_col('schedule', EMBEDDING_TIMES, features['available_time'])] = (
+            weights['schedule_match'])
+
+        w = weights['language_match']
+        languages = set(features['preferred_languages'])
+        for language in languages:
+            vector[_embed_col('language', language)] += w * (0.6 + 0.25 / len(languages))
+        vector[blocks['no_language'].start] = w * 0.5
+
+        vector[_embed_vocab_col('style', EMBEDDING_LEARNING_STYLES, features['learning_style'])] = (
+            weights['learning_style_match'])
+        vector[blocks['rating'].start] = weights['rating']
+        return vector
+
+    def build_embedding_index(self, tutors_list, algorithm='brute'):
+        """TutorEmbeddingIndex over a list of tutor dicts"""
+        index = TutorEmbeddingIndex(self, algorithm=algorithm)
+        index.load(tutors_list)
+        return index
+
+    def retrieve_embedding_candidates(self, student_id, student_profile, matrix, index,
+                                      limit, use_rl=True, snapshot=None):
+        """
+        Narrow `matrix` to the max(embedding_candidates, 4 * limit)
+        eligible tutors with the best approximate final score: the
+        embedding base score combined with the tutor-side terms. Returns
+        (matrix, eligible tutors in the whole pool); the full matrix when
+        the candidates would be most of the pool.
+        """
+        features = self.prepare_student_features(student_profile)
+        eligible = self._eligible_rows(features, matrix)
+        total = int(np.count_nonzero(eligible))
+        wanted = max(self.embedding_candidates, 4 * (limit or matrix.size))
+        if wanted * 4 >= total:
+            return matrix, total
+
+        query = self.embed_student(student_id, student_profile, use_rl, snapshot)
+        base_score = index.score_rows(matrix, query, wanted)
+        approx = self._raw_final_scores(
+            base_score, self.tutor_side_terms(matrix, use_rl, snapshot))
+        approx[~eligible | np.isnan(base_score)] = -np.inf
+        rows = np.argpartition(-approx, wanted - 1)[:wanted]
+        return matrix.subset(np.sort(rows[np.isfinite(approx[rows])])), total
+
+    def match_student_to_tutors_batch(self, student_id, student_profile, matrix,
+                                      use_rl=True, retrieval=True):
+        """
+        Batch version of match_student_to_tutors over a TutorFeatureMatrix.
+        Produces the same ranked list of match dicts (every tutor is
+        ranked, so `retrieval` has no effect here).
+        """
+        page, _ = self.top_k_matches(
+            student_id, student_profile, matrix, k=None,
+            use_rl=use_rl, retrieval=retrieval
+        )
+        return page
+
+    def student_fingerprint(self, student_profile):
+        """Stable hash of the normalized student features"""
+        return self.student_feature_vector(student_profile).fingerprint
+
+    def student_feature_vector(self, student_profile):
+        """StudentFeatureVector for a profile dict (returned as is if already one)"""
+        if isinstance(student_profile, StudentFeatureVector):
+            return student_profile
+        features = self.prepare_student_features(student_profile)
+        encoded = json.dumps(features, sort_keys=True, default=str)
+        return StudentFeatureVector(
+            features, hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+        )
+
+    def top_k_matches(self, student_id, student_profile, matrix, k=10, offset=0,
+                      use_rl=True, retrieval=True, cache=None, pool_version=None,
+                      index=None, pin=False, available_only=False):
+        """
+        One page of ranked matches: entries offset..offset+k of the full
+        ranking, plus the total number of eligible tutors. Only the top
+        offset+k rows are selected (argpartition) and sorted, and match
+        dicts are built only for the returned page. k=None returns all.
+
+        With a MatchResultCache, the scored ranking is cached under
+        (student_id, feature fingerprint, pool_version, model_version), so a
+        repeat request only slices the cached order. With `pin`, the
+        ranking is stored as the student's pinned entry (see
+        MatchResultCache), e.g. when precomputed after the survey.
+
+        With `retrieval`, only candidates are scored: from the subject index
+        (see retrieve_candidates), or with a TutorEmbeddingIndex from the
+        index, re-ranked with the exact scores. Either way `total` counts
+        every eligible tutor in the pool, and a page deeper than the
+        candidates ranks the whole pool.
+
+        With `available_only`, tutors whose weekly availability shares no
+        hour with the student's are dropped before retrieval and scoring
+        (tutors without a weekly bitmap too); ignored when the student has
+        no weekly availability.
+        """
+        snapshot = self.snapshot()
+        limit = None if k is None else offset + k
+        embedded = retrieval and index is not None
+        ranked = None
+        if cache is not None:
+            started = time.perf_counter()
+            key = (
+                student_id, self.student_fingerprint(student_profile),
+                pool_version, snapshot.version, bool(use_rl),
+                'embedding' if embedded else bool(retrieval), bool(available_only)
+            )
+            ranked = cache.get(key)
+            if ranked is not None and ranked['max_limit'] is not None and (
+                limit is None or limit > ranked['max_limit']
+            ):
+                ranked = None  # page is deeper than the retrieved candidates
+
+        if ranked is None:
+            max_limit = None
+            if embedded:
+                if available_only:
+                    matrix = self.filter_available(student_profile, matrix)
+                candidates, total = self.retrieve_embedding_candidates(
+                    student_id, student_profile, matrix, index, limit, use_rl, snapshot
+                )
+                if candidates is not matrix:
+                    matrix, max_limit = candidates, candidates.size // 4
+            else:
+                features = self.prepare_student_features(student_profile)
+                pool = self.filter_available(student_profile, matrix) if available_only else matrix
+                total = int(np.count_nonzero(self._eligible_rows(features, pool)))
+                if retrieval:
+                    # The subject index holds full-pool rows: retrieve, then filter
+                    candidates = self.retrieve_candidates(student_profile, matrix, limit)
+                    if candidates is not matrix:
+                        if available_only:
+                            candidates = self.filter_available(student_profile, candidates)
+                        eligible = int(np.count_nonzero(self._eligible_rows(features, candidates)))
+                        # Too few left to fill the page: rank the whole pool
+                        if eligible >= limit:
+                            pool, max_limit = candidates, eligible
+                matrix = pool
+            scores = self.score_tutor_matrix(
+                student_id, student_profile, matrix, use_rl, snapshot
+            )
+            ranked = {
+                'matrix': matrix,
+                'scores': scores,
+                'order': self.rank_rows(scores, limit),
+                'limit': limit,
+                'max_limit': max_limit,
+                'total': total,
+            }
+            if cache is not None:
+                cache.put(key, ranked, pin=pin)
+            cache_hit = False
+        else:
+            cache_hit = True
+            if ranked['limit'] is not None and (limit is None or limit > ranked['limit']):
+                # Deeper page than previously ranked: extend the cached order
+                ranked['order'] = self.rank_rows(ranked['scores'], limit)
+                ranked['limit'] = limit
+
+        rows = ranked['order']
+        page = rows[offset:] if k is None else rows[offset:offset + k]
+        matches = [
+            self._match_entry(ranked['matrix'], ranked['scores'], row)
+            for row in page.tolist()
+        ]
+        if cache_hit:
+            cache.record_hit(time.perf_counter() - started)
+        return matches, ranked['total']
+
+    def match_many(self, students, matrix, k=10, use_rl=True, respect_capacity=False):
+        """
+        Rank tutors for a cohort of students in one vectorized pass.
+
+        `students` is a list of (student_id, student_profile). Tutor-side
+        terms (confidence, RL gate/score, penalty) are computed once and
+        every sub-score becomes a (students x tutors) array. Returns
+        {student_id: [match dicts]} with up to k matches each. With
+        `respect_capacity`, each tutor is given to at most `max_students`
+        students of the cohort, best-scoring pairs first.
+        """
+        if not students or matrix.size == 0:
+            return {student_id: [] for student_id, _ in students}
+
+        snapshot = self.snapshot()
+        memo = {}
+        student_scores = []
+        student_weights = []
+        for student_id, student_profile in students:
+            features = self.prepare_student_features(student_profile)
+            student_scores.append(self._student_side_scores(features, matrix, memo))
+            student_weights.append(
+                self.get_personalized_weights(student_id, self.base_weights, snapshot)
+                if use_rl and student_id else self.base_weights
+            )
+
+        scores = {
+            name: np.stack([row[name] for row in student_scores])
+            for name in ('eligible', 'subject_match', 'skill_compatibility',
+                         'schedule_match', 'language_match', 'learning_style_match')
+        }
+        scores['rating'] = matrix.rating_score
+        scores.update(self.tutor_side_terms(matrix, use_rl, snapshot))
+        weights = {
+            name: np.array([w[name] for w in student_weights])[:, None]
+            for name in self.base_weights
+        }
+        scores = self._finish_scores(scores, weights)
+
+        def scores_for(i):
+            return {name: (v[i] if v.ndim == 2 else v) for name, v in scores.items()}
+
+        if respect_capacity:
+            picks = self._assign_with_capacity(len(students), matrix, scores_for, k)
+        else:
+            picks = [self.rank_rows(scores_for(i), k).tolist() for i in range(len(students))]
+
+        return {
+            student_id: [self._match_entry(matrix, scores_for(i), row) for row in picks[i]]
+            for i, (student_id, _) in enumerate(students)
+        }
+
+    def _assign_with_capacity(self, n_students, matrix, scores_for, k):
+        """
+        Greedy capacity-aware assignment: walk (student, tutor) pairs from
+        the best score down, skipping tutors whose max_students is used up.
+        Returns a list of row lists, one per student, best first.
+        """
+        remaining = matrix.capacity.copy()
+        depth = min(matrix.size, 4 * k)
+        ranked = [self.rank_rows(scores_for(i), depth) for i in range(n_students)]
+
+        pairs = []
+        for i, rows in enumerate(ranked):
+            match_score = scores_for(i)['match_score']
+            pairs.extend((-int(match_score[row]), i, pos, row) for pos, row in enumerate(rows.tolist()))
+        pairs.sort()
+
+        picks = [[] for _ in range(n_students)]
+        for _, i, _, row in pairs:
+            if len(picks[i]) < k and remaining[row] > 0:
+                picks[i].append(row)
+                remaining[row] -= 1
+
+        # Students whose top candidates were all taken: continue down their ranking
+        for i in range(n_students):
+            if len(picks[i]) < k and len(ranked[i]) == depth:
+                for row in self.rank_rows(scores_for(i))[depth:].tolist():
+                    if len(picks[i]) >= k:
+                        break
+                    if remaining[row] > 0:
+                        picks[i].append(row)
+                        remaining[row] -= 1
+        return picks
+
+    def rank_students(self, tutor_profile, students, k=10, offset=0, use_rl=True,
+                      snapshot=None):
+        """
+        Reverse matching: one page of the students in a StudentFeatureMatrix
+        ranked by the score each of them would get for this tutor, plus
+        the number of eligible students. One vectorized pass over the pool.
+        """
+        snapshot = snapshot or self.snapshot()
+        tutor = TutorFeatureMatrix([tutor_profile], self)
+        terms = {
+            name: column[0] for name, column in
+            self.compute_tutor_terms(tutor, None, snapshot.performance).items()
+        }
+        if not use_rl:
+            terms['rl_gate'] = 0.0
+        with students.lock:
+            scores = students.score_tutor(
+                self.prepare_tutor_features(tutor_profile), float(tutor.rating_score[0]),
+                snapshot if use_rl else None
+            )
+            scores['final_score'] = np.clip(
+                self._raw_final_scores(scores['base_score'], terms), 0.0, 1.0
+            )
+            scores['match_score'] = (scores['final_score'] * 100).astype(int)
+            total = int(np.count_nonzero(scores['eligible']))
+            rows = self.rank_rows(scores, None if k is None else offset + k)
+            page = rows[offset:] if k is None else rows[offset:offset + k]
+            matches = [
+                {
+                    'student_id': students.ids[row],
+                    'student_name': students.names[row],
+                    'match_score': int(scores['match_score'][row]),
+                    'breakdown': {
+                        name: int(scores[name][row] * 100)
+                        for name in STUDENT_WEIGHT_FEATURES
+                    }
+                }
+                for row in page.tolist()
+            ]
+        return matches, total
+
+    def rank_rows(self, scores, limit=None):
+        """
+        Eligible matrix rows ordered by match_score, ties broken by pool
+        order (same order as a stable sort). With `limit`, only the best
+        `limit` rows are selected and sorted.
+        """
+        rows = np.flatnonzero(scores['eligible'])
+        # Unique descending key: score first, then earlier rows first
+        key = scores['match_score'][rows].astype(np.int64) * (len(rows) + 1) - np.arange(len(rows))
+        if limit is not None and limit < len(rows):
+            if limit <= 0:
+                return rows[:0]
+            top = np.argpartition(-key, limit - 1)[:limit]
+            return rows[top[np.argsort(-key[top])]]
+        return rows[np.argsort(-key)]
+
+    def _match_entry(self, matrix, scores, row):
+        """Build the public match dict for one scored matrix row"""
+        confidence = float(scores['confidence'][row])
+        rl_gate = float(scores['rl_gate'][row])
+        return {
+            'tutor_id':    matrix.ids[row],
+            'tutor_name':  matrix.names[row],
+            'match_score': int(scores['match_score'][row]),
+            'confidence':  round(confidence, 3),
+            'rl_gate':     round(rl_gate, 3),
+            'breakdown': {
+                'subject_match':        int(scores['subject_match'][row]       * 100),
+                'skill_compatibility':  int(scores['skill_compatibility'][row] * 100),
+                'schedule_match':       int(scores['schedule_match'][row]      * 100),
+                'language_match':       int(scores['language_match'][row]      * 100),
+                'learning_style_match': int(scores['learning_style_match'][row] * 100),
+                'rating':               int(scores['rating'][row]              * 100),
+                'rating_source':        matrix.rating_source[row],
+                'confidence':           int(confidence                         * 100),
+                'missing_penalty':      int(scores['missing_penalty'][row]     * 100),
+                'rl_gate':              int(rl_gate                            * 100),
+            }
+        }
+
+    def model_state(self):
+        """Picklable dict of all learned state (references, not copies)"""
+        return {
             'base_weights': self.base_weights,
             'subject_groups': self.subject_groups,
-            'q_table': dict(self.q_table),
-            'tutor_performance': dict(self.tutor_performance),
+            'q_table': self.q_table.to_state(),
+            'tutor_performance': self.tutor_performance.to_state(),
             'student_preferences': dict(self.student_preferences),
             'feature_rewards': dict(self.feature_rewards),
             'learning_rate': self.learning_rate,
             'discount_factor': self.discount_factor,
             'epsilon': self.epsilon,
-            'version': '3.0-RL',
+            'version': '3.2-RL',
             'last_updated': datetime.now().isoformat()
         }
-        
-        with open(filepath, 'wb') as f:
-            pickle.dump(model_data, f)
+
+    def save_model(self, filepath, extra=None):
+        """Save model with RL state (temp file + rename, never half-written)"""
+        with self._write_lock:
+            model_data = self.model_state()
+            model_data.update(extra or {})
+            payload = pickle.dumps(model_data, protocol=pickle.HIGHEST_PROTOCOL)
+        _atomic_write(filepath, payload)
         
         print(f"✓ RL Model saved to {filepath}")
     
+    def _migrate_preferences(self, prefs):
+        """Convert a 3.0-RL prefs dict (unbounded lists) to ring buffers"""
+        if isinstance(prefs.get('match_history'), RingBuffer):
+            return prefs
+        migrated = self._new_preferences()
+        migrated['weight_adjustments'] = prefs.get('weight_adjustments', {})
+        migrated['preferred_tutor_traits'] = prefs.get('preferred_tutor_traits', {})
+        history = prefs.get('match_history', [])
+        for entry in history[-self.history_size:]:
+            try:
+                tutor_id = int(entry.get('tutor_id'))
+            except (TypeError, ValueError):
+                tutor_id = -1
+            try:
+                timestamp = datetime.fromisoformat(entry['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                timestamp = 0.0
+            migrated['match_history'].append((tutor_id, entry.get('reward', 0.0), timestamp))
+        migrated['match_history'].total = len(history)
+        satisfaction = prefs.get('satisfaction_history', [])
+        for value in satisfaction[-self.history_size:]:
+            migrated['satisfaction_history'].append(value)
+        migrated['satisfaction_history'].total = len(satisfaction)
+        migrated['satisfaction_sum'] = float(sum(satisfaction))
+        return migrated
+
+    def _migrate_feature_rewards(self, feature_rewards):
+        """Regroup 3.0-RL '{student_id}_{feature}' lists into per-student windows"""
+        migrated = defaultdict(self._new_feature_window)
+        legacy = defaultdict(dict)
+        for key, value in feature_rewards.items():
+            if isinstance(value, WindowedCovariance):
+                migrated[key] = value
+                continue
+            for feature in self.IMPORTANCE_FEATURES:
+                if str(key).endswith('_' + feature):
+                    legacy[str(key)[:-len(feature) - 1]][feature] = value
+                    break
+        # Old keys were stringified; map back to the ids prefs are keyed by
+        ids = {str(student_id): student_id for student_id in self.student_preferences}
+        for student_key, histories in legacy.items():
+            migrated[ids.get(student_key, student_key)] = WindowedCovariance.from_history(
+                [histories.get(f, []) for f in self.IMPORTANCE_FEATURES],
+                self.feature_window,
+            )
+        return migrated
+
     def load_model(self, filepath):
-        """Load model with RL state"""
+        """Load model with RL state; returns the raw pickled dict"""
         with open(filepath, 'rb') as f:
             model_data = pickle.load(f)
         
-        self.base_weights = model_data.get('base_weights', self.base_weights)
-        self.subject_groups = model_data.get('subject_groups', self.subject_groups)
-        self.q_table = defaultdict(lambda: defaultdict(float), model_data.get('q_table', {}))
-        self.tutor_performance = defaultdict(lambda: {
-            'total_matches': 0,
-            'successful_matches': 0,
-            'avg_satisfaction': 0.0,
-            'completion_rate': 0.0,
-            'student_retention': 0.0,
-            'response_time_score': 1.0,
-            'reliability_score': 1.0,
-            'n_ratings': 0,  
-        }, model_data.get('tutor_performance', {}))
-        self.student_preferences = defaultdict(lambda: {
-            'weight_adjustments': {},
-            'preferred_tutor_traits': {},
-            'match_history': [],
-            'satisfaction_history': []
-        }, model_data.get('student_preferences', {}))
-        self.feature_rewards = defaultdict(list, model_data.get('feature_rewards', {}))
+        self.restore_state(model_data)
         
         print(f"✓ RL Model loaded from {filepath}")
+        return model_data
+
+    def restore_state(self, model_data):
+        """Replace learned state with a model_state() dict (or older pickle)"""
+        with self.writer():
+            self.base_weights = model_data.get('base_weights', self.base_weights)
+            self.subject_groups = model_data.get('subject_groups', self.subject_groups)
+            self._subject_categories = {}
+            # 3.0-RL pickles hold plain dicts; from_state() migrates them
+            self.q_table = QTable.from_state(model_data.get('q_table'))
+            self.tutor_performance = TutorPerformanceTable.from_state(
+                model_data.get('tutor_performance')
+            )
+            self.student_preferences = defaultdict(self._new_preferences, {
+                student_id: self._migrate_preferences(prefs)
+                for student_id, prefs in model_data.get('student_preferences', {}).items()
+            })
+            self.feature_rewards = self._migrate_feature_rewards(
+                model_data.get('feature_rewards', {})
+            )
+            self.model_version += 1
+            self._dirty_students = None  # rebuild every student's weights
+            self._dirty_tutors = None    # and every tutor's derived terms
+
+
+# Weekly availability: one bit per (day, hour), Monday 00:00 first.
+# Bit i lives in byte i // 8 (mask 1 << i % 8), so the DB column holds
+# WEEK_BYTES bytes and matcher dicts carry the same bytes as a hex string.
+WEEK_DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+WEEK_HOURS = 24
+WEEK_BITS = len(WEEK_DAYS) * WEEK_HOURS
+WEEK_BYTES = WEEK_BITS // 8
+WEEK_WORDS = -(-WEEK_BYTES // 8)  # uint64 words per bitmap in matrix columns
+WEEKLY_MATCH_HOURS = 4  # shared hours that fully cover a student's week
+
+
+def encode_weekly_availability(value):
+    """
+    Weekly availability as a hex bitmap (None when no hour is set).
+    Accepts {day: [hours]}, a list of 7 hour lists (Monday first), the
+    hex string itself or the raw column bytes. Raises ValueError.
+    """
+    if not value:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        raw = bytes(value)
+    elif isinstance(value, str):
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            raise ValueError('weekly_availability must be a hex bitmap') from None
+    else:
+        if isinstance(value, dict):
+            unknown = set(k.lower() for k in value) - set(WEEK_DAYS)
+            if unknown:
+                raise ValueError(f'unknown weekday: {sorted(unknown)[0]}')
+            days = {k.lower(): v for k, v in value.items()}
+            days = [days.get(day) or [] for day in WEEK_DAYS]
+        elif isinstance(value, (list, tuple)) and len(value) == len(WEEK_DAYS):
+            days = [hours or [] for hours in value]
+        else:
+            raise ValueError('weekly_availability needs 7 days of hours')
+        bitmap = bytearray(WEEK_BYTES)
+        for day, hours in enumerate(days):
+            for hour in hours:
+                if isinstance(hour, bool) or not isinstance(hour, int) or not 0 <= hour < WEEK_HOURS:
+                    raise ValueError(f'invalid hour: {hour!r}')
+                bit = day * WEEK_HOURS + hour
+                bitmap[bit >> 3] |= 1 << (bit & 7)
+        raw = bytes(bitmap)
+    if len(raw) != WEEK_BYTES:
+        raise ValueError(f'weekly_availability bitmap must be {WEEK_BYTES} bytes')
+    return raw.hex() if any(raw) else None
+
+
+def decode_weekly_availability(value):
+    """{day: [hours]} for a hex bitmap or column bytes ({} when unset)"""
+    if not value:
+        return {}
+    raw = bytes.fromhex(value) if isinstance(value, str) else bytes(value)
+    return {
+        day: [
+            hour for hour in range(WEEK_HOURS)
+            if raw[(d * WEEK_HOURS + hour) >> 3] >> ((d * WEEK_HOURS + hour) & 7) & 1
+        ]
+        for d, day in enumerate(WEEK_DAYS)
+    }
+
+
+def _weekly_feature(value):
+    """Normalized weekly bitmap for feature dicts; malformed input counts as unset"""
+    try:
+        return encode_weekly_availability(value)
+    except ValueError:
+        return None
+
+
+def _weekly_words(value):
+    """A hex weekly bitmap as WEEK_WORDS uint64 words (zero padded)"""
+    return np.frombuffer(bytes.fromhex(value).ljust(WEEK_WORDS * 8, b'\0'), dtype=np.uint64)
+
+
+def _weekly_rows(hex_values, n_rows):
+    """(n_rows, WEEK_WORDS) uint64 bitmaps and a has-bitmap mask"""
+    bits = np.zeros((n_rows, WEEK_WORDS), dtype=np.uint64)
+    present = np.zeros(n_rows, dtype=bool)
+    for row, value in enumerate(hex_values):
+        if value:
+            bits[row] = _weekly_words(value)
+            present[row] = True
+    return bits, present
+
+
+def _weekly_overlap(bits, words):
+    """Hours each bitmap row shares with one bitmap: popcount(row & words)"""
+    counts = np.bitwise_count(bits & words)
+    overlap = counts[:, 0].astype(np.intp)
+    for word in range(1, WEEK_WORDS):
+        overlap += counts[:, word]
+    return overlap
+
+
+def _pack_bits(rows, cols, n_rows, n_cols):
+    """Pack (row, col) membership pairs into a uint8 bitset matrix"""
+    bits = np.zeros((n_rows, max(1, (n_cols + 7) // 8)), dtype=np.uint8)
+    if len(cols):
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        np.bitwise_or.at(bits, (rows, cols >> 3), np.left_shift(1, cols & 7).astype(np.uint8))
+    return bits
+
+
+def _pack_mask(cols, n_cols):
+    """Single-row bitset with the given vocabulary columns set"""
+    return _pack_bits([0] * len(cols), cols, 1, n_cols)[0]
+
+
+def _postings(rows, cols, n_cols):
+    """Inverted index: for each vocabulary column, the rows that have it"""
+    rows = np.asarray(rows, dtype=np.intp)
+    cols = np.asarray(cols, dtype=np.intp)
+    order = np.argsort(cols, kind='stable')
+    counts = np.bincount(cols, minlength=n_cols)
+    return np.split(rows[order], np.cumsum(counts)[:-1]) if n_cols else []
+
+
+class TutorFeatureMatrix:
+    """
+    Columnar snapshot of a tutor pool for batch scoring.
+
+    List features (expertise, subject categories, languages, available
+    slots) are stored as bitsets over a vocabulary shared by the pool;
+    weekly availability as a bitmap of WEEK_WORDS words per row; teaching style
+    and gender as integer codes; rating, sessions and the profile-only
+    penalty as numeric columns. Built once per pool, then scored against
+    any number of students.
+    """
+
+    def __init__(self, tutors_list, matcher):
+        self.matcher = matcher
+        self.tutors = list(tutors_list)
+        n = len(self.tutors)
+        self.size = n
+        self.ids = [t.get('id') for t in self.tutors]
+        self.names = [t.get('name') for t in self.tutors]
+        self.row_of = {tutor_id: row for row, tutor_id in enumerate(self.ids)}
+
+        self.categories = list(matcher.subject_groups)
+        category_col = {c: i for i, c in enumerate(self.categories)}
+        self.expertise_vocab = {}
+        self.expertise_category = []
+        self.language_vocab = {}
+        self.slot_vocab = {}
+        self.style_vocab = {}
+        self.gender_vocab = {'': 0}
+
+        exp_rows, exp_cols = [], []
+        cat_rows, cat_cols = [], []
+        lang_rows, lang_cols = [], []
+        slot_rows, slot_cols = [], []
+        weekly = []
+
+        self.has_expertise = np.zeros(n, dtype=bool)
+        self.has_languages = np.zeros(n, dtype=bool)
+        self.has_availability = np.zeros(n, dtype=bool)
+        self.schedule_is_dict = np.zeros(n, dtype=bool)  # non-empty availability dict
+        self.has_schedule = np.zeros(n, dtype=bool)      # ... with >= 1 available slot
+        self.rating_present = np.zeros(n, dtype=bool)
+        self.rating_score = np.zeros(n)
+        self.rating_source = []
+        self.total_sessions = np.zeros(n)
+        self.style_codes = np.zeros(n, dtype=np.intp)
+        self.gender_codes = np.zeros(n, dtype=np.intp)
+        self.profile_penalty = np.zeros(n)
+        self.capacity = np.full(n, np.inf)  # max_students, unlimited if unset
+
+        for row, tutor in enumerate(self.tutors):
+            features = matcher.prepare_tutor_features(tutor)
+
+            for token in features['expertise']:
+                col = self.expertise_vocab.get(token)
+                if col is None:
+                    col = self.expertise_vocab[token] = len(self.expertise_vocab)
+                    category = matcher.get_subject_category(token)
+                    self.expertise_category.append(category_col.get(category, -1))
+                exp_rows.append(row)
+                exp_cols.append(col)
+                if self.expertise_category[col] >= 0:
+                    cat_rows.append(row)
+                    cat_cols.append(self.expertise_category[col])
+
+            for language in features['languages']:
+                col = self.language_vocab.setdefault(language, len(self.language_vocab))
+                lang_rows.append(row)
+                lang_cols.append(col)
+
+            availability = features['availability']
+            self.has_availability[row] = bool(availability or features['weekly_availability'])
+            weekly.append(features['weekly_availability'])
+            if availability and isinstance(availability, dict):
+                self.schedule_is_dict[row] = True
+                for slot, available in availability.items():
+                    if available:
+                        col = self.slot_vocab.setdefault(slot.lower(), len(self.slot_vocab))
+                        slot_rows.append(row)
+                        slot_cols.append(col)
+                        self.has_schedule[row] = True
+
+            self.has_expertise[row] = bool(features['expertise'])
+            self.has_languages[row] = bool(features['languages'])
+
+            self.rating_source.append(None)
+            self._set_stats(row, tutor, features)
+            self.style_codes[row] = self.style_vocab.setdefault(
+                features['teaching_style'], len(self.style_vocab))
+            self.gender_codes[row] = self.gender_vocab.setdefault(
+                features['gender'], len(self.gender_vocab))
+            try:
+                self.capacity[row] = int(tutor.get('max_students'))
+            except (TypeError, ValueError):
+                pass
+
+        self.expertise_category = np.array(self.expertise_category, dtype=np.intp)
+        self.expertise_bits = _pack_bits(exp_rows, exp_cols, n, len(self.expertise_vocab))
+        self.category_bits = _pack_bits(cat_rows, cat_cols, n, len(self.categories))
+        self.language_bits = _pack_bits(lang_rows, lang_cols, n, len(self.language_vocab))
+        self.slot_bits = _pack_bits(slot_rows, slot_cols, n, len(self.slot_vocab))
+        self.weekly_bits, self.has_weekly = _weekly_rows(weekly, n)
+        self._subject_cache = {}
+        self._id_array = None
+
+        # Inverted index for candidate retrieval: expertise token -> rows,
+        # subject category -> rows
+        self.expertise_postings = _postings(exp_rows, exp_cols, len(self.expertise_vocab))
+        self.category_postings = _postings(cat_rows, cat_cols, len(self.categories))
+
+        # Per-tutor score terms for the latest model snapshot (tutor_terms);
+        # subsets read their rows from the full matrix
+        self._root = self
+        self._root_rows = None
+        self._terms = None
+        self._terms_lock = threading.Lock()
+        self._stale_rows = set()
+
+    def subset(self, rows):
+        """
+        A matrix restricted to `rows` (ascending), sharing vocabularies and
+        caches with this one. Used to score only retrieved candidates.
+        """
+        view = TutorFeatureMatrix.__new__(TutorFeatureMatrix)
+        view.__dict__.update(self.__dict__)
+        view._root_rows = rows if self._root_rows is None else self._root_rows[rows]
+        view.size = len(rows)
+        view.tutors = [self.tutors[r] for r in rows]
+        view.ids = [self.ids[r] for r in rows]
+        view.names = [self.names[r] for r in rows]
+        view.rating_source = [self.rating_source[r] for r in rows]
+        view.row_of = {tutor_id: i for i, tutor_id in enumerate(view.ids)}
+        view._id_array = None
+        for name in self.ROW_COLUMNS:
+            setattr(view, name, getattr(self, name)[rows])
+        return view
+
+    # Per-row numpy columns (sliced by subset())
+    ROW_COLUMNS = (
+        'has_expertise', 'has_languages', 'has_availability', 'schedule_is_dict',
+        'has_schedule', 'rating_present', 'rating_score', 'total_sessions',
+        'style_codes', 'gender_codes', 'profile_penalty', 'capacity',
+        'expertise_bits', 'category_bits', 'language_bits', 'slot_bits',
+        'weekly_bits', 'has_weekly',
+    )
+
+    def id_array(self):
+        """Tutor ids as an int64 array (computed once per matrix or subset)"""
+        if self._id_array is None:
+            self._id_array = np.array(self.ids, dtype=np.int64)
+        return self._id_array
+
+    def candidate_rows(self, student_subjects):
+        """
+        Rows whose expertise matches any student subject exactly, by
+        substring, or by subject_groups category -- every tutor that can
+        get a non-zero subject score. Sorted ascending.
+        """
+        postings = []
+        for subject in student_subjects:
+            terms = self._subject_terms(subject.lower())
+            postings.extend(self.expertise_postings[col] for col in terms['fuzzy'])
+            postings.extend(self.category_postings[col] for col in terms['category'])
+        if not postings:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(postings))
+
+    def _set_stats(self, row, tutor, features):
+        """Fill the rating/session columns and the profile penalty for a row"""
+        raw_rating = tutor.get('rating')
+        self.rating_present[row] = raw_rating is not None
+        self.rating_score[row] = self.matcher.normalize_rating(raw_rating) if raw_rating else 0.0
+        self.rating_source[row] = 'verified' if raw_rating else 'missing'
+        self.total_sessions[row] = features['total_sessions']
+
+        # Same order as calculate_missing_penalty; the history term
+        # depends on tutor_performance and is added at scoring time
+        penalty = 0.0
+        if raw_rating is None:
+            penalty += 0.08
+        if not (tutor.get('availability') or tutor.get('weekly_availability')):
+            penalty += 0.06
+        if not tutor.get('expertise'):
+            penalty += 0.10
+        if not tutor.get('languages'):
+            penalty += 0.04
+        self.profile_penalty[row] = penalty
+
+    # Per-row numpy columns _set_stats() writes
+    STAT_COLUMNS = ('rating_present', 'rating_score', 'total_sessions', 'profile_penalty')
+
+    def with_stats(self, tutor):
+        """
+        A new matrix with rating and total_sessions replaced for a tutor
+        already in this one. Neither touches a vocabulary, so everything
+        else is shared; the stat columns are copied, so a reader still
+        scoring this matrix never sees them change. Cached tutor terms
+        carry over with the row marked stale.
+        """
+        row = self.row_of[tutor.get('id')]
+        patched = TutorFeatureMatrix.__new__(TutorFeatureMatrix)
+        patched.__dict__.update(self.__dict__)
+        patched.tutors = list(self.tutors)
+        patched.tutors[row] = tutor
+        patched.rating_source = list(self.rating_source)
+        for name in self.STAT_COLUMNS:
+            setattr(patched, name, getattr(self, name).copy())
+        patched._set_stats(row, tutor, self.matcher.prepare_tutor_features(tutor))
+        patched._root = patched
+        patched._terms_lock = threading.Lock()
+        with self._terms_lock:
+            patched._terms = self._terms
+            patched._stale_rows = self._stale_rows | {row}
+        return patched
+
+    def tutor_terms(self, snapshot):
+        """
+        Confidence, RL gate, RL score and missing penalty for every row
+        under a model snapshot, as read-only arrays. Kept for the latest
+        snapshot seen; a newer one recomputes only rows of tutors it
+        changed plus rows patched by with_stats().
+        """
+        if self._root is not self:
+            terms = self._root.tutor_terms(snapshot)
+            return {name: column[self._root_rows] for name, column in terms.items()}
+
+        with self._terms_lock:
+            cached = self._terms
+            if cached is not None and cached[0] == snapshot.version and not self._stale_rows:
+                return cached[1]
+            changed = None if cached is None else snapshot.changed_tutors(cached[0])
+            if changed is None and cached is not None and cached[0] > snapshot.version:
+                # A request still on an older snapshot: serve it uncached
+                return self.matcher.compute_tutor_terms(self, None, snapshot.performance)
+
+            if changed is None:
+                terms = self.matcher.compute_tutor_terms(self, None, snapshot.performance)
+            else:
+                rows = set(self._stale_rows)
+                rows.update(self.row_of[t] for t in changed if t in self.row_of)
+                terms = cached[1]
+                if rows:
+                    rows = np.fromiter(sorted(rows), dtype=np.intp, count=len(rows))
+                    fresh = self.matcher.compute_tutor_terms(self, rows, snapshot.performance)
+                    terms = {name: column.copy() for name, column in terms.items()}
+                    for name, column in fresh.items():
+                        terms[name][rows] = column
+            for column in terms.values():
+                column.flags.writeable = False
+            self._stale_rows = set()
+            self._terms = (snapshot.version, terms)
+            return terms
+
+    def _has_any(self, bits, mask):
+        return (bits & mask).any(axis=1)
+
+    def _subject_terms(self, subject):
+        """
+        Exact / substring / category vocabulary columns and bit masks for
+        one student subject. The substring scan over the vocabulary runs
+        once per distinct subject per matrix.
+        """
+        terms = self._subject_cache.get(subject)
+        if terms is None:
+            vocab_size = len(self.expertise_vocab)
+            exact = self.expertise_vocab.get(subject)
+            exact_cols = [] if exact is None else [exact]
+            fuzzy_cols = [
+                col for token, col in self.expertise_vocab.items()
+                if subject in token or token in subject
+            ]
+            category = self.matcher.get_subject_category(subject)
+            category_cols = (
+                [self.categories.index(category)] if category in self.categories else []
+            )
+            terms = {
+                'exact': exact_cols,
+                'fuzzy': fuzzy_cols,
+                'category': category_cols,
+                'masks': (
+                    _pack_mask(exact_cols, vocab_size),
+                    _pack_mask(fuzzy_cols, vocab_size),
+                    _pack_mask(category_cols, len(self.categories)),
+                ),
+            }
+            self._subject_cache[subject] = terms
+        return terms
+
+    def subject_scores(self, student_subjects):
+        """Vectorized calculate_subject_match"""
+        if not student_subjects:
+            return np.full(self.size, 0.3)
+
+        total = np.zeros(self.size)
+        for subject in student_subjects:
+            exact, fuzzy, category = self._subject_terms(subject.lower())['masks']
+            total += np.where(
+                self._has_any(self.expertise_bits, exact), 1.0,
+                np.where(
+                    self._has_any(self.expertise_bits, fuzzy), 0.8,
+                    np.where(self._has_any(self.category_bits, category), 0.6, 0.0)
+                )
+            )
+        return np.where(self.has_expertise, total / len(student_subjects), 0.3)
+
+    def skill_scores(self, student_features):
+        """Vectorized calculate_skill_compatibility"""
+        avg_score = np.mean([
+            student_features.get('math_score', 5),
+            student_features.get('science_score', 5),
+            student_features.get('language_score', 5),
+            student_features.get('tech_score', 5)
+        ])
+        skill_map = {
+            'beginner': 0.2,
+            'intermediate': 0.5,
+            'advanced': 0.8,
+            'expert': 1.0
+        }
+        skill_value = skill_map.get(student_features['skill_level'].lower(), 0.5)
+        student_capability = 0.6 * skill_value + 0.4 * (avg_score / 10.0)
+
+        sessions = self.total_sessions
+        compatibility = np.select(
+            [sessions > 200, sessions > 100, sessions > 30],
+            [1.0, 0.85, 0.70],
+            default=0.90 if student_capability < 0.5 else 0.65
+        )
+        if student_features.get('motivation_level', 5) / 10.0 > 0.7:
+            compatibility = np.where(
+                sessions > 100, np.minimum(1.0, compatibility + 0.05), compatibility
+            )
+        return compatibility
+
+    def schedule_scores(self, student_time, student_weekly=None):
+        """
+        Vectorized schedule_match: weekly bitmap overlap for rows with a
+        bitmap when the student has one, calculate_schedule_match otherwise
+        """
+        slot_scores = self._slot_schedule_scores(student_time)
+        if not student_weekly or not self.has_weekly.any():
+            return slot_scores
+        return np.where(self.has_weekly, self.weekly_scores(student_weekly), slot_scores)
+
+    def weekly_overlap(self, student_weekly):
+        """Hours each row shares with a student's weekly bitmap (hex)"""
+        return _weekly_overlap(self.weekly_bits, _weekly_words(student_weekly))
+
+    def weekly_scores(self, student_weekly):
+        """Vectorized calculate_weekly_schedule_match (rows without a bitmap included)"""
+        needed = min(int(student_weekly, 16).bit_count(), WEEKLY_MATCH_HOURS)
+        return 0.35 + 0.6 * np.minimum(1.0, self.weekly_overlap(student_weekly) / needed)
+
+    def available_rows(self, student_weekly):
+        """Rows whose weekly bitmap shares at least one hour with the student's"""
+        return np.flatnonzero(self.weekly_overlap(student_weekly) > 0)
+
+    def _slot_schedule_scores(self, student_time):
+        """Vectorized calculate_schedule_match"""
+        student_time = student_time.lower()
+        adjacent_times = {
+            'morning': ['afternoon'],
+            'afternoon': ['morning', 'evening'],
+            'evening': ['afternoon']
+        }
+        slots = len(self.slot_vocab)
+        exact = self.slot_vocab.get(student_time)
+        adjacent = [
+            self.slot_vocab[t] for t in adjacent_times.get(student_time, [])
+            if t in self.slot_vocab
+        ]
+        exact_hit = self._has_any(
+            self.slot_bits, _pack_mask([] if exact is None else [exact], slots))
+        adjacent_hit = self._has_any(self.slot_bits, _pack_mask(adjacent, slots))
+
+        return np.select(
+            [~self.schedule_is_dict, ~self.has_schedule, exact_hit, adjacent_hit],
+            [0.5, 0.3, 0.88, 0.65],
+            default=0.35
+        )
+
+    def language_scores(self, student_languages):
+        """Vectorized calculate_language_match"""
+        if not student_languages:
+            return np.full(self.size, 0.5)
+
+        student_set = set(l.lower() for l in student_languages)
+        cols = [self.language_vocab[l] for l in student_set if l in self.language_vocab]
+        common = np.bitwise_count(
+            self.language_bits & _pack_mask(cols, len(self.language_vocab))
+        ).sum(axis=1)
+        overlap_ratio = common / len(student_set)
+
+        scores = np.select(
+            [common == 0,
+             (overlap_ratio == 1.0) & (common > 1),
+             overlap_ratio == 1.0],
+            [0.0, 0.95, 0.85],
+            default=0.6 + (0.25 * overlap_ratio)
+        )
+        return np.where(self.has_languages, scores, 0.5)
+
+    def style_scores(self, student_style):
+        """Vectorized calculate_learning_style_match via a per-style lookup"""
+        table = np.zeros(max(1, len(self.style_vocab)))
+        for style, code in self.style_vocab.items():
+            table[code] = self.matcher.calculate_learning_style_match(student_style, style)
+        return table[self.style_codes]
+
+
+# Feature order of StudentFeatureMatrix weight columns
+STUDENT_WEIGHT_FEATURES = (
+    'subject_match', 'skill_compatibility', 'schedule_match',
+    'language_match', 'learning_style_match', 'rating',
+)
+
+
+class StudentFeatureMatrix:
+    """
+    Columnar, updatable pool of student features for reverse matching
+    (ranking students for one tutor).
+
+    Each row points at an interned subject list and language set (code
+    matrices padded with -1, over vocabularies that only grow);
+    capability, schedule, style and gender preference are per-row codes
+    or values, weekly availability a per-row bitmap. Base scores use the base weights; only rows of students
+    with personalized weights are re-weighted. upsert()/remove() change one row in place (removed rows are reused),
+    so saving a survey never rebuilds the pool. Scoring a tutor
+    evaluates each sub-score once per distinct value (subject list,
+    language set, time slot, style) with the pairwise formulas and
+    gathers it per row.
+
+    Hold `lock` while reading rows; writers take it too.
+    """
+
+    SKILL_LEVELS = {'beginner': 0.2, 'intermediate': 0.5, 'advanced': 0.8, 'expert': 1.0}
+    MAX_SUBJECT_TABLES = 256
+
+    def __init__(self, matcher, capacity=64):
+        self.matcher = matcher
+        self.lock = threading.RLock()
+        self.row_of = {}
+        self.ids = []    # None for a free row
+        self.names = []
+        self._free = []
+        self.size = 0    # rows handed out, free ones included
+        self.version = 0
+        self.subject_vocab = {}
+        self.language_vocab = {}
+        self.subject_lists = {}   # sorted subject tuple -> list id
+        self.language_sets = {}   # sorted language tuple -> set id
+        self.list_subject_codes = np.full((0, 4), -1, dtype=np.int32)
+        self.set_language_codes = np.full((0, 2), -1, dtype=np.int32)
+        self.list_sizes = np.zeros(0, dtype=np.int32)
+        self.set_sizes = np.zeros(0, dtype=np.int32)
+        self.time_vocab = {}
+        self.style_vocab = {}
+        self.gender_vocab = {'no_preference': 0}
+        self._subject_tables = {}  # tutor expertise -> per-subject scores
+        self._weight_base = None
+        self._weight_sources = {}  # student_id -> (personal_weights entry, weights)
+        self._personal = None      # (snapshot version, pool version, rows, weights)
+
+        self.capacity = 0
+        self.active = np.zeros(0, dtype=bool)
+        self.subject_list_codes = np.zeros(0, dtype=np.intp)
+        self.language_set_codes = np.zeros(0, dtype=np.intp)
+        self.capability = np.zeros(0)
+        self.motivated = np.zeros(0, dtype=bool)
+        self.time_codes = np.zeros(0, dtype=np.intp)
+        self.style_codes = np.zeros(0, dtype=np.intp)
+        self.gender_codes = np.zeros(0, dtype=np.intp)
+        self.weekly_bits = np.zeros((0, WEEK_WORDS), dtype=np.uint64)
+        self.weekly_needed = np.zeros(0, dtype=np.intp)  # 0 = no bitmap
+        self._reserve(capacity)
+
+    # Per-row columns, grown together by _reserve()
+    ROW_COLUMNS = (
+        'active', 'subject_list_codes', 'language_set_codes', 'capability',
+        'motivated', 'time_codes', 'style_codes', 'gender_codes',
+        'weekly_bits', 'weekly_needed',
+    )
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def __contains__(self, student_id):
+        return str(student_id) in self.row_of
+
+    def _reserve(self, rows):
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, 2 * self.capacity, 64)
+        for name in self.ROW_COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def _intern(self, tokens, groups, vocab, codes_name, sizes_name):
+        """Id of a token group (subject list / language set), added if new"""
+        key = tuple(sorted(tokens))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = len(groups)
+            codes = getattr(self, codes_name)
+            if group >= len(codes) or len(key) > codes.shape[1]:
+                grown = np.full(
+                    (max(2 * len(codes), group + 1, 16), max(codes.shape[1], len(key))),
+                    -1, dtype=np.int32)
+                grown[:len(codes), :codes.shape[1]] = codes
+                setattr(self, codes_name, grown)
+                sizes = np.zeros(len(grown), dtype=np.int32)
+                sizes[:len(getattr(self, sizes_name))] = getattr(self, sizes_name)
+                setattr(self, sizes_name, sizes)
+            getattr(self, codes_name)[group, :len(key)] = [
+                vocab.setdefault(token, len(vocab)) for token in key
+            ]
+            getattr(self, sizes_name)[group] = len(key)
+        return group
+
+    def load(self, students):
+        """Add many (student_id, features, name) at once (startup)"""
+        with self.lock:
+            self._reserve(self.size + len(students))
+            for student_id, features, name in students:
+                self.upsert(student_id, features, name)
+
+    def upsert(self, student_id, features, name=None):
+        """Add or replace a student from prepared features (StudentFeatureVector)"""
+        student_id = str(student_id)
+        matcher = self.matcher
+        features = matcher.prepare_student_features(features)
+        with self.lock:
+            row = self.row_of.get(student_id)
+            if row is None:
+                if self._free:
+                    row = self._free.pop()
+                else:
+                    row = self.size
+                    self.size += 1
+                    self._reserve(self.size)
+                    self.ids.append(None)
+                    self.names.append(None)
+                self.row_of[student_id] = row
+                self.ids[row] = student_id
+            self.names[row] = name
+
+            # Subject duplicates count (mean over the list), languages are a set
+            self.subject_list_codes[row] = self._intern(
+                features['preferred_subjects'], self.subject_lists, self.subject_vocab,
+                'list_subject_codes', 'list_sizes')
+            self.language_set_codes[row] = self._intern(
+                set(features['preferred_languages']), self.language_sets, self.language_vocab,
+                'set_language_codes', 'set_sizes')
+
+            avg_score = sum([
+                features.get('math_score', 5),
+                features.get('science_score', 5),
+                features.get('language_score', 5),
+                features.get('tech_score', 5)
+            ]) / 4.0
+            skill_value = self.SKILL_LEVELS.get(features['skill_level'].lower(), 0.5)
+            self.capability[row] = 0.6 * skill_value + 0.4 * (avg_score / 10.0)
+            self.motivated[row] = features.get('motivation_level', 5) / 10.0 > 0.7
+            self.time_codes[row] = self.time_vocab.setdefault(
+                features['available_time'], len(self.time_vocab))
+            self.style_codes[row] = self.style_vocab.setdefault(
+                features['learning_style'], len(self.style_vocab))
+            self.gender_codes[row] = self.gender_vocab.setdefault(
+                features['tutor_gender_preference'], len(self.gender_vocab))
+            weekly = features.get('weekly_availability')
+            if weekly:
+                self.weekly_bits[row] = _weekly_words(weekly)
+                self.weekly_needed[row] = min(int(weekly, 16).bit_count(), WEEKLY_MATCH_HOURS)
+            else:
+                self.weekly_bits[row] = 0
+                self.weekly_needed[row] = 0
+            self.active[row] = True
+            self.version += 1
+
+    def remove(self, student_id):
+        """Drop a student; the row is reused by a later upsert"""
+        student_id = str(student_id)
+        with self.lock:
+            row = self.row_of.pop(student_id, None)
+            if row is None:
+                return
+            self.active[row] = False
+            self.ids[row] = None
+            self.names[row] = None
+            self._free.append(row)
+            self.version += 1
+
+    def personal_weights(self, snapshot, base):
+        """
+        (rows, weights) of pool students with personalized weights under
+        `snapshot` (get_personalized_weights(), one row per student).
+        Students whose adjustments did not change keep their weights.
+        """
+        if self._weight_base is None or not np.array_equal(base, self._weight_base):
+            self._weight_base = base
+            self._weight_sources = {}
+            self._personal = None
+        cached = self._personal
+        if cached is not None and cached[:2] == (snapshot.version, self.version):
+            return cached[2], cached[3]
+
+        previous = self._weight_sources
+        sources = {}
+        for student_id, adjustments in snapshot.personal_weights.items():
+            known = previous.get(student_id)
+            if known is not None and known[0] is adjustments:
+                sources[student_id] = known
+                continue
+            weights = base * (1 + np.array([
+                adjustments.get(f, 0.0) for f in STUDENT_WEIGHT_FEATURES
+            ]))
+            sources[student_id] = (adjustments, weights / weights.sum())
+        self._weight_sources = sources
+
+        members = [s for s in sources if s in self.row_of]
+        rows = np.array([self.row_of[s] for s in members], dtype=np.intp)
+        weights = np.array([sources[s][1] for s in members]).reshape(
+            len(members), len(STUDENT_WEIGHT_FEATURES))
+        self._personal = (snapshot.version, self.version, rows, weights)
+        return rows, weights
+
+    def _subject_table(self, expertise):
+        """calculate_subject_match per subject in the vocabulary (plus a 0 pad)"""
+        key = tuple(expertise)
+        table = self._subject_tables.get(key)
+        if table is None or len(table) <= len(self.subject_vocab):
+            done = 0 if table is None else len(table) - 1
+            tokens = list(self.subject_vocab)[done:]
+            fresh = [self.matcher.calculate_subject_match([s], expertise) for s in tokens]
+            table = np.array(([] if table is None else list(table[:-1])) + fresh + [0.0])
+            if len(self._subject_tables) >= self.MAX_SUBJECT_TABLES:
+                self._subject_tables.clear()
+            self._subject_tables[key] = table
+        return table
+
+    def score_tutor(self, tutor_features, rating_score, snapshot=None):
+        """
+        Eligibility, the six sub-scores and the weighted base score of
+        every row for one tutor (prepare_tutor_features() dict). Weights
+        are personalized under `snapshot`, base weights without one.
+        Caller holds `lock`.
+        """
+        matcher = self.matcher
+        n = self.size
+        if tutor_features['expertise']:
+            lists = len(self.subject_lists)
+            sizes = self.list_sizes[:lists]
+            hits = self._subject_table(
+                tutor_features['expertise'])[self.list_subject_codes[:lists]].sum(axis=1)
+            by_list = np.where(sizes > 0, hits / np.maximum(sizes, 1), 0.3)
+            subject = by_list[self.subject_list_codes[:n]]
+        else:
+            subject = np.full(n, 0.3)
+
+        sessions = tutor_features['total_sessions']
+        if sessions > 200:
+            skill = np.full(n, 1.0)
+        elif sessions > 100:
+            skill = np.full(n, 0.85)
+        elif sessions > 30:
+            skill = np.full(n, 0.70)
+        else:
+            skill = np.where(self.capability[:n] < 0.5, 0.90, 0.65)
+        if sessions > 100:
+            skill = np.where(self.motivated[:n], np.minimum(1.0, skill + 0.05), skill)
+
+        availability = tutor_features['availability']
+        schedule = np.array([
+            matcher.calculate_schedule_match(t, availability) for t in self.time_vocab
+        ] or [0.0])[self.time_codes[:n]]
+        tutor_weekly = tutor_features['weekly_availability']
+        needed = self.weekly_needed[:n]
+        if tutor_weekly and needed.any():
+            overlap = _weekly_overlap(self.weekly_bits[:n], _weekly_words(tutor_weekly))
+            schedule = np.where(
+                needed > 0,
+                0.35 + 0.6 * np.minimum(1.0, overlap / np.maximum(needed, 1)),
+                schedule)
+
+        tutor_languages = set(tutor_features['languages'])
+        if tutor_languages:
+            groups = len(self.language_sets)
+            sizes = self.set_sizes[:groups]
+            known = np.array([l in tutor_languages for l in self.language_vocab] + [False])
+            common = known[self.set_language_codes[:groups]].sum(axis=1)
+            ratio = common / np.maximum(sizes, 1)
+            by_set = np.select(
+                [sizes == 0, common == 0, (ratio == 1.0) & (common > 1), ratio == 1.0],
+                [0.5, 0.0, 0.95, 0.85],
+                default=0.6 + 0.25 * ratio
+            )
+            language = by_set[self.language_set_codes[:n]]
+        else:
+            language = np.full(n, 0.5)
+
+        style = np.array([
+            matcher.calculate_learning_style_match(s, tutor_features['teaching_style'])
+            for s in self.style_vocab
+        ] or [0.0])[self.style_codes[:n]]
+
+        eligible = self.active[:n].copy()
+        tutor_gender = tutor_features['gender']
+        if tutor_gender:
+            preference = self.gender_codes[:n]
+            eligible &= (preference == 0) | (
+                preference == self.gender_vocab.get(tutor_gender, -1))
+
+        scores = {
+            'eligible': eligible,
+            'subject_match': subject,
+            'skill_compatibility': skill,
+            'schedule_match': schedule,
+            'language_match': language,
+            'learning_style_match': style,
+            'rating': np.full(n, rating_score),
+        }
+        base = np.array([matcher.base_weights[f] for f in STUDENT_WEIGHT_FEATURES])
+        scores['base_score'] = sum(
+            base[i] * scores[name] for i, name in enumerate(STUDENT_WEIGHT_FEATURES)
+        )
+        if snapshot is not None:
+            rows, weights = self.personal_weights(snapshot, base)
+            if len(rows):
+                scores['base_score'][rows] = sum(
+                    weights[:, i] * scores[name][rows]
+                    for i, name in enumerate(STUDENT_WEIGHT_FEATURES)
+                )
+        return scores
+
+
+class TutorFeatureStore:
+    """
+    In-process tutor pool for matching, keyed by tutor (user) id.
+
+    Entries hold parsed, normalized matcher inputs plus the display fields
+    the match endpoint returns, so serving a match needs no DB reads and
+    no JSON parsing. Writers call upsert()/remove() after a profile
+    change; the TutorFeatureMatrix is rebuilt lazily on the next read,
+    except for rating/session updates, which swap in a copy with the
+    stat columns patched (matrices handed to readers never change).
+    With `embeddings`, a TutorEmbeddingIndex is kept up to date alongside.
+    """
+
+    # Fields that only change numeric matrix columns
+    STAT_FIELDS = ('rating', 'total_sessions')
+
+    def __init__(self, matcher, embeddings=False):
+        self.matcher = matcher
+        self.tutors = {}
+        self.version = 0
+        self._matrix = None
+        self._lock = threading.RLock()
+        self.embedding_index = TutorEmbeddingIndex(matcher) if embeddings else None
+
+    def __len__(self):
+        return len(self.tutors)
+
+    def __contains__(self, tutor_id):
+        return tutor_id in self.tutors
+
+    def get(self, tutor_id, default=None):
+        return self.tutors.get(tutor_id, default)
+
+    def normalize(self, tutor):
+        """Lowercase/strip list tokens and codes once, at write time"""
+        entry = dict(tutor)
+        entry['expertise'] = [
+            e.lower().strip() for e in (tutor.get('expertise') or []) if e and e.strip()
+        ]
+        entry['languages'] = [
+            l.lower().strip() for l in (tutor.get('languages') or []) if l and l.strip()
+        ]
+        entry['teaching_style'] = (tutor.get('teaching_style') or 'adaptive').lower()
+        entry['gender'] = (tutor.get('gender') or '').lower().strip()
+        entry['weekly_availability'] = _weekly_feature(tutor.get('weekly_availability'))
+        return entry
+
+    def load(self, tutors_list):
+        """Replace the whole pool (startup warm-up)"""
+        with self._lock:
+            self.tutors = {t['id']: self.normalize(t) for t in tutors_list}
+            self._matrix = None
+            self.version += 1
+            if self.embedding_index is not None:
+                self.embedding_index.load(list(self.tutors.values()))
+
+    def upsert(self, tutor):
+        """Insert or update one tutor"""
+        entry = self.normalize(tutor)
+        tutor_id = entry['id']
+        with self._lock:
+            previous = self.tutors.get(tutor_id)
+            self.tutors[tutor_id] = entry
+            self.version += 1
+            if previous is not None and self._matrix is not None and all(
+                previous.get(k) == entry.get(k)
+                for k in entry.keys() | previous.keys()
+                if k not in self.STAT_FIELDS
+            ):
+                self._matrix = self._matrix.with_stats(entry)
+            else:
+                self._matrix = None
+            if self.embedding_index is not None:
+                self.embedding_index.upsert(entry)
+
+    def remove(self, tutor_id):
+        """Drop a tutor (deleted or no longer verified)"""
+        with self._lock:
+            if self.tutors.pop(tutor_id, None) is not None:
+                self._matrix = None
+                self.version += 1
+                if self.embedding_index is not None:
+                    self.embedding_index.remove(tutor_id)
+
+    def matrix(self):
+        """Current TutorFeatureMatrix, rebuilt only after structural changes"""
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """(version, matrix) read together, so a version never labels older data"""
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = self.matcher.build_tutor_matrix(list(self.tutors.values()))
+            return self.version, self._matrix
+
+
+class StudentFeatureVector(dict):
+    """
+    Normalized student features (prepare_student_features() output) plus
+    their fingerprint, built once per profile version and accepted by
+    every matcher entry point in place of a raw profile dict. Being a
+    plain dict it journals as JSON; treat it as read-only.
+    """
+
+    __slots__ = ('fingerprint',)
+
+    def __init__(self, features, fingerprint):
+        super().__init__(features)
+        self.fingerprint = fingerprint
+
+    def __reduce__(self):
+        return (StudentFeatureVector, (dict(self), self.fingerprint))
+
+
+class StudentFeatureCache:
+    """
+    StudentFeatureVector per student id, built from the saved profile on
+    first use so profile JSON is parsed once, not per request.
+
+    Writers call invalidate() after a survey or profile update; the TTL
+    bounds how long another worker can keep serving the old profile.
+    """
+
+    def __init__(self, matcher, max_entries=10000, ttl_seconds=600):
+        self.matcher = matcher
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # str(student_id) -> (stored_at, vector)
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by invalidate(); stale loads are not stored
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, student_id, load):
+        """Vector for one student; load(student_ids) as for get_many()"""
+        return self.get_many([student_id], load).get(str(student_id))
+
+    def get_many(self, student_ids, load):
+        """
+        {str(student_id): vector}. Misses are passed to load(missing_ids),
+        which returns {student_id: profile dict}; students it leaves out
+        (no saved profile) are left out of the result.
+        """
+        now = time.monotonic()
+        found = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for student_id in map(str, student_ids):
+                item = self._entries.get(student_id)
+                if item is not None and now - item[0] <= self.ttl_seconds:
+                    self._entries.move_to_end(student_id)
+                    found[student_id] = item[1]
+                else:
+                    missing.append(student_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+        if not missing:
+            return found
+
+        loaded = {
+            str(student_id): self.matcher.student_feature_vector(profile)
+            for student_id, profile in load(missing).items()
+            if profile is not None
+        }
+        found.update(loaded)
+        with self._lock:
+            if self._generation == generation:
+                for student_id, vector in loaded.items():
+                    self._entries[student_id] = (now, vector)
+                    self._entries.move_to_end(student_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return found
+
+    def invalidate(self, student_id):
+        """Drop a student's vector after their profile changed"""
+        with self._lock:
+            self._entries.pop(str(student_id), None)
+            self._generation += 1
+
+    def clear(self):
+        """Drop every vector (another worker's changes were missed)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Embedding layout: block name -> width. Vocabulary blocks (expertise,
+# category, language) hash tokens into buckets; schedule and style have
+# one column per student-side value plus one for anything else.
+EMBEDDING_TIMES = ('morning', 'afternoon', 'evening', 'weekends', 'night')
+EMBEDDING_LEARNING_STYLES = ('visual', 'auditory', 'kinesthetic', 'hands-on')
+_EMBEDDING_WIDTHS = (
+    ('expertise', 64), ('category', 8), ('no_expertise', 1),
+    ('sessions', 4),
+    ('schedule', len(EMBEDDING_TIMES) + 1),
+    ('language', 16), ('no_language', 1),
+    ('style', len(EMBEDDING_LEARNING_STYLES) + 1),
+    ('rating', 1),
+)
+EMBEDDING_BLOCKS = {}
+EMBEDDING_DIM = 0
+for _name, _width in _EMBEDDING_WIDTHS:
+    EMBEDDING_BLOCKS[_name] = slice(EMBEDDING_DIM, EMBEDDING_DIM + _width)
+    EMBEDDING_DIM += _width
+
+
+def _embed_col(block, token):
+    """Hashed column of a vocabulary token (crc32: same in every process)"""
+    span = EMBEDDING_BLOCKS[block]
+    return span.start + zlib.crc32(token.encode('utf-8')) % (span.stop - span.start)
+
+
+def _embed_vocab_col(block, vocab, value):
+    """Column of a known value, or the block's last ("other") column"""
+    span = EMBEDDING_BLOCKS[block]
+    return span.start + (vocab.index(value) if value in vocab else len(vocab))
+
+
+class TutorEmbeddingIndex:
+    """
+    Inner product index over RLTutorMatchingSystem.embed_tutor() vectors,
+    for picking match candidates in large pools. Tutor ids must be
+    non-negative ints (user ids).
+
+    Tutors with identical vectors share one point, so a pool of
+    similar profiles scores few points. Updates are incremental: a
+    changed tutor moves to an existing point or to one appended after
+    the indexed points, and a removed tutor may leave its point empty.
+    Once appended plus empty points pass `rebuild_fraction` of the
+    index, points are compacted and the search structure rebuilt.
+
+    algorithm='brute' scores every point with one matrix-vector product;
+    at this dimensionality that is exact and faster than a tree.
+    'ball_tree' searches sklearn's BallTree over norm-augmented vectors
+    (inner product search as nearest neighbour search) and scores only
+    the nearest max(tree_points, n) points plus any appended ones.
+    """
+
+    def __init__(self, matcher, algorithm='brute', rebuild_fraction=0.1,
+                 tree_points=2000, leaf_size=40):
+        if algorithm not in ('brute', 'ball_tree'):
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        self.matcher = matcher
+        self.algorithm = algorithm
+        self.rebuild_fraction = rebuild_fraction
+        self.tree_points = tree_points
+        self.leaf_size = leaf_size
+        self.rebuilds = 0
+        self.n_tutors = 0
+        self.point_of_id = np.zeros(0, dtype=np.int64)  # tutor id -> point, -1 if absent
+        self._lock = threading.RLock()
+        self._set_points(np.zeros((0, EMBEDDING_DIM), np.float32), np.zeros(0, dtype=np.int64))
+
+    def __len__(self):
+        return self.n_tutors
+
+    def _set_points(self, vectors, counts):
+        """Index exactly these points (vectors + number of tutors on each)"""
+        self.vectors = vectors
+        self.counts = counts
+        self.size = len(counts)
+        self.empty = int(np.count_nonzero(counts == 0))
+        self.point_of_key = {vectors[p].tobytes(): p for p in range(self.size)}
+        self.indexed = self.size
+        self._tree = None
+        if self.algorithm == 'ball_tree' and self.size:
+            from sklearn.neighbors import BallTree
+            norms = (vectors * vectors).sum(axis=1)
+            augmented = np.hstack([vectors, np.sqrt(norms.max() - norms)[:, None]])
+            self._tree = BallTree(augmented, leaf_size=self.leaf_size)
+
+    def _reserve_ids(self, max_id):
+        if max_id >= len(self.point_of_id):
+            grown = np.full(max(max_id + 1, 2 * len(self.point_of_id)), -1, dtype=np.int64)
+            grown[:len(self.point_of_id)] = self.point_of_id
+            self.point_of_id = grown
+
+    def load(self, tutors_list):
+        """Index a whole pool"""
+        keys, vectors, points = {}, [], []
+        for tutor in tutors_list:
+            vector = self.matcher.embed_tutor(tutor).astype(np.float32)
+            point = keys.setdefault(vector.tobytes(), len(keys))
+            if point == len(vectors):
+                vectors.append(vector)
+            points.append(point)
+        ids = np.array([t['id'] for t in tutors_list], dtype=np.int64)
+        points = np.array(points, dtype=np.int64)
+        with self._lock:
+            self.point_of_id = np.zeros(0, dtype=np.int64)
+            self._reserve_ids(int(ids.max()) if len(ids) else 0)
+            self.point_of_id[ids] = points
+            self.n_tutors = len(ids)
+            self._set_points(
+                np.array(vectors) if vectors else np.zeros((0, EMBEDDING_DIM), np.float32),
+                np.bincount(points, minlength=len(vectors)).astype(np.int64)
+            )
+            self.rebuilds += 1
+
+    def upsert(self, tutor):
+        """Add or re-embed one tutor"""
+        vector = self.matcher.embed_tutor(tutor).astype(np.float32)
+        tutor_id = int(tutor['id'])
+        with self._lock:
+            self._reserve_ids(tutor_id)
+            point = self.point_of_key.get(vector.tobytes())
+            if point is not None and point == self.point_of_id[tutor_id]:
+                return
+            self._detach(tutor_id)
+            if point is None:
+                point = self._append(vector)
+            if not self.counts[point]:
+                self.empty -= 1
+            self.counts[point] += 1
+            self.point_of_id[tutor_id] = point
+            self.n_tutors += 1
+            self._maybe_rebuild()
+
+    def remove(self, tutor_id):
+        with self._lock:
+            if 0 <= tutor_id < len(self.point_of_id):
+                self._detach(tutor_id)
+                self._maybe_rebuild()
+
+    def _detach(self, tutor_id):
+        point = self.point_of_id[tutor_id]
+        if point >= 0:
+            self.point_of_id[tutor_id] = -1
+            self.n_tutors -= 1
+            self.counts[point] -= 1
+            if not self.counts[point]:
+                self.empty += 1
+
+    def _append(self, vector):
+        point = self.size
+        if point == len(self.vectors):
+            capacity = max(64, 2 * point)
+            self.vectors = np.concatenate(
+                [self.vectors, np.zeros((capacity - point, EMBEDDING_DIM), np.float32)])
+            self.counts = np.concatenate([self.counts, np.zeros(capacity - point, np.int64)])
+        self.vectors[point] = vector
+        self.point_of_key[vector.tobytes()] = point
+        self.size += 1
+        self.empty += 1  # until the caller places its tutor
+        if self._tree is None:
+            self.indexed = self.size
+        return point
+
+    def _maybe_rebuild(self):
+        stale = self.empty + (self.size - self.indexed)
+        if stale > max(16, self.rebuild_fraction * self.size):
+            keep = np.flatnonzero(self.counts[:self.size] > 0)
+            remap = np.full(self.size + 1, -1, dtype=np.int64)  # [-1] stays -1
+            remap[keep] = np.arange(len(keep))
+            self.point_of_id = remap[self.point_of_id]
+            self._set_points(self.vectors[keep], self.counts[keep])
+            self.rebuilds += 1
+
+    def point_scores(self, query, n=0):
+        """Inner product of `query` with every point (at least the best `n`); NaN where not searched"""
+        query = np.asarray(query, dtype=np.float32)
+        with self._lock:
+            if self._tree is None:
+                return self.vectors[:self.size] @ query
+            scores = np.full(self.size, np.nan)
+            k = min(self.indexed, max(self.tree_points, n) + self.empty)
+            _, found = self._tree.query(np.append(query, 0.0)[None, :], k=k)
+            points = np.concatenate([found[0], np.arange(self.indexed, self.size)])
+            scores[points] = self.vectors[points] @ query
+            return scores
+
+    def score_rows(self, matrix, query, n=0):
+        """
+        Approximate base score per `matrix` row (from point_scores(query, n));
+        NaN for tutors not in the index or points not searched
+        """
+        ids = matrix.id_array()
+        with self._lock:
+            inside = (ids >= 0) & (ids < len(self.point_of_id))
+            points = np.full(len(ids), -1, dtype=np.int64)
+            points[inside] = self.point_of_id[ids[inside]]
+            scores = np.append(self.point_scores(query, n), np.nan)
+        return scores[points]  # point -1 picks the trailing NaN
+
+    def stats(self):
+        with self._lock:
+            return {
+                'algorithm': self.algorithm,
+                'tutors': self.n_tutors,
+                'points': self.size,
+                'empty_points': self.empty,
+                'unindexed_points': self.size - self.indexed,
+                'rebuilds': self.rebuilds,
+            }
+
+
+class MatchResultCache:
+    """
+    Bounded LRU cache (with TTL) of scored match rankings.
+
+    Keys include the tutor-pool and RL model versions, so any tutor
+    profile change or recorded outcome makes older entries unreachable;
+    they age out through LRU eviction or the TTL.
+
+    A pinned entry is a student's stored ranking (precomputed after the
+    survey): one per student (key[0]), kept without TTL until a newer
+    ranking for that student replaces it, and served only while its key
+    (profile fingerprint, pool and model versions) still matches.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=300, max_pinned=256):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_pinned = max_pinned
+        self._entries = OrderedDict()
+        self._pinned = OrderedDict()  # student_id -> (key, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._hit_seconds = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            pinned = self._pinned.get(key[0])
+            if pinned is not None and pinned[0] == key:
+                self._pinned.move_to_end(key[0])
+                self.hits += 1
+                return pinned[1]
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, value = item
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, pin=False):
+        """Store a ranking; pinned (or replacing a pinned one) with `pin`"""
+        with self._lock:
+            if pin or key[0] in self._pinned:
+                self._pinned[key[0]] = (key, value)
+                self._pinned.move_to_end(key[0])
+                while len(self._pinned) > self.max_pinned:
+                    self._pinned.popitem(last=False)
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def unpin(self, student_id):
+        with self._lock:
+            self._pinned.pop(student_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+
+    def record_hit(self, seconds):
+        """Time spent serving a page from a cached ranking"""
+        with self._lock:
+            self._hit_seconds += seconds
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'pinned': len(self._pinned),
+            'max_pinned': self.max_pinned,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'avg_hit_latency_us': (
+                round(self._hit_seconds / self.hits * 1e6, 1) if self.hits else 0.0
+            ),
+        }
+
+
+def _state_digest(state):
+    """Stable, nonzero 63-bit id for a get_state_representation() tuple"""
+    digest = hashlib.blake2b(repr(state).encode('utf-8'), digest_size=8).digest()
+    return (int.from_bytes(digest, 'little') >> 1) + 1
+
+
+def _grow(array, size):
+    """Return `array` with room for at least `size` rows (doubling)"""
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array), 64), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class _IdIndex:
+    """
+    Open-addressing hash map from nonzero 64-bit keys to int32 ids,
+    stored in two NumPy arrays (about 24 bytes per entry at the 0.5
+    max load factor, versus ~120 for a dict of Python ints).
+    """
+
+    _MULT = 0x9E3779B97F4A7C15
+
+    def __init__(self, bits=10):
+        self.bits = bits
+        self.keys = np.zeros(1 << bits, dtype=np.uint64)
+        self.ids = np.zeros(1 << bits, dtype=np.int32)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _probe(self, key):
+        mask = len(self.keys) - 1
+        i = ((key * self._MULT) & 0xFFFFFFFFFFFFFFFF) >> (64 - self.bits)
+        keys = self.keys
+        while True:
+            k = int(keys[i])
+            if k == key or k == 0:
+                return i
+            i = (i + 1) & mask
+
+    def get(self, key):
+        i = self._probe(key)
+        return int(self.ids[i]) if self.keys[i] else None
+
+    def put(self, key, value):
+        if 2 * (self.size + 1) > len(self.keys):
+            self._resize()
+        i = self._probe(key)
+        if not self.keys[i]:
+            self.keys[i] = key
+            self.size += 1
+        self.ids[i] = value
+
+    def _resize(self):
+        keys, ids = self.keys, self.ids
+        self.bits += 1
+        self.keys = np.zeros(1 << self.bits, dtype=np.uint64)
+        self.ids = np.zeros(1 << self.bits, dtype=np.int32)
+        self.size = 0
+        for i in np.flatnonzero(keys):
+            self.put(int(keys[i]), int(ids[i]))
+
+    def items(self):
+        used = np.flatnonzero(self.keys)
+        return zip(self.keys[used].tolist(), self.ids[used].tolist())
+
+    def to_state(self):
+        return {'bits': self.bits, 'keys': self.keys.copy(), 'ids': self.ids.copy(),
+                'size': self.size}
+
+    @classmethod
+    def from_items(cls, keys, ids):
+        """
+        Build from arrays of distinct nonzero keys. Linear probing runs
+        for all keys at once, one probe step per round; the first key
+        to reach a free slot takes it.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        ids = np.asarray(ids, dtype=np.int32)
+        bits = 10
+        while (1 << bits) < 2 * len(keys):
+            bits += 1
+        index = cls(bits)
+        mask = (1 << bits) - 1
+        pos = ((keys * np.uint64(cls._MULT)) >> np.uint64(64 - bits)).astype(np.int64)
+        pending = np.arange(len(keys))
+        while len(pending):
+            slots = pos[pending]
+            free = index.keys[slots] == 0
+            _, first = np.unique(slots[free], return_index=True)
+            winners = pending[free][first]
+            index.keys[pos[winners]] = keys[winners]
+            index.ids[pos[winners]] = ids[winners]
+            pending = np.setdiff1d(pending, winners, assume_unique=True)
+            pos[pending] = (pos[pending] + 1) & mask
+        index.size = len(keys)
+        return index
+
+    @classmethod
+    def from_state(cls, data):
+        index = cls(data['bits'])
+        index.keys = np.array(data['keys'], dtype=np.uint64)
+        index.ids = np.array(data['ids'], dtype=np.int32)
+        index.size = data['size']
+        return index
+
+
+class QTable:
+    """
+    Sparse Q(state, action) store with interned ids.
+
+    States are interned by a 63-bit digest of the state tuple (the tuple
+    itself is not kept); actions (tutor ids) by a small int. Each
+    (state, action) pair owns one slot in flat NumPy arrays, and every
+    state keeps its running max, so get()/max_value() are a hash probe
+    plus an array index. Reads never create entries; only slot() does.
+    """
+
+    FORMAT = 'qtable-v1'
+
+    def __init__(self):
+        self.state_ids = _IdIndex()     # state digest -> state id
+        self.pair_slots = _IdIndex()    # (state id << 32 | action id) + 1 -> slot
+        self.action_ids = {}            # tutor id -> action id
+        self.actions = []               # action id -> tutor id
+        self.n_states = 0
+        self.n_pairs = 0
+        self.values = np.zeros(0, dtype=np.float64)
+        self.slot_state = np.zeros(0, dtype=np.int32)
+        self.slot_action = np.zeros(0, dtype=np.int32)
+        self.state_max = np.zeros(0, dtype=np.float64)
+        self.state_size = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return self.n_states
+
+    def __contains__(self, state):
+        return self.state_ids.get(_state_digest(state)) is not None
+
+    def _state_id(self, state, create=False):
+        digest = _state_digest(state)
+        sid = self.state_ids.get(digest)
+        if sid is None and create:
+            sid = self.n_states
+            self.n_states += 1
+            self.state_ids.put(digest, sid)
+            self.state_max = _grow(self.state_max, self.n_states)
+            self.state_size = _grow(self.state_size, self.n_states)
+        return sid
+
+    def _action_id(self, action, create=False):
+        aid = self.action_ids.get(action)
+        if aid is None and create:
+            aid = len(self.actions)
+            self.action_ids[action] = aid
+            self.actions.append(action)
+        return aid
+
+    def _pair_slot(self, sid, aid):
+        if sid is None or aid is None:
+            return None
+        return self.pair_slots.get(((sid << 32) | aid) + 1)
+
+    def get(self, state, action, default=0.0):
+        slot = self._pair_slot(self._state_id(state), self.action_ids.get(action))
+        return default if slot is None else float(self.values[slot])
+
+    def values_for(self, state, actions):
+        """Q-values for several actions in one state (0.0 when unseen)"""
+        sid = self._state_id(state)
+        result = np.zeros(len(actions), dtype=np.float64)
+        if sid is None:
+            return result
+        for i, action in enumerate(actions):
+            slot = self._pair_slot(sid, self.action_ids.get(action))
+            if slot is not None:
+                result[i] = self.values[slot]
+        return result
+
+    def max_value(self, state):
+        """Max Q over the state's known actions; 0 for an unseen state"""
+        sid = self._state_id(state)
+        if sid is None or self.state_size[sid] == 0:
+            return 0.0
+        return float(self.state_max[sid])
+
+    def slot(self, state, action):
+        """Slot for (state, action), created with Q = 0.0 if new"""
+        sid = self._state_id(state, create=True)
+        aid = self._action_id(action, create=True)
+        key = ((sid << 32) | aid) + 1
+        slot = self.pair_slots.get(key)
+        if slot is None:
+            slot = self.n_pairs
+            self.n_pairs += 1
+            self.values = _grow(self.values, self.n_pairs)
+            self.slot_state = _grow(self.slot_state, self.n_pairs)
+            self.slot_action = _grow(self.slot_action, self.n_pairs)
+            self.values[slot] = 0.0
+            self.slot_state[slot] = sid
+            self.slot_action[slot] = aid
+            self.pair_slots.put(key, slot)
+            if self.state_size[sid] == 0 or self.state_max[sid] < 0.0:
+                self.state_max[sid] = 0.0
+            self.state_size[sid] += 1
+        return slot
+
+    def set_slot(self, slot, value):
+        sid = self.slot_state[slot]
+        previous = self.values[slot]
+        self.values[slot] = value
+        if value >= self.state_max[sid]:
+            self.state_max[sid] = value
+        elif previous >= self.state_max[sid]:
+            # The max went down; rescan this state's slots
+            if self.state_size[sid] == 1:
+                self.state_max[sid] = value
+            else:
+                used = self.slot_state[:self.n_pairs] == sid
+                self.state_max[sid] = self.values[:self.n_pairs][used].max()
+
+    def set(self, state, action, value):
+        self.set_slot(self.slot(state, action), value)
+
+    def to_state(self):
+        """Picklable arrays (digests and ids instead of state tuples)"""
+        n, m = self.n_pairs, self.n_states
+        return {
+            'format': self.FORMAT,
+            'state_ids': self.state_ids.to_state(),
+            'pair_slots': self.pair_slots.to_state(),
+            'actions': list(self.actions),
+            'values': self.values[:n].copy(),
+            'slot_state': self.slot_state[:n].copy(),
+            'slot_action': self.slot_action[:n].copy(),
+            'state_max': self.state_max[:m].copy(),
+            'state_size': self.state_size[:m].copy(),
+        }
+
+    @classmethod
+    def from_state(cls, data):
+        table = cls()
+        if not data:
+            return table
+        if data.get('format') != cls.FORMAT:
+            return cls.from_legacy(data)
+        table.state_ids = _IdIndex.from_state(data['state_ids'])
+        table.pair_slots = _IdIndex.from_state(data['pair_slots'])
+        table.actions = list(data['actions'])
+        table.action_ids = {a: aid for aid, a in enumerate(table.actions)}
+        table.values = np.array(data['values'], dtype=np.float64)
+        table.slot_state = np.array(data['slot_state'], dtype=np.int32)
+        table.slot_action = np.array(data['slot_action'], dtype=np.int32)
+        table.state_max = np.array(data['state_max'], dtype=np.float64)
+        table.state_size = np.array(data['state_size'], dtype=np.int32)
+        table.n_pairs = len(table.values)
+        table.n_states = len(table.state_max)
+        return table
+
+    @classmethod
+    def from_legacy(cls, q_table):
+        """Migrate a pickled {state_tuple: {tutor_id: q}} dict"""
+        table = cls()
+        for state, actions in q_table.items():
+            for action, value in actions.items():
+                table.set(state, action, float(value))
+        return table
+
+
+PERFORMANCE_DTYPE = np.dtype([
+    ('total_matches', np.int64),
+    ('successful_matches', np.int64),
+    ('avg_satisfaction', np.float64),
+    ('completion_rate', np.float64),
+    ('student_retention', np.float64),
+    ('response_time_score', np.float64),
+    ('reliability_score', np.float64),
+    ('n_ratings', np.int64),
+])
+
+DEFAULT_PERFORMANCE = (0, 0, 0.0, 0.0, 0.0, 1.0, 1.0, 0)
+
+
+class TutorPerformanceTable:
+    """
+    Per-tutor outcome statistics in a structured NumPy record array.
+
+    Mapping-style reads (table[tutor_id], get, values, items) return
+    plain dicts of Python numbers and never insert: unknown tutors read
+    as the neutral defaults. Writes go through table[tutor_id] = perf,
+    which appends a record the first time a tutor is seen. columns()
+    gathers whole pools as arrays for batch scoring.
+    """
+
+    FORMAT = 'perf-v1'
+    FIELDS = PERFORMANCE_DTYPE.names
+    INT_FIELDS = ('total_matches', 'successful_matches', 'n_ratings')
+
+    def __init__(self):
+        self.row_of = {}
+        self.tutor_ids = []
+        self._records = np.zeros(0, dtype=PERFORMANCE_DTYPE)
+        self._frozen_index = None
+
+    @property
+    def records(self):
+        return self._records[:len(self.tutor_ids)]
+
+    def __len__(self):
+        return len(self.tutor_ids)
+
+    def __contains__(self, tutor_id):
+        return tutor_id in self.row_of
+
+    def __iter__(self):
+        return iter(list(self.tutor_ids))
+
+    def keys(self):
+        return list(self.tutor_ids)
+
+    def _as_dict(self, record):
+        return {
+            field: int(record[field]) if field in self.INT_FIELDS else float(record[field])
+            for field in self.FIELDS
+        }
+
+    def _default(self):
+        return dict(zip(self.FIELDS, DEFAULT_PERFORMANCE))
+
+    def get(self, tutor_id, default=None):
+        row = self.row_of.get(tutor_id)
+        if row is None:
+            return default
+        return self._as_dict(self._records[row])
+
+    def __getitem__(self, tutor_id):
+        perf = self.get(tutor_id)
+        return self._default() if perf is None else perf
+
+    def __setitem__(self, tutor_id, perf):
+        row = self.row_of.get(tutor_id)
+        if row is None:
+            row = len(self.tutor_ids)
+            self._records = _grow(self._records, row + 1)
+            self._records[row] = DEFAULT_PERFORMANCE
+            self.row_of[tutor_id] = row
+            self.tutor_ids.append(tutor_id)
+            self._frozen_index = None
+        record = self._records[row]
+        for field in self.FIELDS:
+            if field in perf:
+                record[field] = perf[field]
+
+    def values(self):
+        return [self._as_dict(record) for record in self.records]
+
+    def items(self):
+        return [(tid, self._as_dict(self._records[row])) for tid, row in self.row_of.items()]
+
+    def columns(self, tutor_ids):
+        """Field -> float array aligned with `tutor_ids` (defaults for unseen)"""
+        rows = np.fromiter(
+            (self.row_of.get(tid, -1) for tid in tutor_ids), dtype=np.intp, count=len(tutor_ids)
+        )
+        known = rows >= 0
+        cols = {}
+        for field, default in zip(self.FIELDS, DEFAULT_PERFORMANCE):
+            column = np.full(len(rows), float(default))
+            column[known] = self._records[field][rows[known]]
+            cols[field] = column
+        return cols
+
+    def frozen_copy(self):
+        """
+        Read-only copy for a ModelSnapshot. Records are copied; the id->row
+        map is shared by successive copies until a new tutor is added.
+        """
+        if self._frozen_index is None:
+            self._frozen_index = (dict(self.row_of), list(self.tutor_ids))
+        table = TutorPerformanceTable()
+        table.row_of, table.tutor_ids = self._frozen_index
+        table._records = self.records.copy()
+        table._records.flags.writeable = False
+        return table
+
+    def to_state(self):
+        return {
+            'format': self.FORMAT,
+            'tutor_ids': list(self.tutor_ids),
+            'records': self.records.copy(),
+        }
+
+    @classmethod
+    def from_state(cls, data):
+        table = cls()
+        if not data:
+            return table
+        if data.get('format') != cls.FORMAT:
+            return cls.from_legacy(data)
+        table.tutor_ids = list(data['tutor_ids'])
+        table.row_of = {tid: row for row, tid in enumerate(table.tutor_ids)}
+        table._records = np.array(data['records'], dtype=PERFORMANCE_DTYPE)
+        return table
+
+    @classmethod
+    def from_legacy(cls, performance):
+        """Migrate a pickled {tutor_id: {field: value}} dict"""
+        table = cls()
+        for tutor_id, perf in performance.items():
+            table[tutor_id] = perf
+        return table
+
+
+class ModelSnapshot:
+    """
+    Immutable, versioned view of the learned state that scoring reads.
+
+    `performance` is a frozen TutorPerformanceTable and
+    `personal_weights` maps student_id -> weight adjustments for students
+    with enough history. The matcher swaps in a new snapshot after each
+    write; a request keeps the one it started with, so every tutor in a
+    ranking is scored against the same model version.
+
+    `changes` lists the last publishes as (from_version, to_version,
+    tutor_ids or None for "all"), so caches built on an older snapshot
+    can refresh only the tutors that changed.
+    """
+
+    MAX_CHANGES = 64
+
+    __slots__ = ('version', 'performance', 'personal_weights', 'changes')
+
+    def __init__(self, version, performance, personal_weights, changes=()):
+        self.version = version
+        self.performance = performance
+        self.personal_weights = personal_weights
+        self.changes = changes
+
+    def changed_tutors(self, since_version):
+        """
+        Tutors whose stats changed after `since_version`; None when that
+        is unknown (too old, a newer version, or a wholesale restore).
+        """
+        if since_version == self.version:
+            return frozenset()
+        changed = set()
+        for from_version, to_version, tutors in reversed(self.changes):
+            if to_version <= since_version or tutors is None:
+                return None
+            changed.update(tutors)
+            if from_version == since_version:
+                return changed
+        return None
+
+
+MATCH_HISTORY_DTYPE = np.dtype([
+    ('tutor_id', np.int64),
+    ('reward', np.float64),
+    ('timestamp', np.float64),  # POSIX seconds
+])
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO over a NumPy array. Appends overwrite the
+    oldest entry once full; `total` still counts every append.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.head = 0       # next write position
+        self.size = 0
+        self.total = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self.data)
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % len(self.data)
+        self.size = min(self.size + 1, len(self.data))
+        self.total += 1
+
+    def values(self):
+        """Retained entries, oldest first"""
+        if self.size < len(self.data):
+            return self.data[:self.size].copy()
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+    def recent(self, n):
+        """Last `n` entries, oldest first"""
+        return self.values()[-n:] if n else self.values()[:0]
+
+
+class WindowedCovariance:
+    """
+    Sliding-window correlation between each of `n_features` scores and
+    a shared reward, over the last `window` observations.
+
+    push() updates running sums in O(n_features): the evicted row is
+    subtracted and the new one added. Sums are recomputed exactly each
+    time the window wraps so rounding drift cannot build up.
+    """
+
+    def __init__(self, n_features, window=10):
+        self.scores = np.zeros((window, n_features))
+        self.rewards = np.zeros(window)
+        self.head = 0
+        self.size = 0
+        self.total = 0
+        self.sum_x = np.zeros(n_features)
+        self.sum_xx = np.zeros(n_features)
+        self.sum_xy = np.zeros(n_features)
+        self.sum_y = 0.0
+        self.sum_yy = 0.0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, scores, reward):
+        x = np.asarray(scores, dtype=np.float64)
+        window = len(self.rewards)
+        if self.size == window:
+            old_x = self.scores[self.head]
+            old_y = self.rewards[self.head]
+            self.sum_x -= old_x
+            self.sum_xx -= old_x * old_x
+            self.sum_xy -= old_x * old_y
+            self.sum_y -= old_y
+            self.sum_yy -= old_y * old_y
+        self.scores[self.head] = x
+        self.rewards[self.head] = reward
+        self.sum_x += x
+        self.sum_xx += x * x
+        self.sum_xy += x * reward
+        self.sum_y += reward
+        self.sum_yy += reward * reward
+        self.head = (self.head + 1) % window
+        self.size = min(self.size + 1, window)
+        self.total += 1
+        if self.head == 0:
+            self._resum()
+
+    def _resum(self):
+        x, y = self.scores[:self.size], self.rewards[:self.size]
+        self.sum_x = x.sum(axis=0)
+        self.sum_xx = (x * x).sum(axis=0)
+        self.sum_xy = (x * y[:, None]).sum(axis=0)
+        self.sum_y = float(y.sum())
+        self.sum_yy = float((y * y).sum())
+
+    def correlation(self, eps=1e-12):
+        """Pearson r per feature over the window; NaN where either side is constant"""
+        n = self.size
+        if n < 2:
+            return np.full(len(self.sum_x), np.nan)
+        var_x = self.sum_xx - self.sum_x * self.sum_x / n
+        var_y = self.sum_yy - self.sum_y * self.sum_y / n
+        cov = self.sum_xy - self.sum_x * self.sum_y / n
+        valid = (var_x > eps) & (var_y > eps)
+        corr = np.full(len(var_x), np.nan)
+        corr[valid] = cov[valid] / np.sqrt(var_x[valid] * var_y)
+        return np.clip(corr, -1.0, 1.0)
+
+    @classmethod
+    def from_history(cls, histories, window=10):
+        """
+        Rebuild from per-feature [{'score', 'reward'}, ...] lists (old
+        pickles). Lists are aligned on their newest entry; a feature
+        with a shorter list scores 0.0 for the outcomes it missed.
+        """
+        length = max((len(h) for h in histories), default=0)
+        acc = cls(len(histories), window)
+        longest = max(histories, key=len) if histories else []
+        for i in range(max(0, length - window), length):
+            scores = [
+                h[i - length + len(h)]['score'] if i - length + len(h) >= 0 else 0.0
+                for h in histories
+            ]
+            acc.push(scores, longest[i]['reward'])
+        acc.total = length
+        return acc
+
+
+def _atomic_write(filepath, payload):
+    """Write bytes to a temp file in the same dir, fsync, then rename over filepath"""
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+def _fsync_dir(directory):
+    """Persist a rename; not supported on every platform"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FileOutcomeLog:
+    """
+    Single-process outcome log: JSON-lines segment files in `journal_dir`.
+
+    Appends are buffered writes; a flusher thread fsyncs every
+    `fsync_interval` seconds (group commit). checkpoint() rotates to a
+    new segment so a snapshot can drop the ones it covers. Records may
+    be logged before they are applied, so a segment is only covered
+    once every record in it is. With `archive`, covered segments are
+    moved to journal_dir/archive instead of deleted, so read_history()
+    still sees every outcome (offline replay).
+    """
+
+    shared = False
+    SEGMENT_PATTERN = 'outcomes-*.jsonl'
+    ARCHIVE_DIR = 'archive'
+
+    def __init__(self, journal_dir, fsync_interval=0.05, archive=True):
+        self.journal_dir = journal_dir
+        self.archive_dir = os.path.join(journal_dir, self.ARCHIVE_DIR) if archive else None
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._segment = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._closed = False
+        self._flusher = None
+        self._last_written = 0
+
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.journal_dir, self.SEGMENT_PATTERN)))
+
+    def read_after(self, seq):
+        return self._read(self._segments(), seq)
+
+    def read_history(self):
+        """Every outcome still on disk, archived segments included, in seq order"""
+        segments = self._segments()
+        if self.archive_dir:
+            segments += glob.glob(os.path.join(self.archive_dir, self.SEGMENT_PATTERN))
+        return self._read(sorted(segments, key=os.path.basename), 0)
+
+    def read_covered(self, seq, covered):
+        """The records release(seq, covered) would drop"""
+        return self._read(covered, 0)
+
+    @staticmethod
+    def _read(segments, seq):
+        for path in segments:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn write from a crash: nothing after it was acknowledged
+                        print(f"⚠️ Truncated journal record in {os.path.basename(path)}")
+                        break
+                    if record['seq'] > seq:
+                        yield record
+
+    @staticmethod
+    def _first_seq(segment):
+        return int(os.path.basename(segment).split('-')[1])
+
+    def open(self, last_seq):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        with self._lock:
+            self._last_written = last_seq
+            self._rotate(last_seq)
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def _rotate(self, last_seq):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        # Named by first seq (+ a nonce so a reopened seq never appends
+        # after a torn line in an older file)
+        self._segment = os.path.join(
+            self.journal_dir, f"outcomes-{last_seq + 1:012d}-{time.time_ns()}.jsonl"
+        )
+        self._file = open(self._segment, 'a', encoding='utf-8')
+        self._dirty = False
+        _fsync_dir(self.journal_dir)
+
+    def append_many(self, records):
+        """One buffered write for a batch of records"""
+        if not records:
+            return
+        lines = ''.join(
+            json.dumps(record, separators=(',', ':'), default=str) + '\n' for record in records
+        )
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            self._dirty = True
+            self._last_written = records[-1]['seq']
+
+    def sync(self):
+        """fsync the current segment now (without blocking appends)"""
+        with self._lock:
+            if self._file is None or not self._dirty:
+                return
+            # A dup stays valid even if the segment is rotated meanwhile
+            fd = os.dup(self._file.fileno())
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _flush_loop(self):
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            try:
+                self.sync()
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Journal fsync failed: {e}")
+
+    def checkpoint(self, seq):
+        """
+        Rotate; returns the segments a snapshot at `seq` makes obsolete:
+        those whose records all have seq <= `seq` (the next segment
+        starts at or before seq + 1). Later ones hold outcomes that are
+        logged but not applied yet.
+        """
+        with self._lock:
+            if self._file is not None and os.path.getsize(self._segment):
+                self._rotate(self._last_written)
+            segments = self._segments()
+            starts = [self._first_seq(segment) for segment in segments]
+        return [
+            segment for segment, next_start in zip(segments, starts[1:])
+            if next_start <= seq + 1
+        ]
+
+    def release(self, seq, covered):
+        if self.archive_dir and covered:
+            os.makedirs(self.archive_dir, exist_ok=True)
+        for segment in covered:
+            try:
+                if self.archive_dir:
+                    os.replace(segment, os.path.join(self.archive_dir, os.path.basename(segment)))
+                else:
+                    os.remove(segment)
+            except OSError:
+                pass
+        if self.archive_dir and covered:
+            _fsync_dir(self.archive_dir)
+            _fsync_dir(self.journal_dir)
+
+    def head(self):
+        return None
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        return {'backend': 'file', 'segments': len(self._segments())}
+
+
+class SharedOutcomeLog:
+    """
+    Outcome log in the database, shared by every worker process.
+
+    publish() bumps a single counter row and inserts the event in one
+    transaction; the row lock serializes publishers, so events commit in
+    seq order and a reader can never see seq N+1 before N. Each worker
+    applies the log to its own in-memory model (deterministic replay),
+    polling the counter row to learn when it is behind.
+
+    `events` needs columns (seq, payload, created_at); `state` a single
+    row with id = 1 and columns (seq, snapshot_seq). With an `archive`
+    table (same columns as events), release() moves the events a
+    snapshot covers there instead of deleting them, so read_history()
+    still sees every outcome (offline replay).
+    """
+
+    shared = True
+
+    def __init__(self, engine, events, state, batch_size=1000, archive=None):
+        self.engine = engine
+        self.events = events
+        self.state = state
+        self.archive = archive
+        self.batch_size = batch_size
+
+    def open(self, last_seq):
+        from sqlalchemy import select, insert
+        from sqlalchemy.exc import IntegrityError
+        with self.engine.connect() as conn:
+            exists = conn.execute(select(self.state.c.id).where(self.state.c.id == 1)).first()
+        if exists is None:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(self.state).values(id=1, seq=0, snapshot_seq=0))
+            except IntegrityError:
+                pass  # another worker created it first
+
+    def publish_many(self, records):
+        """Append a batch of events in one transaction; returns their global seqs"""
+        from sqlalchemy import select, update, insert
+        if not records:
+            return []
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(self.state)
+                .where(self.state.c.id == 1)
+                .values(seq=self.state.c.seq + len(records))
+            )
+            last = conn.execute(select(self.state.c.seq).where(self.state.c.id == 1)).scalar_one()
+            seqs = list(range(last - len(records) + 1, last + 1))
+            now = datetime.utcnow()
+            conn.execute(insert(self.events), [
+                {
+                    'seq': seq,
+                    'payload': json.dumps(dict(record, seq=seq), separators=(',', ':'), default=str),
+                    'created_at': now,
+                }
+                for seq, record in zip(seqs, records)
+            ])
+        return seqs
+
+    def read_after(self, seq):
+        from sqlalchemy import select
+        return self._read(select(self.events.c.seq, self.events.c.payload).subquery(), seq)
+
+    def read_covered(self, seq, covered):
+        """The events release(seq, covered) would drop"""
+        from sqlalchemy import select
+        return self._read(
+            select(self.events.c.seq, self.events.c.payload)
+            .where(self.events.c.seq <= seq).subquery(),
+            0
+        )
+
+    def read_history(self):
+        """Every outcome, archived events included, in seq order"""
+        from sqlalchemy import select, union_all
+        if self.archive is None:
+            return self.read_after(0)
+        # One union per batch: release() moves events in one transaction,
+        # so each batch sees every seq in exactly one of the tables
+        rows = union_all(
+            select(self.archive.c.seq, self.archive.c.payload),
+            select(self.events.c.seq, self.events.c.payload),
+        ).subquery()
+        return self._read(rows, 0)
+
+    def _read(self, rows, seq):
+        from sqlalchemy import select
+        while True:
+            with self.engine.connect() as conn:
+                batch = conn.execute(
+                    select(rows.c.seq, rows.c.payload)
+                    .where(rows.c.seq > seq)
+                    .order_by(rows.c.seq)
+                    .limit(self.batch_size)
+                ).all()
+            for row in batch:
+                yield json.loads(row.payload)
+                seq = row.seq
+            if len(batch) < self.batch_size:
+                return
+
+    def head(self):
+        """(latest published seq, newest snapshot seq)"""
+        from sqlalchemy import select
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(self.state.c.seq, self.state.c.snapshot_seq).where(self.state.c.id == 1)
+            ).first()
+        return (row.seq, row.snapshot_seq) if row else (0, 0)
+
+    def checkpoint(self, seq):
+        return None
+
+    def release(self, seq, covered):
+        """Record the snapshot and prune (or archive) the events it covers"""
+        from sqlalchemy import select, update, delete, insert
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(self.state)
+                .where(self.state.c.id == 1, self.state.c.snapshot_seq < seq)
+                .values(snapshot_seq=seq)
+            )
+            if self.archive is not None:
+                conn.execute(insert(self.archive).from_select(
+                    ['seq', 'payload', 'created_at'],
+                    select(self.events.c.seq, self.events.c.payload, self.events.c.created_at)
+                    .where(self.events.c.seq <= seq)
+                ))
+            conn.execute(delete(self.events).where(self.events.c.seq <= seq))
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+    def stats(self):
+        seq, snapshot_seq = self.head()
+        return {'backend': 'db', 'published_seq': seq, 'db_snapshot_seq': snapshot_seq}
+
+
+class SharedPoolChangeLog:
+    """
+    Tutor/student pool changes in the database, so every worker process
+    keeps its in-memory pools (tutor store, student pool, feature cache)
+    current, not only the one that handled the write.
+
+    publish() bumps a single version row and inserts the change in one
+    transaction; as in SharedOutcomeLog the row lock makes versions commit
+    in order. Changes carry only (kind, entity_id): readers reload the
+    entity from the database, so a change published after its commit is
+    never applied with stale data. poll() returns the changes after the
+    version this worker last applied, at most every `poll_interval`
+    seconds; RELOAD_ALL when older changes were already pruned.
+
+    `changes` needs columns (version, kind, entity_id, created_at);
+    `state` a single row with id = 1 and column version.
+    """
+
+    RELOAD_ALL = 'reload_all'
+
+    def __init__(self, engine, changes, state, poll_interval=1.0, retain=10000):
+        self.engine = engine
+        self.changes = changes
+        self.state = state
+        self.poll_interval = poll_interval
+        self.retain = retain
+        self.version = 0
+        self.published = 0
+        self.applied = 0
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    def open(self):
+        """
+        Create the state row and start from the current version; call
+        before loading the pools so no change between the two is missed
+        """
+        from sqlalchemy import select, insert
+        from sqlalchemy.exc import IntegrityError
+        with self.engine.connect() as conn:
+            exists = conn.execute(select(self.state.c.id).where(self.state.c.id == 1)).first()
+        if exists is None:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(self.state).values(id=1, version=0))
+            except IntegrityError:
+                pass  # another worker created it first
+        self.version = self.head()
+        return self
+
+    def head(self):
+        from sqlalchemy import select
+        with self.engine.connect() as conn:
+            version = conn.execute(
+                select(self.state.c.version).where(self.state.c.id == 1)
+            ).scalar()
+        return version or 0
+
+    def publish(self, kind, entity_id):
+        """Announce a committed change to one tutor/student; returns its version"""
+        from sqlalchemy import select, update, insert, delete
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(self.state)
+                .where(self.state.c.id == 1)
+                .values(version=self.state.c.version + 1)
+            )
+            version = conn.execute(
+                select(self.state.c.version).where(self.state.c.id == 1)
+            ).scalar_one()
+            conn.execute(insert(self.changes).values(
+                version=version, kind=kind, entity_id=int(entity_id),
+                created_at=datetime.utcnow()
+            ))
+            if version % 100 == 0:
+                conn.execute(delete(self.changes).where(
+                    self.changes.c.version <= version - self.retain
+                ))
+        self.published += 1
+        return version
+
+    def poll(self, force=False):
+        """
+        [(kind, entity_id)] changed since the last poll (each at most
+        once), or RELOAD_ALL. Another thread already polling: [] unless
+        forced.
+        """
+        from sqlalchemy import select, func
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return []
+        if not self._lock.acquire(blocking=force):
+            return []
+        try:
+            self._last_poll = now
+            head = self.head()
+            if head <= self.version:
+                return []
+            with self.engine.connect() as conn:
+                oldest = conn.execute(select(func.min(self.changes.c.version))).scalar()
+                if oldest is None or oldest > self.version + 1:
+                    self.version = head
+                    return self.RELOAD_ALL
+                rows = conn.execute(
+                    select(self.changes.c.kind, self.changes.c.entity_id)
+                    .where(self.changes.c.version > self.version,
+                           self.changes.c.version <= head)
+                    .order_by(self.changes.c.version)
+                ).all()
+            self.version = head
+            changed = list(OrderedDict.fromkeys((row.kind, row.entity_id) for row in rows))
+            self.applied += len(changed)
+            return changed
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'published': self.published,
+            'applied': self.applied,
+        }
+
+
+class OutcomeJournal:
+    """
+    Durable RL state: snapshot file + append-only outcome log.
+
+    log_many() makes outcomes durable before they are applied: with a
+    FileOutcomeLog it assigns seqs and appends compact lines, with a
+    SharedOutcomeLog it publishes the events to the database.
+    apply_logged() then applies them in seq order (shared: every event
+    up to them, so all workers converge on the same model); record()
+    does both. refresh() lets a worker pick up events published
+    elsewhere (checked at most every `refresh_interval` seconds).
+
+    Every `snapshot_every` outcomes a background thread pickles the
+    model, writes it with temp-file + rename, and drops the log entries
+    it covers. recover() loads the snapshot and replays the log tail.
+    `before_release` (if given) gets the records about to be dropped,
+    e.g. to make sure their side effects outside the model were applied;
+    if it raises, they stay in the log until the next snapshot.
+    """
+
+    def __init__(self, matcher, snapshot_path, log,
+                 snapshot_every=500, refresh_interval=1.0, before_release=None):
+        self.matcher = matcher
+        self.snapshot_path = snapshot_path
+        self.log = log
+        self.snapshot_every = snapshot_every
+        self.refresh_interval = refresh_interval
+        self.before_release = before_release
+        self.last_seq = 0          # seq of the newest applied outcome
+        self.logged_seq = 0        # seq of the newest logged outcome (file log)
+        self.snapshot_seq = 0      # seq covered by the snapshot on disk
+        self.appended = 0          # outcomes recorded by this process
+        self.replayed = 0          # outcomes applied from the log
+        self.last_snapshot_at = None
+        self._last_refresh = 0.0
+        self._rewards = OrderedDict()  # seq -> reward of recently applied events
+        self._own_seqs = set()         # published by this worker, not yet returned
+        self._own_rewards = {}
+        self._lock = threading.RLock()          # orders apply
+        self._log_lock = threading.Lock()       # orders seq assignment + append
+        self._snapshot_lock = threading.Lock()  # one snapshot at a time
+        self._snapshot_requested = threading.Event()
+        self._closed = False
+        self._snapshotter = None
+
+    # -- startup ----------------------------------------------------------
+
+    def recover(self):
+        """Load snapshot, replay the log tail, start background work"""
+        with self._lock:
+            self._load_snapshot()
+            self._catch_up()
+            self.logged_seq = self.last_seq
+            self.log.open(self.last_seq)
+        if self._snapshotter is None:
+            self._snapshotter = threading.Thread(target=self._snapshot_loop, daemon=True)
+            self._snapshotter.start()
+        if self.replayed:
+            print(f"✓ Replayed {self.replayed} outcomes from journal")
+            if not self.log.shared:
+                self.request_snapshot()
+        return self.replayed
+
+    def _load_snapshot(self):
+        if os.path.exists(self.snapshot_path):
+            model_data = self.matcher.load_model(self.snapshot_path)
+            self.snapshot_seq = model_data.get('journal_seq', 0)
+        self.last_seq = self.snapshot_seq
+
+    def _apply(self, record):
+        return self.matcher.record_match_outcome(
+            record['student_id'],
+            record['tutor_id'],
+            record['student_profile'],
+            record['tutor_profile'],
+            record['outcome'],
+            timestamp=record['ts'],
+        )
+
+    def _catch_up(self):
+        """Apply log records after last_seq (caller holds the lock)"""
+        if self.log.shared:
+            published, pruned = self.log.head()
+            if pruned > self.last_seq:
+                # Events we have not applied were compacted away
+                self._load_snapshot()
+        with self.matcher.writer():  # one reader snapshot per catch-up
+            for record in self.log.read_after(self.last_seq):
+                try:
+                    result = self._apply(record)
+                except Exception as e:
+                    print(f"⚠️ Skipping journal record {record['seq']}: {e}")
+                    result = None
+                self.last_seq = record['seq']
+                self.replayed += 1
+                # Any thread may apply a worker's own event first; keep recent
+                # rewards so record() can still return its result
+                self._rewards[record['seq']] = result
+                if len(self._rewards) > 1024:
+                    self._rewards.popitem(last=False)
+                if record['seq'] in self._own_seqs:
+                    self._own_rewards[record['seq']] = result
+
+    # -- write path -------------------------------------------------------
+
+    @staticmethod
+    def make_record(student_id, tutor_id, student_profile, tutor_profile, outcome_data,
+                    timestamp=None):
+        """Journal record for one outcome (seq is assigned when logged)"""
+        return {
+            'seq': None,
+            'ts': time.time() if timestamp is None else timestamp,
+            'student_id': student_id,
+            'tutor_id': tutor_id,
+            'student_profile': student_profile,
+            'tutor_profile': tutor_profile,
+            'outcome': outcome_data,
+        }
+
+    def record(self, student_id, tutor_id, student_profile, tutor_profile, outcome_data):
+        """record_match_outcome() + one log append; returns the reward"""
+        reward = self.record_many([self.make_record(
+            student_id, tutor_id, student_profile, tutor_profile, outcome_data
+        )])[0]
+        if reward is None:
+            raise ValueError('Outcome could not be applied')
+        return reward
+
+    def record_many(self, records):
+        """
+        log_many() + apply_logged() for a batch of make_record() dicts.
+        Returns one reward per record; None for a record that failed to
+        apply.
+        """
+        self.log_many(records)
+        return self.apply_logged(records)
+
+    def log_many(self, records):
+        """
+        Make a batch of make_record() dicts durable before they are
+        applied: a single log write (file) or a single transaction
+        (shared). Sets each record's seq; returns the seqs.
+        """
+        if not records:
+            return []
+        if self.log.shared:
+            with self._lock:
+                seqs = self.log.publish_many(records)
+                self._own_seqs.update(seqs)
+            for record, seq in zip(records, seqs):
+                record['seq'] = seq
+            return seqs
+        with self._log_lock:
+            for record in records:
+                self.logged_seq += 1
+                record['seq'] = self.logged_seq
+            self.log.append_many(records)
+        return [record['seq'] for record in records]
+
+    def apply_logged(self, records):
+        """
+        Apply records returned from log_many(), in seq order. Returns one
+        reward per record; None for a record that failed to apply.
+        """
+        if not records:
+            return []
+        first, last = records[0]['seq'], records[-1]['seq']
+        if self.log.shared:
+            with self._lock:
+                if last > self.last_seq:
+                    self._catch_up()
+                rewards = []
+                for record in records:
+                    seq = record['seq']
+                    self._own_seqs.discard(seq)
+                    rewards.append(self._own_rewards.pop(seq, None))
+                self.replayed -= len(records)  # our own events, not replays
+                self.appended += len(records)
+        else:
+            with self._lock, self.matcher.writer():
+                rewards = []
+                for record in records:
+                    try:
+                        rewards.append(self._apply(record))
+                    except Exception as e:
+                        print(f"⚠️ Outcome not applied: {e}")
+                        rewards.append(None)
+                    self.last_seq = record['seq']
+                self.appended += len(records)
+        # Seqs are global, so exactly one worker triggers each snapshot
+        if last // self.snapshot_every > (first - 1) // self.snapshot_every:
+            self.request_snapshot()
+        return rewards
+
+    def refresh(self, force=False):
+        """Apply events other workers published (shared log only)"""
+        if not self.log.shared:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return 0
+        self._last_refresh = now
+        published, _ = self.log.head()
+        if published <= self.last_seq:
+            return 0
+        # Another thread already applying events: score against the
+        # current snapshot rather than wait (unless forced)
+        if not self._lock.acquire(blocking=force):
+            return 0
+        try:
+            before = self.last_seq
+            self._catch_up()
+            return self.last_seq - before
+        finally:
+            self._lock.release()
+
+    def sync(self):
+        self.log.sync()
+
+    # -- snapshots --------------------------------------------------------
+
+    def request_snapshot(self):
+        self._snapshot_requested.set()
+
+    def _snapshot_loop(self):
+        while not self._closed:
+            self._snapshot_requested.wait()
+            self._snapshot_requested.clear()
+            if self._closed:
+                break
+            try:
+                self.snapshot()
+            except Exception as e:
+                print(f"⚠️ RL snapshot failed: {e}")
+
+    def snapshot(self):
+        """
+        Pickle the model (under the write lock, in memory), checkpoint
+        the log, then write the file and release covered log entries
+        outside the lock. Returns the journal seq the snapshot covers.
+        """
+        with self._snapshot_lock, _SnapshotFileLock(self.snapshot_path, self.log.shared):
+            with self._lock:
+                if self.log.shared:
+                    self._catch_up()
+                seq = self.last_seq
+                with self.matcher.writer():
+                    model_data = self.matcher.model_state()
+                    model_data['journal_seq'] = seq
+                    payload = pickle.dumps(model_data, protocol=pickle.HIGHEST_PROTOCOL)
+                covered = self.log.checkpoint(seq)
+
+            if self.log.shared and seq <= self.log.head()[1]:
+                return seq  # another worker already wrote a newer snapshot
+            _atomic_write(self.snapshot_path, payload)
+            try:
+                if self.before_release is not None:
+                    self.before_release(self.log.read_covered(seq, covered))
+            except Exception as e:
+                print(f"⚠️ Journal entries up to {seq} kept: {e}")
+            else:
+                self.log.release(seq, covered)
+            self.snapshot_seq = seq
+            self.last_snapshot_at = datetime.now().isoformat()
+            print(f"✓ RL snapshot written (journal seq {seq})")
+            return seq
+
+    def close(self):
+        """Final fsync; call at shutdown"""
+        self._closed = True
+        self._snapshot_requested.set()
+        with self._lock:
+            self.log.close()
+
+    def stats(self):
+        stats = {
+            'last_seq': self.last_seq,
+            'logged_seq': max(self.logged_seq, self.last_seq),
+            'snapshot_seq': self.snapshot_seq,
+            'pending_outcomes': self.last_seq - self.snapshot_seq,
+            'appended': self.appended,
+            'replayed': self.replayed,
+            'last_snapshot_at': self.last_snapshot_at,
+        }
+        stats.update(self.log.stats())
+        return stats
+
+
+class OutcomeIngestQueue:
+    """
+    Bounded queue between the feedback endpoints and the RL learner.
+
+    submit() journals the outcome (journal.log_many()) and enqueues it,
+    so an accepted outcome survives a crash before it is applied, and a
+    request never waits on model updates or DB stats. A background
+    thread takes whatever has accumulated (up to `max_batch`), applies
+    it with journal.apply_logged() and passes (records, rewards) to
+    `on_batch` for side effects such as a bulk tutor-stats update.
+    Under bursts batches grow, so per-outcome cost falls as load rises.
+    """
+
+    _STOP = object()
+
+    def __init__(self, journal, on_batch=None, max_batch=256, maxsize=10000):
+        self.journal = journal
+        self.on_batch = on_batch
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._idle = threading.Condition()
+        self._submit_lock = threading.Lock()  # log order == queue order
+        self._thread = None
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.last_lag_ms = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, record):
+        """Journal and enqueue a record; False (nothing journaled) if the queue is full"""
+        with self._submit_lock:
+            if self._queue.full():
+                return False
+            self.journal.log_many([record])
+            self._queue.put_nowait(record)
+        with self._idle:
+            self.submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch):
+        rewards = [None] * len(batch)
+        try:
+            rewards = self.journal.apply_logged(batch)
+            if self.on_batch is not None:
+                self.on_batch(batch, rewards)
+        except Exception as e:
+            print(f"⚠️ Outcome batch of {len(batch)} failed: {e}")
+        with self._idle:
+            self.batches += 1
+            self.processed += len(batch)
+            self.failed += sum(1 for r in rewards if r is None)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.last_lag_ms = (time.time() - batch[0]['ts']) * 1000
+            self._idle.notify_all()
+
+    def wait_idle(self, timeout=None):
+        """Block until everything submitted so far has been applied"""
+        with self._idle:
+            target = self.submitted
+            return self._idle.wait_for(lambda: self.processed >= target, timeout)
+
+    def drain(self, timeout=5.0):
+        """Apply what is queued, then stop the learner (shutdown)"""
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'failed': self.failed,
+            'batches': self.batches,
+            'avg_batch': round(self.processed / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'last_lag_ms': round(self.last_lag_ms, 1),
+        }
+
+
+class MatchPrecomputeQueue:
+    """
+    Background precomputation of students' ranked matches.
+
+    submit() only enqueues, so saving a survey never waits on scoring. A
+    background thread calls compute(student_id), which should rank via
+    top_k_matches(..., pin=True) so the result is stored in the
+    MatchResultCache. A student already waiting in the queue is not
+    queued twice (compute reads the latest saved profile when it runs).
+    wait() lets a match request that races the job block briefly for it
+    instead of scoring the pool a second time.
+    """
+
+    _STOP = object()
+
+    def __init__(self, compute, maxsize=1000):
+        self.compute = compute
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Condition()
+        self._waiting = set()  # queued, not started
+        self._outstanding = defaultdict(int)  # student_id -> queued + running jobs
+        self._thread = None
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_ms = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, student_id):
+        """Queue a precompute for `student_id`; False if the queue is full"""
+        with self._lock:
+            if student_id in self._waiting:
+                self.coalesced += 1
+                return True
+            try:
+                self._queue.put_nowait(student_id)
+            except queue.Full:
+                return False
+            self._waiting.add(student_id)
+            self._outstanding[student_id] += 1
+            self.submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            student_id = self._queue.get()
+            if student_id is self._STOP:
+                return
+            with self._lock:
+                self._waiting.discard(student_id)
+            started = time.perf_counter()
+            ok = True
+            try:
+                self.compute(student_id)
+            except Exception as e:
+                ok = False
+                print(f"⚠️ Match precompute for student {student_id} failed: {e}")
+            with self._lock:
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.last_ms = (time.perf_counter() - started) * 1000
+                self._outstanding[student_id] -= 1
+                if not self._outstanding[student_id]:
+                    del self._outstanding[student_id]
+                self._lock.notify_all()
+
+    def wait(self, student_id, timeout=None):
+        """Block while a job for `student_id` is queued or running; False on timeout"""
+        with self._lock:
+            return self._lock.wait_for(
+                lambda: student_id not in self._outstanding, timeout
+            )
+
+    def drain(self, timeout=5.0):
+        """Stop the worker after the queued jobs (shutdown)"""
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'completed': self.completed,
+            'failed': self.failed,
+            'last_ms': round(self.last_ms, 1),
+        }
+
+
+def read_outcome_jsonl(path):
+    """
+    Yield outcome records from a JSONL export or a journal directory
+    (archived and live segments in seq order). Stops at a torn line,
+    like journal recovery.
+    """
+    if os.path.isdir(path):
+        yield from FileOutcomeLog(path).read_history()
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️ Truncated outcome record in {os.path.basename(path)}")
+                return
+
+
+def read_outcome_parquet(path):
+    """Yield outcome records from Parquet (needs pyarrow or fastparquet)"""
+    frame = pd.read_parquet(path)
+    for record in frame.to_dict('records'):
+        for key in ('student_profile', 'tutor_profile', 'outcome'):
+            if isinstance(record.get(key), str):
+                record[key] = json.loads(record[key])
+        yield record
+
+
+def _profile_key(profile):
+    # repr() is several times cheaper than a sorted json.dumps; records
+    # from one source list their keys in the same order
+    return repr(profile)
+
+
+def _q_learning(slots, slot_state, rewards, n_states, learning_rate, discount_factor):
+    """
+    update_q_value() over a whole history, on plain lists. Same
+    arithmetic in the same order as the live learner, so Q-values come
+    out identical. Returns (values, state_max).
+    """
+    slot_state = slot_state.tolist()
+    values = [0.0] * len(slot_state)
+    best = [0.0] * n_states
+    members = [[] for _ in range(n_states)]
+    for slot, state in enumerate(slot_state):
+        members[state].append(slot)
+    for slot, reward in zip(slots.tolist(), rewards.tolist()):
+        state = slot_state[slot]
+        current_q = values[slot]
+        top = best[state]
+        new_q = current_q + learning_rate * (reward + discount_factor * top - current_q)
+        values[slot] = new_q
+        if new_q >= top:
+            best[state] = new_q
+        elif current_q >= top:
+            # Slots not created yet are 0.0, which never beats a real max
+            best[state] = max(values[s] for s in members[state])
+    return np.array(values), np.array(best)
+
+
+def _group_starts(codes, n_groups):
+    """Stable order by group code plus each group's offset into it"""
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return order, starts, counts
+
+
+def _gapped_running_mean(codes, position, present, values, initial, n_groups):
+    """
+    Final value of x = (x * (n - 1) + v) / n, applied only at outcomes
+    where `present`, with n the group's outcome count so far (the
+    response_time/punctuality updates in record_match_outcome). Closed
+    form: each v is scaled by prod((j - 1) / j) over later present j.
+    """
+    result = np.full(n_groups, float(initial))
+    idx = np.flatnonzero(present)
+    if not len(idx):
+        return result
+    idx = idx[np.argsort(codes[idx], kind='stable')]
+    group = codes[idx]
+    p = position[idx].astype(np.float64)
+    first = p == 1  # x * 0 + v: the initial value drops out
+    log_c = np.where(first, 0.0, np.log1p(-1.0 / np.maximum(p, 2)))
+    cumulative = np.cumsum(log_c)
+    total = np.bincount(group, weights=log_c, minlength=n_groups)
+    start = np.ones(len(idx), dtype=bool)
+    start[1:] = group[1:] != group[:-1]
+    offset = (cumulative - log_c)[start]
+    offset = np.repeat(offset, np.bincount(group, minlength=n_groups)[group[start]])
+    later = total[group] - (cumulative - offset)
+    contrib = np.bincount(group, weights=values[idx] / p * np.exp(later), minlength=n_groups)
+    reset = np.bincount(group, weights=first, minlength=n_groups) > 0
+    has_any = np.bincount(group, minlength=n_groups) > 0
+    result[has_any] = np.where(reset, 0.0, initial * np.exp(total))[has_any] + contrib[has_any]
+    return result
+
+
+class OutcomeReplay:
+    """
+    Rebuild RLTutorMatchingSystem state from a stored outcome history.
+
+    load() encodes the records once into flat arrays (rewards, tutor and
+    student codes, Q-table slots, feature scores); build() then derives
+    what record_match_outcome would have produced one outcome at a time:
+
+    - tutor_performance with grouped array reductions,
+    - the Q-table in one pass over integer slots (Q-learning is order
+      dependent, so only this part stays sequential),
+    - student histories from each student's last outcomes, and weight
+      adjustments from sliding-window correlations over all of them.
+
+    Results match a live replay up to float rounding. sweep() trains
+    (learning_rate, discount_factor, epsilon) combinations in a process
+    pool and scores each on the held-out tail of the history.
+    """
+
+    # Distinct profiles held in the load() memos before they are reset
+    MEMO_LIMIT = 200000
+
+    def __init__(self, matcher=None):
+        self.matcher = matcher or RLTutorMatchingSystem()
+        self.size = 0
+        self.skipped = 0
+
+    def load(self, records):
+        m = self.matcher
+        student_ids, tutor_ids, timestamps, pair_keys = [], [], [], []
+        satisfaction, completed, recommend, rated = [], [], [], []
+        response, punctuality = [], []
+        state_of_pair, state_ids = {}, {}
+        seen_students, seen_tutors = {}, {}
+        feature_memo = [{} for _ in m.IMPORTANCE_FEATURES]
+        features = []
+
+        for record in records:
+            outcome = record.get('outcome') or {}
+            try:
+                rating = outcome.get('satisfaction_rating', 3) / 5.0
+                response_score = (
+                    max(0, 1 - (outcome['response_time'] / 24))
+                    if 'response_time' in outcome else np.nan
+                )
+                punctual = (
+                    float(outcome['punctuality_score'])
+                    if 'punctuality_score' in outcome else np.nan
+                )
+                tutor_id = record['tutor_id']
+                student_profile = record['student_profile']
+                tutor_profile = record['tutor_profile']
+
+                student = self._intern(student_profile, seen_students, m.prepare_student_features)
+                tutor = self._intern(tutor_profile, seen_tutors, m.prepare_tutor_features)
+                pair = (student[0], tutor[0])
+                state = state_of_pair.get(pair)
+                if state is None:
+                    state_tuple = m.state_from_features(student[1], tutor[1])
+                    state = state_of_pair[pair] = state_ids.setdefault(state_tuple, len(state_ids))
+                scores = self._feature_scores(student, tutor, feature_memo)
+            except Exception as e:
+                # The live learner would have rejected this outcome too
+                if not self.skipped:
+                    print(f"⚠️ Skipping outcome record {record.get('seq')}: {e}")
+                self.skipped += 1
+                continue
+
+            student_ids.append(record['student_id'])
+            tutor_ids.append(tutor_id)
+            timestamps.append(record.get('ts') or 0.0)
+            satisfaction.append(rating)
+            rated.append(outcome.get('satisfaction_rating') is not None)
+            completed.append(1.0 if outcome.get('completed', False) else 0.0)
+            recommend.append(1.0 if outcome.get('would_recommend', False) else 0.0)
+            response.append(response_score)
+            punctuality.append(punctual)
+            pair_keys.append(state)
+            features.append(scores)
+            if len(seen_tutors) + len(seen_students) > self.MEMO_LIMIT:
+                # Profiles keep changing (tutor total_sessions grows), so
+                # keep the memos bounded rather than exact
+                for memo in (seen_students, seen_tutors, state_of_pair, *feature_memo):
+                    memo.clear()
+
+        if self.skipped > 1:
+            print(f"⚠️ Skipped {self.skipped} outcome records in total")
+        self.size = len(tutor_ids)
+        self.satisfaction = np.array(satisfaction, dtype=np.float64)
+        self.completed = np.array(completed, dtype=np.float64)
+        self.recommend = np.array(recommend, dtype=np.float64)
+        self.rewards = 0.4 * self.satisfaction + 0.3 * self.completed + 0.3 * self.recommend
+        self.rated = np.array(rated, dtype=bool)
+        self.response = np.array(response, dtype=np.float64)
+        self.punctuality = np.array(punctuality, dtype=np.float64)
+        self.timestamps = np.array(timestamps, dtype=np.float64)
+        self.features = np.array(features, dtype=np.float64).reshape(
+            self.size, len(m.IMPORTANCE_FEATURES))
+
+        # Codes in first-appearance order, as live interning assigns them
+        self.tutor_codes, self.tutors = pd.factorize(pd.Series(tutor_ids, dtype=object))
+        self.student_codes, self.students = pd.factorize(pd.Series(student_ids, dtype=object))
+        self.tutor_id_values = np.array(tutor_ids, dtype=np.int64)
+        self.states = list(state_ids)
+        state_codes = np.array(pair_keys, dtype=np.int64)
+        pairs = (state_codes << 32) | self.tutor_codes.astype(np.int64)
+        self.slots, pair_values = pd.factorize(pairs)
+        self.slot_keys = np.asarray(pair_values, dtype=np.int64)
+        self.slot_state = (self.slot_keys >> 32).astype(np.int32)
+        self.slot_action = (self.slot_keys & 0xFFFFFFFF).astype(np.int32)
+        return self
+
+    @staticmethod
+    def _intern(profile, seen, prepare):
+        """(key, features, feature keys), prepared once per distinct profile"""
+        key = _profile_key(profile)
+        entry = seen.get(key)
+        if entry is None:
+            features = prepare(profile)
+            # Hashable per-feature inputs for the feature score memo
+            entry = seen[key] = (key, features, {
+                name: repr(v) if isinstance(v, (list, dict)) else v
+                for name, v in features.items()
+            })
+        return entry
+
+    def _feature_scores(self, student, tutor, memo):
+        """feature_match_scores() with each feature memoized on its inputs"""
+        _, s, skey = student
+        _, t, tkey = tutor
+        keys = (
+            (skey['preferred_subjects'], tkey['expertise']),
+            (skey['math_score'], skey['science_score'], skey['language_score'],
+             skey['tech_score'], skey['motivation_level'], skey['skill_level'],
+             tkey['total_sessions']),
+            (skey['available_time'], skey['weekly_availability'],
+             tkey['availability'], tkey['weekly_availability']),
+            (skey['preferred_languages'], tkey['languages']),
+            (skey['learning_style'], tkey['teaching_style']),
+            (skey['tutor_gender_preference'], tkey['gender']),
+        )
+        scores = []
+        for feature, (cache, key) in enumerate(zip(memo, keys)):
+            value = cache.get(key)
+            if value is None:
+                value = cache[key] = self._feature_score(feature, s, t)
+            scores.append(value)
+        return scores
+
+    def _feature_score(self, feature, s, t):
+        m = self.matcher
+        if feature == 0:
+            return m.calculate_subject_match(s['preferred_subjects'], t['expertise'])
+        if feature == 1:
+            return m.calculate_skill_compatibility(s, t['total_sessions'], s['skill_level'])
+        if feature == 2:
+            return m.schedule_match(s, t)
+        if feature == 3:
+            return m.calculate_language_match(s['preferred_languages'], t['languages'])
+        if feature == 4:
+            return m.calculate_learning_style_match(s['learning_style'], t['teaching_style'])
+        return m.calculate_gender_match(
+            s.get('tutor_gender_preference', 'no_preference'), t.get('gender', ''))
+
+    # -- model parts ------------------------------------------------------
+
+    def q_table(self, learning_rate, discount_factor, limit=None):
+        """QTable after replaying the first `limit` outcomes (all by default)"""
+        end = self.size if limit is None else limit
+        values, state_max = _q_learning(
+            self.slots[:end], self.slot_state, self.rewards[:end],
+            len(self.states), learning_rate, discount_factor
+        )
+        table = QTable()
+        table.state_ids = _IdIndex.from_items(
+            [_state_digest(state) for state in self.states], np.arange(len(self.states))
+        )
+        table.pair_slots = _IdIndex.from_items(
+            (self.slot_keys + 1).astype(np.uint64), np.arange(len(self.slot_keys))
+        )
+        table.actions = list(self.tutors)
+        table.action_ids = {action: aid for aid, action in enumerate(table.actions)}
+        table.values = values
+        table.slot_state = self.slot_state.copy()
+        table.slot_action = self.slot_action.copy()
+        table.state_max = state_max
+        table.state_size = np.bincount(self.slot_state, minlength=len(self.states)).astype(np.int32)
+        table.n_pairs = len(values)
+        table.n_states = len(state_max)
+        return table
+
+    def tutor_performance(self):
+        n = len(self.tutors)
+        codes = self.tutor_codes
+        order, starts, counts = _group_starts(codes, n)
+        position = np.empty(self.size, dtype=np.int64)
+        position[order] = np.arange(self.size) - np.repeat(starts, counts) + 1
+
+        records = np.zeros(n, dtype=PERFORMANCE_DTYPE)
+        records[:] = DEFAULT_PERFORMANCE
+        total = np.bincount(codes, minlength=n)
+        records['total_matches'] = total
+        records['successful_matches'] = np.bincount(codes, weights=self.rewards > 0.6, minlength=n)
+        records['n_ratings'] = np.bincount(codes, weights=self.rated, minlength=n)
+        records['avg_satisfaction'] = np.bincount(codes, weights=self.satisfaction, minlength=n) / total
+        records['completion_rate'] = np.bincount(codes, weights=self.completed, minlength=n) / total
+        records['response_time_score'] = _gapped_running_mean(
+            codes, position, ~np.isnan(self.response), np.nan_to_num(self.response), 1.0, n)
+        records['reliability_score'] = _gapped_running_mean(
+            codes, position, ~np.isnan(self.punctuality), np.nan_to_num(self.punctuality), 1.0, n)
+
+        table = TutorPerformanceTable()
+        table.tutor_ids = list(self.tutors)
+        table.row_of = {tutor_id: row for row, tutor_id in enumerate(table.tutor_ids)}
+        table._records = records
+        return table
+
+    def _window_adjustments(self, order, starts, counts):
+        """
+        weight_adjustments per student: the correlation from the latest
+        push (with 5+ outcomes) where each feature was not NaN, using the
+        same sliding window as WindowedCovariance, for all pushes at once.
+        """
+        m = self.matcher
+        width = m.feature_window
+        x = self.features[order]
+        y = self.rewards[order]
+        n_events = len(order)
+        group = np.repeat(np.arange(len(counts)), counts)
+        index = np.arange(n_events)
+        low = np.maximum(index - width + 1, np.repeat(starts, counts))
+        n = (index - low + 1).astype(np.float64)
+
+        def window_sum(values):
+            # Shifted adds, not a cumulative sum: no drift over long histories
+            total = np.zeros_like(values)
+            for lag in range(width):
+                rows = index - lag
+                inside = rows >= low
+                total[inside] += values[rows[inside]]
+            return total
+
+        sum_x, sum_xx = window_sum(x), window_sum(x * x)
+        sum_xy = window_sum(x * y[:, None])
+        sum_y, sum_yy = window_sum(y), window_sum(y * y)
+        var_x = sum_xx - sum_x * sum_x / n[:, None]
+        var_y = sum_yy - sum_y * sum_y / n
+        cov = sum_xy - sum_x * sum_y[:, None] / n[:, None]
+        eligible = (index - np.repeat(starts, counts) >= 4) & (n >= 2)
+        valid = (var_x > 1e-12) & (var_y > 1e-12)[:, None] & eligible[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.clip(cov / np.sqrt(var_x * var_y[:, None]), -1.0, 1.0)
+
+        adjustments = [{} for _ in counts]
+        for f, feature in enumerate(m.IMPORTANCE_FEATURES):
+            rows = np.flatnonzero(valid[:, f])
+            if not len(rows):
+                continue
+            # Last valid row per student (rows are grouped and in order)
+            last = rows[np.r_[group[rows][1:] != group[rows][:-1], True]]
+            for g, value in zip(group[last].tolist(), corr[last, f].tolist()):
+                adjustments[g][feature] = value * 0.2
+        return adjustments
+
+    def student_state(self):
+        """(student_preferences, feature_rewards) dicts keyed by student id"""
+        m = self.matcher
+        n = len(self.students)
+        order, starts, counts = _group_starts(self.student_codes, n)
+        adjustments = self._window_adjustments(order, starts, counts)
+
+        # Each student's last feature_window outcomes, as push() leaves them
+        width = m.feature_window
+        tail_counts = np.minimum(counts, width)
+        tail_offsets = np.r_[0, np.cumsum(tail_counts)[:-1]]
+        tail_rows = order[
+            np.repeat(starts + counts - tail_counts - tail_offsets, tail_counts)
+            + np.arange(tail_counts.sum())
+        ]
+        x, y = self.features[tail_rows], self.rewards[tail_rows]
+        sum_x, sum_xx, sum_xy, sum_y, sum_yy = (
+            np.add.reduceat(values, tail_offsets, axis=0) if n else values[:0]
+            for values in (x, x * x, x * y[:, None], y, y * y)
+        )
+
+        preferences, windows = {}, {}
+        for code, student_id in enumerate(self.students):
+            events = order[starts[code]:starts[code] + counts[code]]
+            total = len(events)
+            prefs = m._new_preferences()
+            prefs['weight_adjustments'] = adjustments[code]
+            tail = events[-m.history_size:]
+            slots = np.arange(total - len(tail), total) % m.history_size
+            history = prefs['match_history']
+            history.data['tutor_id'][slots] = self.tutor_id_values[tail]
+            history.data['reward'][slots] = self.rewards[tail]
+            history.data['timestamp'][slots] = self.timestamps[tail]
+            prefs['satisfaction_history'].data[slots] = self.satisfaction[tail]
+            for ring in (history, prefs['satisfaction_history']):
+                ring.head = total % m.history_size
+                ring.size = len(tail)
+                ring.total = total
+            prefs['satisfaction_sum'] = sum(self.satisfaction[events].tolist())
+            preferences[student_id] = prefs
+
+            window = m._new_feature_window()
+            size = int(tail_counts[code])
+            rows = slice(tail_offsets[code], tail_offsets[code] + size)
+            window.scores[:size] = x[rows]
+            window.rewards[:size] = y[rows]
+            window.head = size % width
+            window.size = size
+            window.total = total
+            window.sum_x = sum_x[code].copy()
+            window.sum_xx = sum_xx[code].copy()
+            window.sum_xy = sum_xy[code].copy()
+            window.sum_y = float(sum_y[code])
+            window.sum_yy = float(sum_yy[code])
+            windows[student_id] = window
+        return preferences, windows
+
+    def build(self, learning_rate=None, discount_factor=None, epsilon=None):
+        """A new RLTutorMatchingSystem holding the replayed state"""
+        base = self.matcher
+        matcher = RLTutorMatchingSystem(
+            base.learning_rate if learning_rate is None else learning_rate,
+            base.discount_factor if discount_factor is None else discount_factor,
+            base.epsilon if epsilon is None else epsilon,
+        )
+        matcher.history_size = base.history_size
+        matcher.feature_window = base.feature_window
+        matcher.min_candidates = base.min_candidates
+        if not self.size:
+            return matcher
+        preferences, windows = self.student_state()
+        matcher.restore_state({
+            'base_weights': base.base_weights,
+            'subject_groups': base.subject_groups,
+            'q_table': self.q_table(matcher.learning_rate, matcher.discount_factor).to_state(),
+            'tutor_performance': self.tutor_performance().to_state(),
+            'student_preferences': preferences,
+            'feature_rewards': windows,
+        })
+        return matcher
+
+    # -- hyperparameter sweep ---------------------------------------------
+
+    def sweep_data(self, holdout=0.2):
+        split = int(self.size * (1 - holdout))
+        return {
+            'slots': self.slots, 'slot_state': self.slot_state, 'rewards': self.rewards,
+            'n_states': len(self.states), 'split': split,
+        }
+
+    def sweep(self, grid, holdout=0.2, processes=None):
+        """
+        Train each (learning_rate, discount_factor, epsilon) on the first
+        1 - `holdout` of the history and score it on the rest. Returns
+        result dicts, best policy_value first.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        if not self.size:
+            return []
+        data = self.sweep_data(holdout)
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_sweep, initargs=(data,)
+        ) as pool:
+            results = list(pool.map(_sweep_one, grid))
+        return sorted(results, key=lambda r: r['policy_value'], reverse=True)
+
+
+_SWEEP_DATA = None
+
+
+def _init_sweep(data):
+    global _SWEEP_DATA
+    _SWEEP_DATA = data
+
+
+def _sweep_one(params):
+    """
+    Process-pool task: Q-learning on the training prefix, then the
+    replay estimate of an epsilon-greedy policy on the held-out outcomes,
+    sum(pi(a|s) * reward) / sum(pi(a|s)) over outcomes in known states.
+    """
+    learning_rate, discount_factor, epsilon = params
+    data = _SWEEP_DATA
+    split, slots, rewards = data['split'], data['slots'], data['rewards']
+    slot_state = data['slot_state']
+    started = time.perf_counter()
+    values, _ = _q_learning(
+        slots[:split], slot_state, rewards[:split], data['n_states'],
+        learning_rate, discount_factor
+    )
+
+    trained = np.zeros(len(slot_state), dtype=bool)
+    trained[slots[:split]] = True
+    known = np.bincount(slot_state[trained], minlength=data['n_states'])
+    best = np.full(data['n_states'], -1)
+    ranked = np.flatnonzero(trained)
+    ranked = ranked[np.lexsort((-values[ranked], slot_state[ranked]))]
+    firsts = np.r_[True, slot_state[ranked][1:] != slot_state[ranked][:-1]]
+    best[slot_state[ranked][firsts]] = ranked[firsts]
+
+    test_slots, test_rewards = slots[split:], rewards[split:]
+    states = slot_state[test_slots]
+    covered = known[states] > 0
+    choices = known[states] + ~trained[test_slots]
+    pi = (1 - epsilon) * (best[states] == test_slots) + epsilon / np.maximum(choices, 1)
+    pi = np.where(covered, pi, 0.0)
+    weight = pi.sum()
+    return {
+        'learning_rate': learning_rate,
+        'discount_factor': discount_factor,
+        'epsilon': epsilon,
+        'policy_value': float((pi * test_rewards).sum() / weight) if weight else 0.0,
+        'logged_value': float(test_rewards.mean()) if len(test_rewards) else 0.0,
+        'coverage': float(covered.mean()) if len(covered) else 0.0,
+        'train_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+class _SnapshotFileLock:
+    """Cross-process flock around snapshot writes (shared log, POSIX only)"""
+
+    def __init__(self, snapshot_path, enabled):
+        self.path = snapshot_path + '.lock'
+        self.enabled = enabled and fcntl is not None
+        self._fd = None
+
+    def __enter__(self):
+        if self.enabled:
+            self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        return False
@@ -0,0 +1,92 @@
+"""
+Concurrency stress check for RLTutorMatchingSystem.
+
+Reader threads rank students with top_k_matches while a writer thread
+records outcomes. Every reader checks that the snapshot it scored
+against is whole (tutor match counts add up to the outcomes in its
+version), and the run reports match throughput per reader count.
+
+    python stress_matcher.py [--tutors 2000] [--seconds 3] [--threads 1,2,4,8]
+
+Readers never lock, so throughput should rise with reader count until
+the GIL (not the matcher) is the limit; run with free-threaded Python or
+several gunicorn workers to see the full scaling.
+"""
+import argparse
+import random
+import threading
+import time
+
+from bench_matcher import make_student, make_tutor
+from ml_matcher import RLTutorMatchingSystem
+
+
+def run(n_tutors, seconds, n_readers, seed=7):
+    rnd = random.Random(seed)
+    matcher = RLTutorMatchingSystem()
+    tutors = [make_tutor(i, rnd) for i in range(n_tutors)]
+    matrix = matcher.build_tutor_matrix(tutors)
+    students = [(f'student_{i}', make_student(rnd)) for i in range(200)]
+    stop = threading.Event()
+    counts = [0] * n_readers
+    errors = []
+    writes = [0]
+
+    def reader(slot):
+        local = random.Random(slot)
+        while not stop.is_set():
+            student_id, profile = local.choice(students)
+            snapshot = matcher.snapshot()
+            total = int(snapshot.performance.records['total_matches'].sum())
+            if total != snapshot.version:
+                errors.append(f'torn snapshot: v{snapshot.version} has {total} matches')
+            matcher.top_k_matches(student_id, profile, matrix, k=10)
+            counts[slot] += 1
+
+    def writer():
+        local = random.Random(seed + 1)
+        while not stop.is_set():
+            student_id, profile = local.choice(students)
+            matcher.record_match_outcome(
+                student_id, local.randrange(n_tutors), profile, local.choice(tutors),
+                {'satisfaction_rating': local.randint(1, 5), 'completed': local.random() < 0.5}
+            )
+            writes[0] += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(n_readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds, writes[0], errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tutors', type=int, default=2000)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--threads', default='1,2,4,8')
+    args = parser.parse_args()
+
+    baseline = None
+    failed = False
+    for n_readers in [int(n) for n in args.threads.split(',')]:
+        rate, writes, errors = run(args.tutors, args.seconds, n_readers)
+        baseline = baseline or rate
+        print(f"{n_readers:>2} readers: {rate:8.1f} matches/s "
+              f"(x{rate / baseline:.2f}), {writes} outcomes written, "
+              f"{len(errors)} torn reads")
+        if errors:
+            failed = True
+            print(f"   e.g. {errors[0]}")
+    if failed:
+        raise SystemExit(1)
+    print("No torn reads")
+
+
+if __name__ == '__main__':
+    main()
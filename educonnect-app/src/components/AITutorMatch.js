@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Search, Star, TrendingUp, Brain, Users, Calendar, Globe, BookOpen, Award, Zap } from 'lucide-react';
 
 const API_URL = "https://educonnect-92gb.onrender.com";
+const PAGE_SIZE = 10;
 
 const AITutorMatcher = ({ studentProfile, onSelectTutor }) => {
   const [matches, setMatches] = useState([]);
@@ -9,6 +10,9 @@ const AITutorMatcher = ({ studentProfile, onSelectTutor }) => {
   const [error, setError] = useState(null);
   const [useRL, setUseRL] = useState(true);
   const [selectedMatch, setSelectedMatch] = useState(null);
+  const [totalMatches, setTotalMatches] = useState(0);
+  const [nextOffset, setNextOffset] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (studentProfile) {
@@ -16,31 +20,39 @@ const AITutorMatcher = ({ studentProfile, onSelectTutor }) => {
     }
   }, [studentProfile, useRL]);
 
+  const fetchMatchPage = async (offset) => {
+    const token = localStorage.getItem('token');
+
+    const response = await fetch(`${API_URL}/api/match/tutors`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`
+      },
+      // The server matches against the saved survey; no profile in the body
+      body: JSON.stringify({
+        use_rl: useRL,
+        k: PAGE_SIZE,
+        offset
+      })
+    });
+
+    if (!response.ok) {
+      throw new Error('Failed to find matches');
+    }
+
+    return response.json();
+  };
+
   const findMatches = async () => {
     setLoading(true);
     setError(null);
 
     try {
-      const token = localStorage.getItem('token');
-      
-      const response = await fetch(`${API_URL}/api/match/tutors`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
-        },
-        body: JSON.stringify({
-          student_profile: studentProfile,
-          use_rl: useRL
-        })
-      });
-
-      if (!response.ok) {
-        throw new Error('Failed to find matches');
-      }
-
-      const data = await response.json();
+      const data = await fetchMatchPage(0);
       setMatches(data.matches || []);
+      setTotalMatches(data.total || 0);
+      setNextOffset(data.next_offset ?? null);
       
     } catch (err) {
       console.error('Match error:', err);
@@ -50,6 +62,28 @@ const AITutorMatcher = ({ studentProfile, onSelectTutor }) => {
     }
   };
 
+  // Fetch the next page and append it ("Show more tutors")
+  const loadMoreMatches = async () => {
+    if (nextOffset === null) return;
+    setLoadingMore(true);
+
+    try {
+      const data = await fetchMatchPage(nextOffset);
+      setMatches(prev => [
+        ...prev,
+        ...(data.matches || []).filter(m => !prev.some(p => p.tutor_id === m.tutor_id))
+      ]);
+      setTotalMatches(data.total || 0);
+      setNextOffset(data.next_offset ?? null);
+
+    } catch (err) {
+      console.error('Load more error:', err);
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const recordFeedback = async (tutorId, rating, completed = false) => {
     try {
       const token = localStorage.getItem('token');
@@ -155,7 +189,7 @@ const AITutorMatcher = ({ studentProfile, onSelectTutor }) => {
         <div className="space-y-4">
           <div className="flex items-center justify-between mb-4">
             <h2 className="text-xl font-semibold text-gray-800">
-              Found {matches.length} Matches
+              Found {totalMatches || matches.length} Matches
             </h2>
             <button
               onClick={findMatches}
@@ -294,6 +328,18 @@ const AITutorMatcher = ({ studentProfile, onSelectTutor }) => {
               </div>
             </div>
           ))}
+
+          {nextOffset !== null && (
+            <div className="flex justify-center pt-2">
+              <button
+                onClick={loadMoreMatches}
+                disabled={loadingMore}
+                className="px-6 py-2 border border-purple-300 text-purple-700 rounded-lg hover:bg-purple-50 transition disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Show more tutors'}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
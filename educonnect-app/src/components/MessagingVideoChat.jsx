@@ -19,6 +19,8 @@ const MessagingVideoChat = ({
   const [tutors, setTutors] = useState([]);
   const [selectedTutor, setSelectedTutor] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [newMessage, setNewMessage] = useState('');
   const [viewingTutorProfile, setViewingTutorProfile] = useState(null);
   const [showMessages, setShowMessages] = useState(false);
@@ -30,6 +32,8 @@ const MessagingVideoChat = ({
   const [searchQuery, setSearchQuery] = useState('');
 
   const socketRef = useRef(null);
+  const syncCursorRef = useRef(null);
+  const conversationIdRef = useRef(null);
   const messagesEndRef = useRef(null);
   const typingTimeoutRef = useRef(null);
 
@@ -111,6 +115,46 @@ useEffect(() => {
   }, [messages]);
 
 
+  useEffect(() => {
+    conversationIdRef.current = conversationId;
+  }, [conversationId]);
+
+  // Catch up after a reconnect with one request: the first sync only takes
+  // the cursor, later ones merge what arrived while the socket was down
+  const syncMessages = async () => {
+    const token = localStorage.getItem('token');
+    if (!token) return;
+
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const since = syncCursorRef.current;
+        const query = since === null ? '' : `?since=${since}`;
+        const res = await fetch(`${API_URL}/api/messages/sync${query}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!res.ok) return;
+
+        const data = await res.json();
+        syncCursorRef.current = data.cursor;
+        hasMore = data.has_more;
+        if (since === null) return;
+
+        const newMessages = data.messages
+          .filter(m => m.conversation_id === conversationIdRef.current)
+          .map(m => ({ ...m, isOwn: String(m.sender_id) === String(currentUserId) }));
+        if (newMessages.length > 0) {
+          setMessages(prev => [
+            ...prev,
+            ...newMessages.filter(m => !prev.some(p => p.id === m.id))
+          ]);
+        }
+      }
+    } catch (err) {
+      console.error('[STUDENT] Message sync failed:', err);
+    }
+  };
+
 // Initialize Socket.IO connection
 useEffect(() => {
   console.log('🔌 [STUDENT] Connecting to Socket.IO server...');
@@ -132,6 +176,7 @@ useEffect(() => {
   socket.on('connect', () => {
     console.log('✅ [STUDENT] Socket connected:', socket.id);
     setConnectionStatus('connected');
+    syncMessages();
   });
 
   socket.on('disconnect', (reason) => {
@@ -294,10 +339,39 @@ useEffect(() => {
     fetchTutors();
   }, []);
 
+  // The history endpoint returns the newest page; fetch the page before it
+  const loadEarlierMessages = async () => {
+    if (olderCursor === null || !conversationId) return;
+    setLoadingOlder(true);
+
+    try {
+      const messagesRes = await fetch(
+        `${API_URL}/api/conversations/${conversationId}/messages?before_id=${olderCursor}`
+      );
+      if (messagesRes.ok) {
+        const messagesData = await messagesRes.json();
+        const olderMessages = (messagesData.messages || []).map(m => ({
+          ...m,
+          isOwn: String(m.sender_id) === String(currentUserId)
+        }));
+        setMessages(prev => [
+          ...olderMessages.filter(m => !prev.some(p => p.id === m.id)),
+          ...prev
+        ]);
+        setOlderCursor(messagesData.next_cursor ?? null);
+      }
+    } catch (err) {
+      console.error('[STUDENT] Failed to load earlier messages:', err);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const openConversation = async (tutor) => {
     setSelectedTutor(tutor);
     setShowMessages(true);
     setLoading(true);
+    setOlderCursor(null);
 
     try {
       const tutorProfileId = tutor.tutor_profile_id || tutor.id;
@@ -334,6 +408,7 @@ useEffect(() => {
                 console.log('[STUDENT] Last message data:', processedMessages[processedMessages.length - 1]);
               }
               setMessages(processedMessages);
+              setOlderCursor(messagesData.next_cursor ?? null);
               setLoading(false);
               return;
             }
@@ -807,6 +882,17 @@ const handleTyping = () => {
               </div>
             ) : (
               <div className="flex flex-col space-y-3">
+                {olderCursor !== null && (
+                  <div className="flex justify-center">
+                    <button
+                      onClick={loadEarlierMessages}
+                      disabled={loadingOlder}
+                      className="px-4 py-1 text-sm text-gray-600 border border-gray-300 rounded-full hover:bg-gray-100 transition disabled:opacity-50"
+                    >
+                      {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+                    </button>
+                  </div>
+                )}
                 {messages.map((msg) => {
                   // Debug log
                   console.log('Rendering message:', {
@@ -20,6 +20,8 @@ const TutorMessagingView = ({
   const [conversations, setConversations] = useState([]);
   const [selectedConversation, setSelectedConversation] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [newMessage, setNewMessage] = useState('');
   const [loading, setLoading] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
@@ -30,6 +32,8 @@ const TutorMessagingView = ({
   
   const messagesEndRef = useRef(null);
   const socketRef = useRef(null);
+  const syncCursorRef = useRef(null);
+  const selectedConversationRef = useRef(null);
   const typingTimeoutRef = useRef(null);
 
  const selectedTutorForJitsi = selectedConversation ? {
@@ -426,6 +430,68 @@ useEffect(() => {
     scrollToBottom();
   }, [messages]);
 
+  useEffect(() => {
+    selectedConversationRef.current = selectedConversation;
+  }, [selectedConversation]);
+
+  // Catch up after a reconnect with one request: the first sync only takes
+  // the cursor, later ones merge what arrived while the socket was down
+  const syncMessages = async () => {
+    const token = localStorage.getItem('token');
+    if (!token) return;
+
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const since = syncCursorRef.current;
+        const query = since === null ? '' : `?since=${since}`;
+        const res = await fetch(`${API_URL}/api/messages/sync${query}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!res.ok) return;
+
+        const data = await res.json();
+        syncCursorRef.current = data.cursor;
+        hasMore = data.has_more;
+        if (since === null) return;
+
+        const openId = selectedConversationRef.current?.id;
+        const newMessages = data.messages
+          .filter(m => m.conversation_id === openId)
+          .map(m => ({ ...m, isOwn: String(m.sender_id) === String(currentTutorUserId) }));
+        if (newMessages.length > 0) {
+          setMessages(prev => [
+            ...prev,
+            ...newMessages.filter(m => !prev.some(p => p.id === m.id))
+          ]);
+        }
+
+        if (data.conversations.length > 0) {
+          setConversations(prev => {
+            const updated = prev.map(conv => {
+              const summary = data.conversations.find(c => c.id === conv.id);
+              if (!summary) return conv;
+              return {
+                ...conv,
+                lastMessage: summary.lastMessage,
+                lastMessageTime: summary.lastMessageTime,
+                unreadCount: conv.id === openId ? 0 : summary.unreadCount
+              };
+            });
+            const added = data.conversations
+              .filter(c => !prev.some(conv => conv.id === c.id))
+              .map(c => ({ ...c, studentId: c.partnerId, studentName: c.partnerName }));
+            return [...added, ...updated].sort((a, b) =>
+              new Date(b.lastMessageTime || 0) - new Date(a.lastMessageTime || 0)
+            );
+          });
+        }
+      }
+    } catch (err) {
+      console.error('[TUTOR] Message sync failed:', err);
+    }
+  };
+
 useEffect(() => {
   console.log('🔌 [TUTOR] Connecting to Socket.IO server...');
   console.log('🔌 [TUTOR] Current tutor user ID:', currentTutorUserId);
@@ -443,6 +509,7 @@ useEffect(() => {
   socket.on('connect', () => {
     console.log('✅ [TUTOR] Socket connected:', socket.id);
     setConnectionStatus('connected');
+    syncMessages();
   });
 
   socket.on('disconnect', () => {
@@ -703,12 +770,41 @@ useEffect(() => {
     }
   };
 
+  // The history endpoint returns the newest page; fetch the page before it
+  const loadEarlierMessages = async () => {
+    if (olderCursor === null || !selectedConversation) return;
+    setLoadingOlder(true);
+
+    try {
+      const messagesRes = await fetch(
+        `${API_URL}/api/conversations/${selectedConversation.id}/messages?before_id=${olderCursor}`
+      );
+      if (messagesRes.ok) {
+        const messagesData = await messagesRes.json();
+        const olderMessages = (messagesData.messages || []).map(m => ({
+          ...m,
+          isOwn: String(m.sender_id) === String(currentTutorUserId)
+        }));
+        setMessages(prev => [
+          ...olderMessages.filter(m => !prev.some(p => p.id === m.id)),
+          ...prev
+        ]);
+        setOlderCursor(messagesData.next_cursor ?? null);
+      }
+    } catch (err) {
+      console.error('[TUTOR] Failed to load earlier messages:', err);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const openConversation = async (conversation) => {
     console.log('[TUTOR] Opening conversation:', conversation);
     console.log('[TUTOR] Student ID from conversation:', conversation.studentId || conversation.partnerId);
     
     setSelectedConversation(conversation);
     setLoading(true);
+    setOlderCursor(null);
 
     const studentId = conversation.studentId || conversation.partnerId;
     
@@ -732,6 +828,14 @@ useEffect(() => {
       conv.id === conversation.id ? { ...conv, unreadCount: 0 } : conv
     ));
 
+    // Save the read position so the unread count stays cleared after a reload
+    if (socketRef.current && typeof conversation.id === 'number') {
+      socketRef.current.emit('mark_as_read', {
+        conversationId: conversation.id,
+        userId: currentTutorUserId
+      });
+    }
+
     try {
       if (typeof conversation.id === 'number') {
         console.log('[TUTOR] Loading messages from database...');
@@ -748,6 +852,7 @@ useEffect(() => {
             console.log('[TUTOR] Last message data:', processedMessages[processedMessages.length - 1]);
           }
           setMessages(processedMessages);
+          setOlderCursor(messagesData.next_cursor ?? null);
           setLoading(false);
           return;
         }
@@ -953,6 +1058,17 @@ useEffect(() => {
                 </div>
               ) : (
                 <div className="flex flex-col space-y-3 max-w-4xl mx-auto">
+                  {olderCursor !== null && (
+                    <div className="flex justify-center">
+                      <button
+                        onClick={loadEarlierMessages}
+                        disabled={loadingOlder}
+                        className="px-4 py-1 text-sm text-gray-600 border border-gray-300 rounded-full hover:bg-gray-100 transition disabled:opacity-50"
+                      >
+                        {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+                      </button>
+                    </div>
+                  )}
                   {messages.map((msg) => {
                     // Debug log
                     console.log('Rendering message:', {